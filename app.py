@@ -1,9 +1,18 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import altair as alt
+import plotly.graph_objects as go
 from utils.data_processor import geocode_locations  # Ensure this function is defined in your utils
-from utils.data_processor import reduced_all_applications, num_immediate
+from utils.data_processor import get_dataset, start_export_watcher
+from utils import timing
+from utils import page_data
+from utils.viewer import raw_data_viewer
+from utils.spatial import DEFAULT_GRID_LEVEL, GRID_LEVELS
+from utils.timeseries import PERIOD_NAMES
+from utils.snapshots import APPLICATION_TABLES, latest_snapshot, read_table
+from utils.result_cache import cached
+
+# Per-section timings for this rerun (only recorded with CADWARE_TIMING=1)
+timing.start_rerun("app")
 
 st.set_page_config(layout="wide", menu_items=None)
 st.title('📊 Cadware Jobs Dashboard')
@@ -12,22 +21,45 @@ COLORS = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEEAD', '#D4A5A5', '#9B
 st.sidebar.title("Navigation")
 st.sidebar.page_link("app.py", label="Job Stats")
 st.sidebar.page_link("pages/mailing_list.py", label="Mailing list Stats")
-
+st.sidebar.page_link("pages/messages.py", label="Contact Messages")
+
+timing.section("app.load")
+# New exports dropped into the form folders are ingested in the background
+start_export_watcher()
+
+# In snapshot mode (CADWARE_SNAPSHOTS=1) every chart reads the tables of the latest
+# `python -m utils.snapshots build`, and the rows are only loaded if asked for in the raw data viewer
+snapshot = latest_snapshot(APPLICATION_TABLES)
+if snapshot is None:
+    # Shared, read-only dataset for the current data version; derived columns are computed once per process
+    dataset = get_dataset()
+    data_version = dataset.data_version
+else:
+    dataset = None
+    data_version = snapshot['version']
+    st.caption(f"Charts from snapshot {snapshot['version']}, built {snapshot['created_at']}")
+
+def table(name, compute):
+    # The snapshot's copy of an aggregate in snapshot mode, else computed from the dataset
+    return read_table(name, snapshot) if snapshot else compute()
+
+timing.section("app.geocode")
 # Geocode all unique locations upfront (before filtering)
-# Create location strings for the full dataset
-reduced_all_applications['location'] = reduced_all_applications.apply(
-    lambda row: f"{row['City']}, {row['State/Region']}, {row['Country']}".strip(', '),
-    axis=1
-)
-unique_locations = tuple(reduced_all_applications['location'].unique())  # Tuple for cache stability
-lat_lon_dict = geocode_locations(unique_locations)  # Cache this result
+location_counts = table("location_counts", lambda: dataset.location_counts)
+unique_locations = tuple(location_counts['location'].unique())  # Tuple for cache stability
+lat_lon_dict = geocode_locations(unique_locations)  # Only locations missing from the store are geocoded
+
+timing.section("app.cube")
+# Count cube built once per data version; KPIs and charts below slice it instead of rescanning rows
+cube = table("applications_cube", lambda: dataset.cube)
 
 tab1, tab2 = st.tabs(["Stats", "Trends"])
 with tab1:
+    timing.section("app.kpis")
     st.header("Job Application KPIs")
 
     # Get unique job types for filtering
-    unique_job_types = sorted(reduced_all_applications['job_type'].unique())
+    unique_job_types = page_data.job_types(cube)
 
     # Multiselect widget for filtering job types (default to all)
     selected_job_types = st.multiselect(
@@ -37,12 +69,12 @@ with tab1:
         key='job_type_filter_tab1'
     )
 
-    # Filter the DataFrame based on selected job types
-    filtered_df = reduced_all_applications[reduced_all_applications['job_type'].isin(selected_job_types)]
-
-    total_applications = len(filtered_df)
-    female_applicants = len(filtered_df[filtered_df['gender'] == 'Female'])
-    male_applicants = len(filtered_df[filtered_df['gender'] == 'Male'])
+    # Shared by every session through the result cache, whatever order the job types were picked in
+    kpi_key = {'version': data_version, 'job_types': selected_job_types}
+    kpis = cached("app.kpis", kpi_key, lambda: page_data.job_kpis(cube, selected_job_types))
+    total_applications = kpis['total']
+    female_applicants = kpis['female']
+    male_applicants = kpis['male']
 
     # Calculate most sought out job title with tie-breaker (alphabetical)
 
@@ -53,15 +85,12 @@ with tab1:
 
     with col1:
         st.metric(label="Total Applications", value=total_applications, delta=total_applications)
-        st.metric(label="Applicants Available to Start Within a Week 🚨", value=len(filtered_df[(filtered_df['Earliest Available Date'] - filtered_df['Submission Date']).dt.days <= 7]))
+        st.metric(label="Applicants Available to Start Within a Week 🚨", value=kpis['within_a_week'])
     with col2:
         st.metric(label="Female Applicants", value=female_applicants, delta=female_applicants)
-        job_counts = filtered_df['job_type'].value_counts()
+        most_sought_job = page_data.popular_job(kpis['job_counts'])  # alphabetically first among ties
 
-        if not job_counts.empty:
-            max_count = job_counts.max()
-            tied_jobs = job_counts[job_counts == max_count].index.tolist()
-            most_sought_job = sorted(tied_jobs)[0].replace("-", " ").title()  # alphabetically first among ties
+        if most_sought_job is not None:
             st.metric(label="Popular Job Title", value=most_sought_job)
         else:
             st.metric(label="Popular Job Title", value="N/A", delta=None)    
@@ -69,11 +98,13 @@ with tab1:
         st.metric(label="Male Applicants", value=male_applicants, delta=male_applicants)
 
     # Job Type Distribution (Pie)
+    timing.section("app.job_pie")
     st.header("Applications Breakdown by Job Title")
-    job_type_counts = filtered_df['job_type'].value_counts().reset_index()
+    job_type_counts = kpis['job_counts'].reset_index()
     job_type_counts.columns = ['job_type', 'count']
 
     if not job_type_counts.empty:
+        import altair as alt  # ~0.3s to import, so only paid when the pie actually renders
         pie_chart = alt.Chart(job_type_counts).mark_arc().encode(
             theta=alt.Theta('count:Q', title='Count'),
             color=alt.Color('job_type:N', scale=alt.Scale(range=COLORS), legend=alt.Legend(title='Job Type')),
@@ -86,27 +117,46 @@ with tab1:
     else:
         st.info("Please select at least one job type to view the breakdown.")
 
-    # Map lat/lon back to filtered DataFrame using cached results
-    filtered_df['latitude'] = filtered_df['location'].map(lambda x: lat_lon_dict.get(x, (None, None))[0])
-    filtered_df['longitude'] = filtered_df['location'].map(lambda x: lat_lon_dict.get(x, (None, None))[1])
-
-    # Drop rows with missing lat/lon
-    df_map = filtered_df.dropna(subset=['latitude', 'longitude'])
+    # One page of the shared frame at a time, filtered by the selected job types without copying it
+    timing.section("app.raw_data")
+    with st.expander("View Raw Data"):
+        # In snapshot mode the rows (and so the full ingest) are only loaded when asked for
+        if snapshot is None or st.toggle("Load rows", key="applications_raw_load"):
+            frame = (dataset or get_dataset()).frame
+            raw_data_viewer(
+                frame, key="applications_raw",
+                rows=frame['job_type'].isin(selected_job_types),
+                default_columns=['job_type', 'Submission Date', 'gender', 'City', 'Country', 'Earliest Available Date'],
+            )
 
     # Display the map
+    timing.section("app.map")
     st.header("Geolocation of Applicants")
+    map_grouping = st.select_slider("Group applicants by", options=list(GRID_LEVELS), value=DEFAULT_GRID_LEVEL)
+
+    # One weighted point per place (or grid cell) with coordinates, sized by its number of applicants.
+    # Keyed on the resolved coordinates themselves, so a place geocoded on a later rerun (a retried
+    # Nominatim call, a gazetteer installed since) redraws the map
+    geocoded = hash(frozenset((loc, tuple(c)) for loc, c in lat_lon_dict.items() if c and c[0] is not None))
+    map_key = {'version': data_version, 'job_types': selected_job_types, 'grouping': map_grouping,
+               'geocoded': geocoded}
+    df_map = cached("app.map", map_key, lambda: page_data.map_points(
+        location_counts, lat_lon_dict, selected_job_types, GRID_LEVELS[map_grouping]
+    ))
+
     if not df_map.empty:
-        st.map(df_map[['latitude', 'longitude']], zoom=1)
+        st.map(df_map, latitude='latitude', longitude='longitude', size='size', zoom=1)
     else:
         st.warning("No valid locations found for mapping.")
 
 # Rest of your code for tab2 remains unchanged
 with tab2:
+    timing.section("app.top_cities")
     st.header("Top 3 Cities with Most Applicants")
-    if reduced_all_applications.empty or 'City' not in reduced_all_applications.columns:
+    if cube.empty:
         st.error("Error: DataFrame is empty or 'City' column is missing.")
     else:
-        city_counts = reduced_all_applications['City'].value_counts().head(3)
+        city_counts = page_data.top_cities(cube)
         top_cities = city_counts.index.tolist()
         counts = city_counts.values.tolist()
 
@@ -131,37 +181,32 @@ with tab2:
 
     st.markdown("\n\n\n")
 
-    df = reduced_all_applications
-
-
+    timing.section("app.monthly_chart")
     st.header('Monthly job listing performance')
 
-    unique_job_types = sorted(df['job_type'].unique())
     selected_job_types = st.multiselect(
         'Select Job Types to Display',
         options=unique_job_types,
         default=unique_job_types
     )
 
-    filtered_df = df[df['job_type'].isin(selected_job_types)]
-    agg_df = filtered_df.groupby(['submit_month', 'job_type']).size().reset_index(name='Application Count')
-
-    month_order = ['January', 'February', 'March', 'April', 'May', 'June', 
-                'July', 'August', 'September', 'October', 'November', 'December']
-    agg_df['submit_month'] = pd.Categorical(agg_df['submit_month'], categories=month_order, ordered=True)
-    agg_df = agg_df.sort_values(['submit_month', 'job_type'])
+    # Monthly bars, stepping up to quarters once the history gets long
+    agg_df, freq = cached("app.monthly", {'version': data_version, 'job_types': selected_job_types},
+                          lambda: page_data.monthly_counts(cube, selected_job_types))
 
     if not agg_df.empty:
+        period_title = f'{PERIOD_NAMES[freq]} of Submission'
+
         fig = px.bar(
             agg_df,
-            x='submit_month',
+            x='submit_period',
             y='Application Count',
             color='job_type',
             barmode='group',
-            labels={'submit_month': 'Month of Submission', 'Application Count': 'Number of Applications', 'job_type': 'Job Type'}
+            labels={'submit_period': period_title, 'Application Count': 'Number of Applications', 'job_type': 'Job Type'}
         )
         fig.update_layout(
-            xaxis_title='Month of Submission',
+            xaxis_title=period_title,
             yaxis_title='Number of Applications',
             legend_title='Job Type',
             xaxis_tickangle=45,
@@ -173,23 +218,52 @@ with tab2:
 
     st.markdown("\n\n\n")
 
+    timing.section("app.hourly_kde")
+    st.header('Hourly Application Patterns')
+    # Binned KDE on the 24h circle, so late-night and early-morning submissions smooth into each other
+    def hourly_density():
+        if snapshot is None:
+            return page_data.job_hourly_density(dataset, selected_job_types)
+        # Same curve from the snapshot's applications per job type and hour
+        return page_data.job_hourly_density_from_counts(read_table("hourly_counts", snapshot), selected_job_types)
+
+    curve = cached("app.hourly_kde", {'version': data_version, 'job_types': selected_job_types}, hourly_density)
+
+    if curve is not None:
+        x_grid, density = curve
+        fig_hours = px.line(x=x_grid, y=density, labels={'x': 'Hour of Day', 'y': 'Density'})
+        fig_hours.update_layout(xaxis=dict(tickmode='linear', tick0=0, dtick=1, range=[0, 24]))
+        st.plotly_chart(fig_hours, use_container_width=True)
+    else:
+        st.write('No data available for the selected job types.')
 
+    st.markdown("\n\n\n")
 
-    df['Earliest Available Date'] = pd.to_datetime(df['Earliest Available Date'], errors='coerce')
-    df['Submission Date'] = pd.to_datetime(df['Submission Date'], errors='coerce')
-
-    df['availability_days'] = (df['Earliest Available Date'] - df['Submission Date']).dt.days
-
+    timing.section("app.availability_box")
     st.header('Days to Availability Analysis')
-    fig2 = px.box(df, x='job_type', y='availability_days', 
-                labels={'job_type': 'Job Type', 'availability_days': 'Availability Days'},
-                color='job_type')
-    fig2.update_layout(xaxis_title='Job Type', yaxis_title='Availability in Days', 
-                    xaxis_tickangle=45, showlegend=False)
-    st.plotly_chart(fig2)
-
-    df = reduced_all_applications
-
-    df['Submission Date'] = pd.to_datetime(df['Submission Date'], errors='coerce')
-    df = df.dropna(subset=['submit_month', 'job_type'])
+    # Drawn from per-job-type quantile sketches (merged as exports arrive), so the browser gets five
+    # numbers and a capped outlier sample per box rather than every applicant's value
+    box_stats = table("availability_box", lambda: dataset.availability_box)
+    box_stats = page_data.availability_boxes(box_stats, selected_job_types)
+
+    if not box_stats.empty:
+        fig2 = go.Figure()
+        for i, row in enumerate(box_stats.itertuples()):
+            color = px.colors.qualitative.Plotly[i % len(px.colors.qualitative.Plotly)]
+            fig2.add_trace(go.Box(
+                x=[row.job_type], q1=[row.q1], median=[row.median], q3=[row.q3],
+                lowerfence=[row.lowerfence], upperfence=[row.upperfence],
+                name=row.job_type, marker_color=color, boxpoints=False,
+            ))
+            if len(row.outliers):
+                fig2.add_trace(go.Scatter(
+                    x=[row.job_type] * len(row.outliers), y=list(row.outliers), mode='markers',
+                    marker=dict(color=color, size=5), name=row.job_type, hoverinfo='y',
+                ))
+        fig2.update_layout(xaxis_title='Job Type', yaxis_title='Availability in Days',
+                        xaxis_tickangle=45, showlegend=False)
+        st.plotly_chart(fig2)
+    else:
+        st.write('No data available for the selected job types.')
 
+timing.render_debug_panel(timing.end_rerun())
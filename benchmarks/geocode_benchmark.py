@@ -0,0 +1,66 @@
+"""Lookups per second: offline gazetteer vs. the rate-limited Nominatim path.
+
+Run from the repo root: python -m benchmarks.geocode_benchmark
+Uses the installed GeoNames dumps when present, otherwise a synthetic gazetteer.
+Nothing here touches the network; the Nominatim side is a stub behind the same RateLimiter.
+"""
+import random
+import time
+
+from geopy.extra.rate_limiter import RateLimiter
+
+from utils.gazetteer import Gazetteer, load_gazetteer
+
+
+def synthetic_gazetteer(n_cities=30000, seed=0):
+    rng = random.Random(seed)
+    gazetteer = Gazetteer()
+    for code, name in [("GB", "United Kingdom"), ("US", "United States"), ("NG", "Nigeria"), ("LK", "Sri Lanka")]:
+        gazetteer.add_country(code, name)
+    for i in range(n_cities):
+        country = rng.choice(["GB", "US", "NG", "LK"])
+        gazetteer.add_city([f"city{i}"], f"region{i % 50}", country, rng.uniform(-60, 60), rng.uniform(-180, 180), i)
+    return gazetteer
+
+
+def sample_locations(gazetteer, n, seed=1):
+    rng = random.Random(seed)
+    keys = [k for k in gazetteer.exact if k.count("|") == 2 and not k.endswith("||")]
+    locations = []
+    for key in rng.sample(keys, min(n, len(keys))):
+        city, region, country = key.split("|")
+        locations.append(f"{city}, {region or 'None'}, {country}")
+    return locations
+
+
+def bench_gazetteer(gazetteer, locations, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for loc in locations:
+            gazetteer.lookup_location(loc)
+    elapsed = time.perf_counter() - start
+    return repeat * len(locations) / elapsed
+
+
+def bench_rate_limited(calls=3):
+    # Same limiter settings as geocode_locations, with a geocoder that answers instantly
+    geocode = RateLimiter(lambda query: (0.0, 0.0), min_delay_seconds=2, error_wait_seconds=10)
+    start = time.perf_counter()
+    for i in range(calls):
+        geocode(f"city{i}")
+    return calls / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    gazetteer = load_gazetteer()
+    source = "GeoNames"
+    if not len(gazetteer):
+        gazetteer, source = synthetic_gazetteer(), "synthetic"
+    locations = sample_locations(gazetteer, 10000)
+
+    gaz_rate = bench_gazetteer(gazetteer, locations)
+    limited_rate = bench_rate_limited()
+    print(f"gazetteer ({source}, {len(locations)} locations): {gaz_rate:,.0f} lookups/s, "
+          f"{1e6 / gaz_rate:.1f} us/lookup")
+    print(f"rate-limited Nominatim path: {limited_rate:.2f} lookups/s")
+    print(f"speed-up: {gaz_rate / limited_rate:,.0f}x")
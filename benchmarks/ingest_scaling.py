@@ -0,0 +1,59 @@
+"""Cold ingest of many small exports: serial pandas parsing vs. parallel Arrow parsing, 1..N workers.
+
+Run from the repo root: python -m benchmarks.ingest_scaling [rows] [rows per file]
+Defaults to 300k applications split into 2k-row daily exports (~150 files). Each run ingests
+into an empty store, so parse, dedup, derive and the Parquet write are all included; the
+"read" column is just the CSV parsing the worker count applies to.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pyarrow as pa
+
+from benchmarks.synthetic import read_application_export, write_exports
+from utils import timing
+from utils.data_processor import PIPELINE_VERSION, derive_applications, read_application_table
+from utils.ingest import DeltaStore
+
+
+def ingest(data_dir, read_fn, workers):
+    cache = tempfile.mkdtemp(prefix="cadware-scaling-")
+    timing.reset()
+    try:
+        start = time.perf_counter()
+        store = DeltaStore("applications", Path(data_dir) / "Application", read_fn, derive_applications,
+                           key=["job_type", "Submission ID"], pipeline_version=PIPELINE_VERSION,
+                           cache_dir=cache, workers=workers)
+        total = time.perf_counter() - start
+        read = timing.percentiles().get("ingest.applications.read", {}).get("p50_ms", 0) / 1000
+        return len(store.frame), len(store.files()), total, read
+    finally:
+        shutil.rmtree(cache, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    rows_per_file = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    data_dir = Path(".cache/bench") / f"scaling-{rows}-{rows_per_file}"
+    if not data_dir.exists():
+        write_exports(data_dir, rows, rows_per_file=rows_per_file)
+
+    timing.enable()
+    cores = os.cpu_count() or 1
+    n, files, total, read = ingest(data_dir, read_application_export, 1)
+    print(f"{n:,} rows in {files} files, {cores} core(s)")
+    print(f"  pandas, serial        total {total:6.2f}s  read {read:6.2f}s")
+    base = None
+    workers = 1
+    while True:
+        pa.set_cpu_count(workers)
+        _, _, total, read = ingest(data_dir, read_application_table, workers)
+        base = base or read
+        print(f"  arrow, {workers:>2} worker(s)  total {total:6.2f}s  read {read:6.2f}s  ({base / read:.1f}x)")
+        if workers >= cores:
+            break
+        workers = min(workers * 2, cores)
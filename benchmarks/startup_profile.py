@@ -0,0 +1,89 @@
+"""Cold-start profile: import time of each page broken down by package, plus the first load().
+
+Run from the repo root: python -m benchmarks.startup_profile [--top 15] [--update-budget]
+Each page's top-level imports run in a fresh interpreter under -X importtime, so nothing is
+already cached. The run fails (status 1) when a page's imports or the first load() exceed the
+budget stored in benchmarks/startup_budget.json by more than --tolerance.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+PAGES = ["app.py", "pages/mailing_list.py", "pages/messages.py"]
+BUDGET = Path(__file__).with_name("startup_budget.json")
+LOAD_SNIPPET = (
+    "import time; import utils.data_processor as d; t = time.perf_counter(); d.load(); "
+    "print(round((time.perf_counter() - t) * 1000, 1))"
+)
+
+
+def top_level_imports(path):
+    # Only module-level imports: ones inside functions or branches are deferred on purpose
+    tree = ast.parse(Path(path).read_text(encoding="utf-8"))
+    statements = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            statements.append(ast.unparse(node))
+    return "; ".join(statements)
+
+
+def _run(snippet, importtime=False):
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", snippet]
+    return subprocess.run(cmd, capture_output=True, text=True, env={**os.environ, "PYTHONPATH": "."}, check=True)
+
+
+def parse_importtime(stderr):
+    """(total ms, {top-level package: self ms}) from -X importtime output."""
+    total_us, by_package = 0, defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nesting is shown by indentation; only outermost imports add to the total
+        if not name.startswith("  "):
+            total_us += int(cumulative_us)
+        by_package[name.strip().split(".")[0]] += int(self_us)
+    return total_us / 1000, {k: v / 1000 for k, v in sorted(by_package.items(), key=lambda kv: -kv[1])}
+
+
+def profile():
+    results = {}
+    for page in PAGES:
+        total_ms, packages = parse_importtime(_run(top_level_imports(page), importtime=True).stderr)
+        results[page] = {"ms": round(total_ms, 1), "packages": packages}
+    results["load()"] = {"ms": float(_run(LOAD_SNIPPET).stdout.strip().splitlines()[-1])}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--update-budget", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = profile()
+    for name, r in results.items():
+        print(f"{name}: {r['ms']:,.0f} ms")
+        for package, ms in list(r.get("packages", {}).items())[:args.top]:
+            print(f"  {package:<24} {ms:8.1f} ms")
+
+    if args.update_budget:
+        BUDGET.write_text(json.dumps({k: r["ms"] for k, r in results.items()}, indent=1) + "\n")
+        print(f"budget written to {BUDGET}")
+        return 0
+    budget = json.loads(BUDGET.read_text()) if BUDGET.exists() else {}
+    over = [f"{k}: {r['ms']:,.0f} ms vs budget {budget[k]:,.0f} ms"
+            for k, r in results.items() if k in budget and r["ms"] > budget[k] * args.tolerance]
+    for line in over:
+        print(f"over budget: {line}")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Local stand-ins for the remote services, so benchmarks and tests run without network access."""
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COUNTRIES = [("United Kingdom", "London"), ("United States", "San Jose"), ("Nigeria", "Lagos"), ("Sri Lanka", "Galle")]
+
+
+def fake_ip_location(ip):
+    # Deterministic per IP so repeated runs see the same answers
+    return COUNTRIES[int(hashlib.sha1(ip.encode()).hexdigest(), 16) % len(COUNTRIES)]
+
+
+class _IpApiHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests += 1
+        self.server.batches.append(len(body))
+        if self.server.fail_next:
+            # Rate limited, as ip-api answers once the free tier's quota is used up
+            self.server.fail_next -= 1
+            self.send_error(429)
+            return
+        rows = []
+        for item in body:
+            ip = item["query"] if isinstance(item, dict) else item
+            if ip.startswith("10."):
+                # ip-api can't place private ranges
+                rows.append({"status": "fail", "message": "private range", "query": ip})
+                continue
+            country, city = fake_ip_location(ip)
+            rows.append({"status": "success", "country": country, "city": city, "query": ip})
+        data = json.dumps(rows).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class IpApiStub:
+    """ip-api.com batch endpoint on localhost; use as a context manager and pass `.url` to IpResolver.
+
+    The first `fail` requests get a 429, `.batches` records each request's batch size, and IPs in
+    10.0.0.0/8 come back as failed lookups.
+    """
+
+    def __init__(self, fail=0):
+        self.fail = fail
+
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _IpApiHandler)
+        self.server.requests = 0
+        self.server.batches = []
+        self.server.fail_next = self.fail
+        self.url = f"http://127.0.0.1:{self.server.server_port}/batch"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    @property
+    def batches(self):
+        return self.server.batches
+
+    def fail_next(self, n=1):
+        self.server.fail_next = n
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
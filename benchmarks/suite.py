@@ -0,0 +1,366 @@
+"""Stage-by-stage timings and peak memory on synthetic exports, checked against stored baselines.
+
+Run from the repo root:
+    python -m benchmarks.suite                      # 10k and 100k rows
+    python -m benchmarks.suite --sizes 1m,10m       # the big ones (several GB of CSV for 10m)
+    python -m benchmarks.suite --update-baselines   # record this machine's numbers
+
+Everything runs offline: geocoding goes through a gazetteer built from the synthetic places
+and IP geolocation through benchmarks.stubs.IpApiStub. A stage regresses when it is slower
+(or grows memory more) than its baseline by more than --tolerance, beyond a small absolute
+slack so millisecond stages don't flap; any regression makes the run exit with status 1.
+"""
+import argparse
+import ctypes
+import gc
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from benchmarks.stubs import IpApiStub
+from benchmarks.synthetic import gazetteer_for, places, read_application_export, write_exports
+from utils.data_processor import (
+    DATE_COLUMNS, INGEST_WORKERS, PIPELINE_VERSION, derive_applications, derive_mailing_list, derive_messages, parse_addresses,
+    read_application_table, read_mailing_list_table, read_messages_table, signup_rollups,
+)
+from utils.dataset import PreparedDataset
+from utils.geocode_store import GeocodeStore
+from utils.ingest import DeltaStore
+from utils.ip_dimension import IpDimension
+from utils.ip_geo import IpResolver
+from utils import page_data
+from utils.minhash import cluster_summary, clusters, from_bytes, sender_summary
+from utils.result_cache import ResultCache, date_range
+from utils.snapshots import (
+    APPLICATION_TABLES, MAILING_LIST_TABLES, read_manifest, read_table, snapshot_tables, write_snapshot,
+)
+from utils.timeseries import pick_frequency
+
+BASELINES = Path(__file__).with_name("baselines.json")
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+# Absolute slack on top of the relative tolerance
+MIN_SECONDS = 0.05
+MIN_MB = 16
+
+
+def _status_kb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    # Linux only: writing 5 to clear_refs resets VmHWM, so each stage gets its own high-water mark
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _release_free_memory():
+    # Give memory freed by earlier stages back to the OS first, so a stage can't look cheap by
+    # reusing it (or costly because an earlier stage got leaner and left less behind)
+    gc.collect()
+    pa.default_memory_pool().release_unused()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def measure(fn):
+    """(result, seconds, MB the resident set peaked above its size at the start) for fn()."""
+    _release_free_memory()
+    can_reset = _reset_peak_rss()
+    start_kb = _status_kb("VmRSS")
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak_kb = _status_kb("VmHWM")
+    if not can_reset or start_kb is None or peak_kb is None:
+        return result, seconds, None
+    return result, seconds, max(peak_kb - start_kb, 0) / 1024
+
+
+class Run:
+    """Synthetic exports for one size plus a scratch cache, shared by the stages below."""
+
+    def __init__(self, data_dir, cache_dir, rows):
+        self.data = Path(data_dir)
+        self.cache = Path(cache_dir)
+        self.rows = rows
+        self.places = places()
+
+
+def _applications_store(run):
+    return DeltaStore("applications", run.data / "Application", read_application_table, derive_applications,
+                      key=["job_type", "Submission ID"], pipeline_version=PIPELINE_VERSION, cache_dir=run.cache,
+                      workers=INGEST_WORKERS)
+
+
+def stage_ingest_applications(run):
+    run.applications = _applications_store(run).frame
+
+
+def stage_ingest_applications_warm(run):
+    # Second process start: manifest check plus memory-mapped Parquet reads
+    run.applications = _applications_store(run).frame
+
+
+def stage_ingest_mailing_list(run):
+    run.mailing_list = DeltaStore("mailing_list", run.data / "Join Mailing List", read_mailing_list_table, derive_mailing_list,
+                                  key=["Submission ID"], pipeline_version=PIPELINE_VERSION, cache_dir=run.cache,
+                                  workers=INGEST_WORKERS).frame
+
+
+def stage_ingest_messages(run):
+    run.messages = DeltaStore("messages", run.data / "Send Us a message", read_messages_table, derive_messages,
+                              key=["Submission ID"], pipeline_version=PIPELINE_VERSION, cache_dir=run.cache,
+                              workers=INGEST_WORKERS).frame
+
+
+def stage_parse_addresses(run):
+    parse_addresses(run.raw_addresses)
+
+
+def stage_geocode(run):
+    # Same order as geocode_locations: offline gazetteer first, then the persistent store
+    store = GeocodeStore(run.cache / "geocode.sqlite")
+    lat_lon, unresolved = {}, []
+    for loc in run.applications["location"].dropna().unique():
+        coords = run.gazetteer.lookup_location(loc)
+        if coords:
+            lat_lon[loc] = coords
+        else:
+            unresolved.append(loc)
+    cached, missing = store.get_many(unresolved)
+    lat_lon.update(cached)
+    lat_lon.update({loc: (None, None) for loc in missing})
+    run.lat_lon = lat_lon
+
+
+def stage_ip_geolocation(run):
+    with IpApiStub() as stub:
+        resolver = IpResolver(mmdb_path=run.cache / "missing.mmdb", cache_path=run.cache / "ipgeo.sqlite",
+                              remote=True, remote_url=stub.url, remote_delay=0)
+        run.ip_locations = resolver.resolve(run.mailing_list["Submitter IP"])
+        resolver.close()
+
+
+def stage_ip_geolocation_warm(run):
+    resolver = IpResolver(mmdb_path=run.cache / "missing.mmdb", cache_path=run.cache / "ipgeo.sqlite",
+                          remote=True, remote_url="http://127.0.0.1:9/unreachable", remote_delay=0)
+    resolver.resolve(run.mailing_list["Submitter IP"])
+    resolver.close()
+
+
+def stage_app_page(run):
+    # What app.py computes on a cold dataset: cube, KPIs, charts and the map points
+    dataset = PreparedDataset(run.applications, "bench")
+    cube = dataset.cube
+    job_types = dataset.job_types
+    kpis = page_data.job_kpis(cube, job_types)
+    page_data.popular_job(kpis["job_counts"])
+    page_data.map_points(dataset.location_counts, run.lat_lon, job_types)
+    page_data.top_cities(cube)
+    page_data.monthly_counts(cube, job_types)
+    page_data.job_hourly_density(dataset, job_types)
+    page_data.availability_boxes(dataset.availability_box, job_types)
+
+
+class _KnownIps:
+    # Resolver answering from the locations the ip_geolocation stage found, so the page stage
+    # times the join rather than the lookups
+    def __init__(self, locations):
+        self.locations = locations
+
+    def resolve(self, ips):
+        return {ip: self.locations.get(ip, (None, None)) for ip in ips}
+
+
+def _geolocated_mailing_list(run):
+    # The mailing list with Country and City, through a fresh IP dimension as on a cold start
+    df = run.mailing_list
+    dimension = IpDimension()
+    dimension.extend("mailing_list", df["Submitter IP"], df["Submission Create Date"])
+    dimension.resolve(_KnownIps(run.ip_locations))
+    return page_data.geolocate(df, dimension)
+
+
+def stage_mailing_list_page(run):
+    # What pages/mailing_list.py computes on a cold load with every channel and the full date range
+    rollups = signup_rollups(run.mailing_list)
+    page_data.source_counts(rollups)
+    df = _geolocated_mailing_list(run)
+    channels = list(df[page_data.CHANNEL].unique())
+    start, end = df["Submission Create Date"].min(), df["Submission Create Date"].max()
+    rows = page_data.select_rows(df, channels, start, end)
+    freq = pick_frequency(start, end)
+    page_data.channel_trend(rollups, freq, channels, start, end)
+    page_data.device_share(rollups, channels, start, end)
+    page_data.signup_hourly_density(df, rows)
+    page_data.device_ratio(rollups, channels, start, end)
+    page_data.device_trends(rollups, freq, channels, start, end)
+    page_data.signups_by_country(df)
+    page_data.channel_device_heatmap(rollups, channels, start, end)
+
+
+def stage_messages_page(run):
+    # Near-duplicate clusters from the stored signatures, then the two tables the page shows
+    df = run.messages
+    labels = clusters(from_bytes(df["minhash"]))
+    cluster_summary(labels, df["Message"], df["Submitter IP"], df["Submission Create Date"])
+    sender_summary(labels, df["Submitter IP"], df["Submission Create Date"])
+
+
+def stage_ip_dimension(run):
+    # Every dataset's IPs into one dimension, then the page-side joins and the funnel
+    dimension = IpDimension()
+    frames = {"applications": run.applications, "mailing_list": run.mailing_list, "messages": run.messages}
+    dimension.sync({name: (frame, DATE_COLUMNS[name]) for name, frame in frames.items()})
+    for frame in frames.values():
+        dimension.lookup(frame["Submitter IP"], ["messages_first", "mailing_list_first"])
+    dimension.funnel()
+    dimension.funnel(in_order=True)
+
+
+def stage_snapshot(run):
+    # What `python -m utils.snapshots build` does after ingest, then both pages reading their tables back
+    tables, kpis = snapshot_tables(PreparedDataset(run.applications, "bench"), _geolocated_mailing_list(run))
+    root = run.cache / "snapshots"
+    write_snapshot(tables, kpis, {}, PIPELINE_VERSION, root)
+    manifest = read_manifest(root)
+    for name in APPLICATION_TABLES + MAILING_LIST_TABLES:
+        read_table(name, manifest, root)
+
+
+def stage_filter_reruns(run):
+    # 200 reruns of the mailing-list filters by viewers picking a handful of channel sets, each in its
+    # own order, through a fresh result cache: most reruns should be hits
+    df = run.mailing_list
+    rollups = signup_rollups(df)
+    cache = ResultCache()
+    rng = np.random.default_rng(0)
+    options = list(df["How did you hear about us?"].dropna().unique())
+    selections = [list(rng.choice(options, size=k, replace=False)) for k in (2, 3, 4, 5, len(options))]
+    start, end = df["Submission Create Date"].min(), df["Submission Create Date"].max()
+    for _ in range(200):
+        channels = list(rng.permutation(selections[rng.integers(len(selections))]))
+        key = {"version": "bench", "channels": channels, "dates": date_range(start, end)}
+        cache.get_or_compute("devices", key, lambda: page_data.device_ratio(rollups, channels, start, end))
+        cache.get_or_compute("heatmap", key, lambda: page_data.channel_device_heatmap(rollups, channels, start, end))
+        cache.get_or_compute("rows", key, lambda: page_data.select_rows(df, channels, start, end))
+    assert cache.stats()["hit_rate"] > 0.9
+
+
+STAGES = [
+    ("ingest_applications", stage_ingest_applications),
+    ("ingest_applications_warm", stage_ingest_applications_warm),
+    ("ingest_mailing_list", stage_ingest_mailing_list),
+    ("ingest_messages", stage_ingest_messages),
+    ("parse_addresses", stage_parse_addresses),
+    ("geocode", stage_geocode),
+    ("ip_geolocation", stage_ip_geolocation),
+    ("ip_geolocation_warm", stage_ip_geolocation_warm),
+    ("app_page", stage_app_page),
+    ("mailing_list_page", stage_mailing_list_page),
+    ("messages_page", stage_messages_page),
+    ("ip_dimension", stage_ip_dimension),
+    ("snapshot", stage_snapshot),
+    ("filter_reruns", stage_filter_reruns),
+]
+
+
+def run_size(rows, workdir, seed=0):
+    data_dir = Path(workdir) / f"data-{rows}-{seed}"
+    if not data_dir.exists():
+        # Generated once per size and seed, then reused by later runs
+        tmp = data_dir.with_name(data_dir.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        start = time.perf_counter()
+        write_exports(tmp, rows, seed)
+        tmp.rename(data_dir)
+        print(f"  generated {rows:,} rows per dataset in {time.perf_counter() - start:.1f}s")
+
+    cache_dir = Path(tempfile.mkdtemp(prefix="cadware-bench-", dir=workdir))
+    try:
+        run = Run(data_dir, cache_dir, rows)
+        run.gazetteer = gazetteer_for(run.places)
+        run.raw_addresses = pd.concat(
+            [read_application_export(f)["Address"] for f in sorted((data_dir / "Application").rglob("*.csv"))],
+            ignore_index=True,
+        )
+        results = {}
+        for name, stage in STAGES:
+            _, seconds, peak_mb = measure(lambda: stage(run))
+            results[name] = {"seconds": round(seconds, 4), "peak_mb": None if peak_mb is None else round(peak_mb, 1)}
+        return results
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for stage, now in results.items():
+        before = baseline.get(stage)
+        if not before:
+            continue
+        if now["seconds"] > before["seconds"] * tolerance and now["seconds"] - before["seconds"] > MIN_SECONDS:
+            found.append(f"{stage}: {now['seconds']:.3f}s vs baseline {before['seconds']:.3f}s")
+        if (now["peak_mb"] is not None and before.get("peak_mb") is not None
+                and now["peak_mb"] > before["peak_mb"] * tolerance and now["peak_mb"] - before["peak_mb"] > MIN_MB):
+            found.append(f"{stage}: {now['peak_mb']:.0f} MB vs baseline {before['peak_mb']:.0f} MB")
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10k,100k", help=f"comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown / memory growth factor")
+    parser.add_argument("--workdir", default=".cache/bench", help="where generated exports are kept between runs")
+    parser.add_argument("--update-baselines", action="store_true")
+    args = parser.parse_args(argv)
+
+    Path(args.workdir).mkdir(parents=True, exist_ok=True)
+    baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    failed = []
+    for size in args.sizes.split(","):
+        rows = SIZES[size.strip().lower()]
+        print(f"{rows:,} rows")
+        results = run_size(rows, args.workdir, args.seed)
+        for stage, r in results.items():
+            peak = "n/a" if r["peak_mb"] is None else f"{r['peak_mb']:.0f} MB"
+            print(f"  {stage:<26} {r['seconds']:9.3f}s  peak +{peak}")
+        if args.update_baselines:
+            baselines[str(rows)] = results
+        else:
+            failed += [f"{rows:,} rows, {line}" for line in regressions(results, baselines.get(str(rows), {}), args.tolerance)]
+
+    if args.update_baselines:
+        BASELINES.write_text(json.dumps(baselines, indent=1, sort_keys=True) + "\n")
+        print(f"baselines written to {BASELINES}")
+    if failed:
+        print("regressions:")
+        for line in failed:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""Seeded synthetic form exports with the same folders, file names and columns as the real ones.
+
+python -m benchmarks.synthetic <out dir> <rows> [seed] writes Application/<Role>/*.csv,
+Join Mailing List/*.csv and Send Us a message/*.csv under <out dir>, `rows` rows per dataset.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.gazetteer import Gazetteer
+
+# Role folder -> export file slug; Product Manager's form has no Address field
+ROLES = {
+    "Backend Developer": "back-end-developer",
+    "Content Writer": "content-writer",
+    "Data Scientist": "data-scientist",
+    "Frontend Developer": "front-end-developer",
+    "Product Manager": "product-manager",
+    "UI UX Designer": "uiux-designer",
+}
+NO_ADDRESS_ROLES = {"Product Manager"}
+
+APPLICATION_COLUMNS = [
+    "Title", "Address", "What is your earliest available date", "Submission ID", "Submission Create Date",
+    "Submission Status", "Submission Serial Number", "User Id", "Submitter Device", "Submitter IP",
+    "Submitter Browser", "Source URL", "Submission Admin View URL",
+]
+MAILING_LIST_COLUMNS = [
+    "How did you hear about us?", "Submission ID", "Submission Create Date", "Submission Status", "Source URL",
+    "Submitter Browser", "Submission Admin View URL", "Submission Serial Number", "User Id", "Submitter Device",
+    "Submitter IP",
+]
+MESSAGE_COLUMNS = [
+    "Message", "Submission ID", "Submission Create Date", "Submission Status", "Submission Admin View URL",
+    "Submitter Browser", "Source URL", "Submitter Device", "User Id", "Submission Serial Number", "Submitter IP",
+    "Notes",
+]
+
+TITLES = ["Mr", "Mrs", "Miss", "Ms", "Dr"]
+DEVICES = ["Windows", "Apple", "Android", "iPhone", "Linux"]
+BROWSERS = ["Chrome", "Safari", "Firefox", "Edge", "iPhone", "Yandex"]
+CHANNELS = ["LinkedIn", "Referral", "Online", "Instagram", "Medium", "Handshake", "University Job Fair", "X", None]
+COUNTRIES = [("United Kingdom", "UK", "GB"), ("United States", "US", "US"), ("Nigeria", "NG", "NG"),
+             ("Sri Lanka", "LK", "LK"), ("India", "IN", "IN"), ("Germany", "DE", "DE")]
+MESSAGE_TEMPLATES = [
+    "Hi there\nCheck cadware.house SEO score in under 2 minutes\nhttps://seo-check.example/{n}",
+    "Hi there,\n\nWe run a YouTube growth service, reply to hear more. Ref {n}",
+    "Hello, I'd like to know more about your internship programme. My name is applicant {n}.",
+    "Is the {role} role still open? I applied last week (ID {n}).",
+]
+
+START = pd.Timestamp("2023-01-01")
+SPAN_SECONDS = 3 * 365 * 86400
+# Rows per CSV file; bigger datasets arrive as several dated exports, like the real folders
+ROWS_PER_FILE = 1_000_000
+CHUNK_ROWS = 250_000
+
+
+def places(n_places=2000, seed=0):
+    """Synthetic (city, region, country name, country code, ISO code, lat, lon) the addresses draw from."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n_places):
+        name, code, iso = COUNTRIES[i % len(COUNTRIES)]
+        rows.append((f"Town{i}", f"County{i % 97}", name, code, iso, rng.uniform(-55, 65), rng.uniform(-170, 170)))
+    return pd.DataFrame(rows, columns=["city", "region", "country", "code", "iso", "lat", "lon"])
+
+
+def gazetteer_for(places_df):
+    # Local stand-in for GeoNames covering every synthetic place
+    gazetteer = Gazetteer()
+    for name, _, iso in COUNTRIES:
+        gazetteer.add_country(iso, name)
+    for row in places_df.itertuples():
+        gazetteer.add_city([row.city], row.region, row.iso, row.lat, row.lon)
+    return gazetteer
+
+
+def _ips(rng, pool_size, n):
+    # A fixed pool of addresses, so repeat submitters share IPs like real traffic
+    pool = np.array([f"{a}.{b}.{c}.{d}" for a, b, c, d in rng.integers(1, 255, size=(pool_size, 4))])
+    return pool[rng.integers(0, pool_size, n)]
+
+
+def _dates(rng, n):
+    return START + pd.to_timedelta(np.sort(rng.integers(0, SPAN_SECONDS, n)), unit="s")
+
+
+def _common(rng, n, first_id, form_id, source_url):
+    ids = np.arange(first_id, first_id + n)
+    return {
+        "Submission ID": ids,
+        "Submission Create Date": _dates(rng, n).strftime("%Y-%m-%d %H:%M:%S"),
+        "Submission Status": rng.choice(["unread", "read"], n),
+        "Submission Serial Number": ids - first_id + 1,
+        "User Id": np.zeros(n, dtype=np.int64),
+        "Submitter Device": rng.choice(DEVICES, n),
+        "Submitter Browser": rng.choice(BROWSERS, n),
+        "Source URL": source_url,
+        "Submission Admin View URL": [
+            f"https://cadware.house/wp-admin/admin.php?page=fluent_forms&route=entries&form_id={form_id}#/entries/{i}"
+            for i in ids
+        ],
+    }
+
+
+def application_rows(rng, n, first_id, role, places_df):
+    data = _common(rng, n, first_id, 6, f"https://cadware.house/apply-{ROLES[role]}-application/")
+    submitted = pd.to_datetime(data["Submission Create Date"])
+    place = places_df.iloc[rng.integers(0, len(places_df), n)]
+    data.update({
+        "Title": rng.choice(TITLES, n),
+        "Address": (place["city"] + ", " + place["region"] + ", " + place["country"] + " (" + place["code"] + ")").to_numpy(),
+        "What is your earliest available date": (submitted + pd.to_timedelta(rng.integers(0, 60, n), unit="D")).strftime("%d/%m/%Y"),
+        "Submitter IP": _ips(rng, max(n // 3, 1), n),
+    })
+    columns = [c for c in APPLICATION_COLUMNS if not (role in NO_ADDRESS_ROLES and c == "Address")]
+    return pd.DataFrame(data)[columns]
+
+
+def mailing_list_rows(rng, n, first_id):
+    data = _common(rng, n, first_id, 3, "https://cadware.house/careers/")
+    data.update({
+        "How did you hear about us?": rng.choice(np.array(CHANNELS, dtype=object), n),
+        "Submitter IP": _ips(rng, max(n // 2, 1), n),
+    })
+    return pd.DataFrame(data)[MAILING_LIST_COLUMNS]
+
+
+def message_rows(rng, n, first_id):
+    data = _common(rng, n, first_id, 1, "https://cadware.house/contact/")
+    templates = rng.integers(0, len(MESSAGE_TEMPLATES), n)
+    roles = rng.choice(list(ROLES), n)
+    data.update({
+        "Message": [MESSAGE_TEMPLATES[t].format(n=i, role=r) for t, i, r in zip(templates, data["Submission ID"], roles)],
+        "Submitter IP": _ips(rng, max(n // 2, 1), n),
+        "Notes": np.nan,
+    })
+    return pd.DataFrame(data)[MESSAGE_COLUMNS]
+
+
+def _write(path, make_rows, n, rng, first_id=1):
+    # Written in chunks so 10M-row datasets never sit in memory at once
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    while written < n:
+        rows = make_rows(rng, min(CHUNK_ROWS, n - written), first_id + written)
+        rows.to_csv(path, mode="a" if written else "w", header=not written, index=False)
+        written += len(rows)
+
+
+def _split(n, parts):
+    return [n // parts + (i < n % parts) for i in range(parts)]
+
+
+def _export_name(prefix, i):
+    # One dated export per file, a day apart, like the daily downloads
+    return f"{prefix}-{(pd.Timestamp('2025-07-21') + pd.Timedelta(days=i)):%Y-%m-%d}.csv"
+
+
+def read_application_export(file):
+    """One application export read with plain pandas, as the dashboard did before the Arrow reader."""
+    df = pd.read_csv(file)
+    df["job_type"] = file.stem.split("-application")[0]
+    # Some forms (e.g. Product Manager) don't ask for an address
+    if "Address" not in df:
+        df["Address"] = None
+    return df
+
+
+def write_exports(root, rows, seed=0, rows_per_file=ROWS_PER_FILE):
+    """Write `rows` applications, mailing-list sign-ups and messages under `root`; returns the places used."""
+    root = Path(root)
+    rng = np.random.default_rng(seed)
+    places_df = places(seed=seed)
+
+    first_id = 1
+    for role, n in zip(ROLES, _split(rows, len(ROLES))):
+        slug = ROLES[role]
+        for i, part in enumerate(_split(n, max(1, -(-n // rows_per_file)))):
+            path = root / "Application" / role / _export_name(f"{slug}-application", i)
+            _write(path, lambda r, k, fid: application_rows(r, k, fid, role, places_df), part, rng, first_id)
+            first_id += part
+
+    for name, folder, make_rows in [
+        ("join-our-mailing-list", "Join Mailing List", mailing_list_rows),
+        ("send-us-a-message", "Send Us a message", message_rows),
+    ]:
+        first_id = 1
+        for i, part in enumerate(_split(rows, max(1, -(-rows // rows_per_file)))):
+            _write(root / folder / _export_name(name, i), make_rows, part, rng, first_id)
+            first_id += part
+    return places_df
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print("usage: python -m benchmarks.synthetic <out dir> <rows> [seed]")
+        sys.exit(1)
+    write_exports(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]) if len(sys.argv) == 4 else 0)
@@ -0,0 +1,68 @@
+"""Figure payload and build time for "Sign-ups by Channel Over Time", before and after the time-series layer.
+
+Run from the repo root: python -m benchmarks.timeseries_benchmark
+"Before" is the old page code: daily pd.Grouper over the rows, every point sent to Plotly.
+"After" is Rollups + pick_frequency + LTTB. Build time covers the aggregation, px.line and
+serialising the figure to JSON (what Streamlit ships); browser render time scales with the
+number of points, which is reported alongside.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from utils.timeseries import Rollups, downsample, pick_frequency
+
+CHANNEL = "How did you hear about us?"
+CHANNELS = ["LinkedIn", "Referral", "Online", "Instagram", "Medium", "Handshake", "University Job Fair", "X"]
+
+
+def synthetic_signups(n, years, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2020-01-01")
+    seconds = rng.integers(0, int(years * 365.25 * 86400), n)
+    return pd.DataFrame({
+        "Submission Create Date": start + pd.to_timedelta(seconds, unit="s"),
+        CHANNEL: pd.Categorical(rng.choice(CHANNELS, n)),
+    })
+
+
+def before(df):
+    channel_time = df.groupby([pd.Grouper(key="Submission Create Date", freq="D"), CHANNEL], observed=True).size().reset_index(name="Count")
+    return px.line(channel_time, x="Submission Create Date", y="Count", color=CHANNEL, markers=True)
+
+
+def after(df, rollups, freq=None):
+    dates = df["Submission Create Date"]
+    freq = freq or pick_frequency(dates.min(), dates.max())
+    channel_time = rollups.counts(freq, CHANNEL).rename(columns={"date": "Submission Create Date", "count": "Count"})
+    channel_time = downsample(channel_time, "Submission Create Date", "Count", series=CHANNEL)
+    return px.line(channel_time, x="Submission Create Date", y="Count", color=CHANNEL, markers=True)
+
+
+def measure(build):
+    start = time.perf_counter()
+    fig = build()
+    payload = fig.to_json()
+    elapsed = time.perf_counter() - start
+    points = sum(len(trace.x) for trace in fig.data)
+    return len(payload), points, elapsed
+
+
+if __name__ == "__main__":
+    px.line(x=[0], y=[0]).to_json()  # plotly's first figure pays for its imports
+    for n, years in [(10_000, 1), (100_000, 3), (1_000_000, 5)]:
+        df = synthetic_signups(n, years)
+        build_start = time.perf_counter()
+        rollups = Rollups(df["Submission Create Date"], df[[CHANNEL]])
+        rollup_s = time.perf_counter() - build_start
+
+        results = {
+            "before": measure(lambda: before(df)),
+            "after (auto)": measure(lambda: after(df, rollups)),
+            "after (daily)": measure(lambda: after(df, rollups, "D")),
+        }
+        print(f"n={n:,}, {years} year(s); rollups built once in {rollup_s * 1e3:.0f} ms")
+        for name, (size, points, elapsed) in results.items():
+            print(f"  {name:<14} {size / 1024:9.1f} KiB  {points:6,} points  {elapsed * 1e3:8.1f} ms")
@@ -1,18 +1,25 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.express as px
-import geoip2.database
-import requests
-import time
-from scipy.stats import gaussian_kde
+from utils import timing
+from utils import page_data
+from utils.viewer import raw_data_viewer
+from utils.timeseries import FREQUENCIES, FREQUENCY_LABELS, PERIOD_NAMES, Rollups, pick_frequency
+from utils.snapshots import MAILING_LIST_TABLES, latest_snapshot, read_table
+from utils.result_cache import cached, date_range
+from utils.data_processor import get_ip_dimension, get_ip_resolver, get_mailing_list, signup_rollups, start_export_watcher
+from utils.geometry import DEFAULT_LEVEL, LEVELS, load_country_geometry, subset_geometry
 
 
+# Per-section timings for this rerun (only recorded with CADWARE_TIMING=1)
+timing.start_rerun("mailing_list")
+
 st.set_page_config(page_title="Mailing List Insights", layout="wide", menu_items=None)
 
 st.sidebar.title("Navigation")
 st.sidebar.page_link("app.py", label="Job Stats")
 st.sidebar.page_link("pages/mailing_list.py", label="Mailing list Stats")
+st.sidebar.page_link("pages/messages.py", label="Contact Messages")
 
 # -------------------
 # Load Data
@@ -21,25 +28,36 @@ st.sidebar.page_link("pages/mailing_list.py", label="Mailing list Stats")
 
 st.title("📊 Mailing List Insights Dashboard")
 
-@st.cache_data
-def load_data():
-    df = pd.read_csv("Join Mailing List/join-our-mailing-list-2025-07-21.csv")
-    df['Submission Create Date'] = pd.to_datetime(df['Submission Create Date'])
-    return df
-
-df = load_data()
-
-# -------------------
-# Pre-processing Data
-# -------------------
-df = df.drop(columns = ['Submission ID', 'Submitter Browser', 'User Id', 'Submission Status','Submission Admin View URL', 'Source URL', 'Submission Serial Number'])
-df['How did you hear about us?'] = df['How did you hear about us?'].fillna(value="Online")
-
+timing.section("mailing.load")
+# Every export in Join Mailing List/, deduplicated on Submission ID and pre-processed once at ingest
+# (see derive_mailing_list); new exports show up on the next rerun
+start_export_watcher()
+# In snapshot mode (CADWARE_SNAPSHOTS=1) every chart reads the tables of the latest
+# `python -m utils.snapshots build`: no ingest or IP lookups unless someone asks for the raw rows
+snapshot = latest_snapshot(MAILING_LIST_TABLES)
+if snapshot is None:
+    df, data_version = get_mailing_list()
+else:
+    df = None
+    data_version = snapshot['version']
+    st.caption(f"Charts from snapshot {snapshot['version']}, built {snapshot['created_at']}")
+
+timing.section("mailing.rollups")
+# Daily counts per channel and device, rolled up to W/M/Q on demand; rebuilt only when the data changes
+@st.cache_resource(max_entries=2)
+def get_signup_rollups(_df, data_version):
+    return signup_rollups(_df)
+
+if snapshot is None:
+    rollups = get_signup_rollups(df, data_version)
+else:
+    rollups = Rollups.from_daily(read_table("mailing_list_daily", snapshot))
+
+timing.section("mailing.source_metrics")
 # -------------------
 # Count sign-ups per source
 # -------------------
-source_counts = df['How did you hear about us?'].value_counts().reset_index()
-source_counts.columns = ['Source', 'Count']
+source_counts = cached("mailing.sources", {'version': data_version}, lambda: page_data.source_counts(rollups))
 total_count = source_counts['Count'].sum()
 
 # -------------------
@@ -61,116 +79,101 @@ for idx, row in source_counts.iterrows():
 # -------------------
 # Optional: Geolocate IPs (requires GeoLite2 database)
 # -------------------
-@st.cache_data
-def geolocate(df):
-    try:
-        reader = geoip2.database.Reader('utils/assets/GeoLite2-City.mmdb')
-    except FileNotFoundError:
-        st.warning("GeoLite2 database not found. Skipping geolocation.")
-        df['Country'] = None
-        df['City'] = None
-        return df
-
-    countries = []
-    cities = []
-
-    def fallback_api(ip):
-        try:
-            res = requests.get(f"http://ip-api.com/json/{ip}?fields=status,country,city", timeout=5).json()
-            if res.get("status") == "success":
-                return res.get("country"), res.get("city")
-            else:
-                return None, None
-        except:
-            return None, None
-
-    for ip in df['Submitter IP']:
-        try:
-            response = reader.city(ip)
-            country = response.country.name
-            city = response.city.name
-            if not country or not city:
-                # fallback if missing info
-                country, city = fallback_api(ip)
-        except:
-            country, city = fallback_api(ip)
-
-        countries.append(country)
-        cities.append(city)
-        # to be polite with public API limits
-        time.sleep(0.1)  # 100ms pause
-
-    df['Country'] = countries
-    df['City'] = cities
-
-    reader.close()
-    return df
-
-df = geolocate(df)
-
+timing.section("mailing.geolocate")
+# In snapshot mode the country counts were geolocated when the snapshot was built
+if snapshot is None:
+    resolver = get_ip_resolver()
+    if resolver.reader is None and resolver.remote:
+        st.warning("GeoLite2 database not found. Falling back to cached and ip-api.com lookups.")
+    elif resolver.reader is None:
+        st.warning("GeoLite2 database not found. Skipping geolocation (set CADWARE_IP_REMOTE=1 to look IPs up on ip-api.com).")
+    # Each distinct IP is resolved once per process, whichever page sees it first
+    ip_dimension = get_ip_dimension()
+    ip_dimension.resolve(resolver, df['Submitter IP'])
+    # Keyed on the data and IP-dimension versions rather than hashing the whole frame on every rerun
+    geo_key = {'version': data_version, 'ip_dimension': ip_dimension.version}
+    df = cached("mailing.geolocate", geo_key, lambda: page_data.geolocate(df, ip_dimension))
+    ip_stats = resolver.stats
+    st.caption(f"IP geolocation: {ip_stats['ips']} IPs at {ip_stats['ips_per_second']:,.0f} IPs/s "
+               f"({ip_stats['cache_hits']} cached, {ip_stats['mmdb_hits']} GeoLite2, {ip_stats['remote']} remote)")
+
+timing.section("mailing.filters")
 # -------------------
 # Filters
 # -------------------
-channels = st.multiselect("Channel", options=df['How did you hear about us?'].unique(), default=df['How did you hear about us?'].unique())
-date_range = st.date_input("Date Range", [df['Submission Create Date'].min(), df['Submission Create Date'].max()])
+channel_options = list(source_counts['Source'])
+channels = st.multiselect("Channel", options=channel_options, default=channel_options)
+dates = st.date_input("Date Range", [rollups.start, rollups.end])
+
+range_start = pd.to_datetime(dates[0])
+range_end = pd.to_datetime(dates[-1])
+
+# Results below are shared across sessions through the result cache: the same channels in any order
+# over the same days, picked by any viewer, reuse one computation per data version
+filter_key = {'channels': channels, 'dates': date_range(range_start, range_end), 'version': data_version}
 
-filtered_df = df[
-    (df['How did you hear about us?'].isin(channels)) &
-    (df['Submission Create Date'].between(pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])))
-]
+def selected_rows(df, version):
+    # The end date is inclusive: keep everything up to midnight at the end of that day
+    return cached("mailing.rows", {**filter_key, 'version': version},
+                  lambda: page_data.select_rows(df, channels, range_start, range_end))
 
+resolution = st.selectbox("Time resolution", ["Auto"] + [FREQUENCY_LABELS[f] for f in FREQUENCIES])
+if resolution == "Auto":
+    freq = pick_frequency(range_start, range_end)
+else:
+    freq = next(f for f in FREQUENCIES if FREQUENCY_LABELS[f] == resolution)
+
+timing.section("mailing.channel_chart")
 # -------------------
 # Channel Performance
 # -------------------
 st.subheader("Sign-ups by Channel Over Time")
-channel_time = filtered_df.groupby([pd.Grouper(key='Submission Create Date', freq='D'), 'How did you hear about us?']).size().reset_index(name='Count')
-fig1 = px.line(channel_time, x='Submission Create Date', y='Count', color='How did you hear about us?', markers=True)
+channel_time = cached("mailing.channel_trend", {**filter_key, 'freq': freq},
+                      lambda: page_data.channel_trend(rollups, freq, channels, range_start, range_end))
+fig1 = px.line(channel_time, x='Submission Create Date', y='Count', color='How did you hear about us?', markers=True,
+               labels={'Submission Create Date': PERIOD_NAMES[freq]})
 st.plotly_chart(fig1, use_container_width=True)
 
+timing.section("mailing.device_pie")
 # -------------------
 # Device Distribution
 # -------------------
 st.subheader("Device Type Distribution")
-fig2 = px.pie(filtered_df, names='Submitter Device', title='Device Share')
+device_share = cached("mailing.device_share", filter_key,
+                      lambda: page_data.device_share(rollups, channels, range_start, range_end))
+fig2 = px.pie(device_share, values='count', names='Submitter Device', title='Device Share')
 st.plotly_chart(fig2, use_container_width=True)
 
+timing.section("mailing.hourly_kde")
 # -------------------
 # Hourly distribution pattern
 # -------------------
 st.subheader("Hourly Sign-up Patterns")
 
-# Extract hours
-hours = filtered_df['Submission Create Date'].dt.hour.values
+# Binned KDE of the selected sign-ups' hours that wraps around midnight; bw_factor controls smoothness as bw_method did
+def hourly_density():
+    if snapshot is None:
+        return page_data.signup_hourly_density(df, selected_rows(df, data_version))
+    # Same curve from the snapshot's sign-ups per channel, day and hour
+    hour_rollups = Rollups.from_daily(read_table("mailing_list_hourly", snapshot))
+    return page_data.signup_hourly_density_from_rollups(hour_rollups, channels, range_start, range_end)
 
-# KDE calculation
-kde = gaussian_kde(hours, bw_method=0.3)  # bw_method controls smoothness
-x_grid = np.linspace(0, 23, 200)  # fine grid for smooth line
-kde_values = kde(x_grid)
+x_grid, kde_values = cached("mailing.hourly_kde", filter_key, hourly_density)
 
 # Plot
 fig_kde = px.line(x=x_grid, y=kde_values, labels={'x': 'Hour of Day', 'y': 'Density'}, title="KDE of Sign-ups by Hour")
-fig_kde.update_layout(xaxis=dict(tickmode='linear', tick0=0, dtick=1))
+fig_kde.update_layout(xaxis=dict(tickmode='linear', tick0=0, dtick=1, range=[0, 24]))
 
 st.plotly_chart(fig_kde, use_container_width=True)
 
+timing.section("mailing.device_ratio")
 # -------------------
 # Mobile vs Desktop Ratio
 # -------------------
 st.subheader("Mobile vs Desktop Sign-up Ratio")
 
-# Map devices to categories
-def device_type(device):
-    if device in ['Android', 'iPhone']:
-        return 'Mobile'
-    elif device in ['Windows', 'Apple']:
-        return 'Desktop'
-    else:
-        return 'Other'
-
-filtered_df['Device Type'] = filtered_df['Submitter Device'].apply(device_type)
-
-device_counts = filtered_df['Device Type'].value_counts().reset_index()
-device_counts.columns = ['Device Type', 'Count']
+device_counts = cached("mailing.device_ratio", filter_key,
+                       lambda: page_data.device_ratio(rollups, channels, range_start, range_end))
 
 # Visualize
 fig = px.pie(device_counts, values='Count', names='Device Type', title="Mobile vs Desktop Sign-ups", color='Device Type',
@@ -178,62 +181,46 @@ fig = px.pie(device_counts, values='Count', names='Device Type', title="Mobile v
 
 st.plotly_chart(fig, use_container_width=True)
 
+timing.section("mailing.device_trends")
 # -------------------
 # Device trends over time 
 # -------------------
 
 st.header("Device Trends Over Time (Mobile vs Desktop)")
 
-# Map device types as before
-filtered_df['Device Type'] = filtered_df['Submitter Device'].apply(device_type)
-
-# Group by date and device type
-device_time = (
-    filtered_df.groupby([pd.Grouper(key='Submission Create Date', freq='D'), 'Device Type'])
-    .size()
-    .reset_index(name='Count')
-)
-
-# Pivot so columns are Device Types
-device_pivot = device_time.pivot(index='Submission Create Date', columns='Device Type', values='Count').fillna(0)
-
-# Calculate total sign-ups per day
-device_pivot['Total'] = device_pivot.sum(axis=1)
-
-# Calculate percentage share
-device_pivot['Mobile Share'] = device_pivot.get('Mobile', 0) / device_pivot['Total'] * 100
-device_pivot['Desktop Share'] = device_pivot.get('Desktop', 0) / device_pivot['Total'] * 100
-
-# Prepare data for plotting
-plot_df = device_pivot.reset_index()
+# Mobile and Desktop share per bucket, from the same rollups as the channel chart
+plot_df = cached("mailing.device_trends", {**filter_key, 'freq': freq},
+                 lambda: page_data.device_trends(rollups, freq, channels, range_start, range_end))
 
 fig = px.line(
     plot_df,
     x='Submission Create Date',
-    y=['Mobile Share', 'Desktop Share'],
-    labels={'value': 'Percentage (%)', 'Submission Create Date': 'Date', 'variable': 'Device Type'},
+    y='value',
+    color='variable',
+    labels={'value': 'Percentage (%)', 'Submission Create Date': PERIOD_NAMES[freq], 'variable': 'Device Type'},
     title='Mobile vs Desktop Sign-up Share Over Time'
 )
 
 st.plotly_chart(fig, use_container_width=True)
 
+timing.section("mailing.country_map")
 # -------------------
 # Signups by Country
 # -------------------
 st.header("Signups by Country")
-# Load GeoJSON for countries (Natural Earth or similar)
-geojson_url = "https://raw.githubusercontent.com/johan/world.geo.json/master/countries.geo.json"
-geojson = requests.get(geojson_url).json()
+# Bundled, pre-simplified Natural Earth outlines; names already match GeoLite2 / ip-api
+map_detail = st.select_slider("Map detail", options=list(LEVELS), value=DEFAULT_LEVEL)
+countries_geojson = load_country_geometry(map_detail)
 
-country_counts = df.groupby('Country').size().reset_index(name='Count')
-country_counts['Country'] = country_counts['Country'].replace({
-    "United States": "United States of America",
-})
+if snapshot is None:
+    country_counts = cached("mailing.countries", geo_key, lambda: page_data.signups_by_country(df))
+else:
+    country_counts = read_table("signups_by_country", snapshot)
 
 # Create the map
 fig4 = px.choropleth_mapbox(
     country_counts,
-    geojson=geojson,
+    geojson=subset_geometry(countries_geojson, country_counts['Country']),
     locations='Country',          # column in your DataFrame
     featureidkey='properties.name',  # path to country name in GeoJSON
     color='Count',
@@ -247,16 +234,27 @@ fig4 = px.choropleth_mapbox(
 
 st.plotly_chart(fig4, use_container_width=True)
 
+timing.section("mailing.heatmap")
 # -------------------
 # Channel vs Device Heatmap
 # -------------------
 st.subheader("Channel vs Device")
-heatmap_data = filtered_df.groupby(['How did you hear about us?', 'Submitter Device']).size().reset_index(name='Count')
+heatmap_data = cached("mailing.heatmap", filter_key,
+                      lambda: page_data.channel_device_heatmap(rollups, channels, range_start, range_end))
 fig5 = px.density_heatmap(heatmap_data, x="How did you hear about us?", y="Submitter Device", z="Count", color_continuous_scale="Blues")
 st.plotly_chart(fig5, use_container_width=True)
 
+timing.section("mailing.raw_data")
 # -------------------
 # Raw Data Preview
 # -------------------
+# Paged server-side: only the visible page is serialised, however many sign-ups match
 with st.expander("View Raw Data"):
-    st.dataframe(filtered_df)
+    if snapshot is None:
+        raw_data_viewer(df, key="mailing_raw", rows=selected_rows(df, data_version))
+    elif st.toggle("Load rows", key="mailing_raw_load"):
+        # The rows as ingested, without the Country and City the live page adds
+        rows_df, rows_version = get_mailing_list()
+        raw_data_viewer(rows_df, key="mailing_raw", rows=selected_rows(rows_df, rows_version))
+
+timing.render_debug_panel(timing.end_rerun())
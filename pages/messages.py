@@ -0,0 +1,132 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.express as px
+from utils import timing
+from utils.viewer import raw_data_viewer
+from utils.minhash import THRESHOLD, cluster_summary, clusters, from_bytes, sender_summary
+from utils.timeseries import PERIOD_NAMES, Rollups, downsample, pick_frequency
+from utils.result_cache import cached
+from utils.data_processor import get_ip_dimension, get_ip_resolver, get_messages, start_export_watcher
+
+
+# Per-section timings for this rerun (only recorded with CADWARE_TIMING=1)
+timing.start_rerun("messages")
+
+st.set_page_config(page_title="Contact Messages", layout="wide", menu_items=None)
+
+st.sidebar.title("Navigation")
+st.sidebar.page_link("app.py", label="Job Stats")
+st.sidebar.page_link("pages/mailing_list.py", label="Mailing list Stats")
+st.sidebar.page_link("pages/messages.py", label="Contact Messages")
+
+st.title("✉️ Contact Messages")
+
+timing.section("messages.load")
+# Every export in Send Us a message/, deduplicated on Submission ID; MinHash signatures are
+# computed once per message at ingest (see derive_messages)
+start_export_watcher()
+df, messages_version = get_messages()
+
+if df.empty:
+    st.info("No contact messages yet.")
+    timing.render_debug_panel(timing.end_rerun())
+    st.stop()
+
+# The raw signature bytes aren't worth showing in the tables
+viewer_columns = [c for c in df.columns if c != 'minhash']
+
+# -------------------
+# Near-duplicate clusters
+# -------------------
+similarity = st.slider("Near-duplicate similarity", min_value=0.3, max_value=0.95, value=THRESHOLD, step=0.05,
+                       help="Estimated share of overlapping 5-character shingles for two messages to be grouped")
+
+# LSH buckets on the stored signatures: no pairwise comparison, rebuilt only when the data or threshold
+# changes, and shared with every other session through the bounded result cache
+cluster_key = {'version': messages_version, 'threshold': round(similarity, 4)}
+
+timing.section("messages.clusters")
+labels = cached("messages.clusters", cluster_key, lambda: clusters(from_bytes(df['minhash']), similarity))
+sizes = np.bincount(labels)
+templated = sizes[labels] > 1
+
+timing.section("messages.kpis")
+repeat_senders = df['Submitter IP'].value_counts()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Messages", f"{len(df):,}")
+col2.metric("Near-duplicates", f"{int(templated.sum()):,}", delta=f"{templated.mean() * 100:.1f}% of total",
+            delta_color="off")
+col3.metric("Duplicate clusters", f"{int((sizes > 1).sum()):,}")
+col4.metric("Repeat senders", f"{int((repeat_senders > 1).sum()):,}")
+
+timing.section("messages.trend")
+# -------------------
+# Templated vs one-off messages over time
+# -------------------
+st.subheader("Messages Over Time")
+dates = df['Submission Create Date']
+freq = pick_frequency(dates.min(), dates.max())
+
+def message_trend():
+    kind = pd.Series(np.where(templated, 'Near-duplicate', 'One-off'), index=df.index)
+    rollups = Rollups(dates, pd.DataFrame({'Kind': kind}))
+    trend = rollups.counts(freq, 'Kind').rename(columns={'date': 'Submission Create Date', 'count': 'Count'})
+    return downsample(trend, 'Submission Create Date', 'Count', series='Kind')
+
+trend = cached("messages.trend", cluster_key, message_trend)
+fig = px.line(trend, x='Submission Create Date', y='Count', color='Kind', markers=True,
+              labels={'Submission Create Date': PERIOD_NAMES[freq]},
+              color_discrete_map={'Near-duplicate': 'indianred', 'One-off': 'steelblue'})
+st.plotly_chart(fig, use_container_width=True)
+
+timing.section("messages.cluster_table")
+# -------------------
+# Largest clusters
+# -------------------
+st.subheader("Largest Near-duplicate Clusters")
+summary = cached("messages.cluster_summary", cluster_key, lambda: (
+    cluster_summary(labels, df['Message'], df['Submitter IP'], dates).query('messages > 1')
+))
+st.dataframe(summary.head(100), use_container_width=True)
+
+if len(summary):
+    cluster = st.selectbox(
+        "Show messages in cluster", summary.index[:100],
+        format_func=lambda c: f"#{c}: {summary.at[c, 'messages']} messages - {summary.at[c, 'example'][:60]}",
+    )
+    raw_data_viewer(df, key="messages_cluster", rows=labels == cluster, columns=viewer_columns,
+                    default_columns=['Message', 'Submission Create Date', 'Submitter IP'])
+
+timing.section("messages.senders")
+# -------------------
+# Repeat senders
+# -------------------
+st.subheader("Repeat Senders")
+# Geo for each sender from the IP dimension shared with the other pages; each IP is resolved once per process
+ip_dimension = get_ip_dimension()
+senders = cached("messages.senders", cluster_key, lambda: sender_summary(labels, df['Submitter IP'], dates, sizes).head(100))
+ip_dimension.resolve(get_ip_resolver(), senders.index.to_series())
+senders = senders.join(ip_dimension.table[['country', 'city']])
+st.dataframe(senders, use_container_width=True)
+
+timing.section("messages.funnel")
+# -------------------
+# Message -> mailing list -> application funnel
+# -------------------
+st.subheader("Contact Funnel by Submitter IP")
+in_order = st.checkbox("Only count steps taken in order", value=False,
+                       help="Each step must happen after the first visit to the step before it")
+funnel = cached("messages.funnel", {'ip_dimension': ip_dimension.version, 'in_order': in_order},
+                lambda: ip_dimension.funnel(in_order))
+fig_funnel = px.funnel(funnel, x='IPs', y='Step')
+st.plotly_chart(fig_funnel, use_container_width=True)
+
+timing.section("messages.raw_data")
+# -------------------
+# Raw Data Preview
+# -------------------
+with st.expander("View Raw Data"):
+    raw_data_viewer(df, key="messages_raw", columns=viewer_columns)
+
+timing.render_debug_panel(timing.end_rerun())
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from utils import page_data
+from utils.cube import CUBE_DIMENSIONS, build_cube, cube_counts, cube_total, merge_cubes
+from utils.schema import APPLICATION_CATEGORIES, compact
+
+
+def applications(rows):
+    # (job_type, gender, City, Country, submitted, available) per applicant, compacted like derive_applications
+    frame = pd.DataFrame(rows, columns=["job_type", "gender", "City", "Country", "Submission Date", "Earliest Available Date"])
+    frame["Submission Date"] = pd.to_datetime(frame["Submission Date"])
+    frame["Earliest Available Date"] = pd.to_datetime(frame["Earliest Available Date"])
+    frame["submit_year"] = frame["Submission Date"].dt.year
+    frame["submit_month"] = frame["Submission Date"].dt.month_name()
+    frame["submit_time_of_day"] = np.where(frame["Submission Date"].dt.hour < 12, "Morning", "Afternoon")
+    return compact(frame, APPLICATION_CATEGORIES)
+
+
+FIRST = applications([
+    ("data-scientist", "Female", "Colombo", "Sri Lanka", "2024-01-01 09:00", "2024-01-05"),
+    ("data-scientist", "Male", None, None, "2024-01-02 15:00", "2024-02-20"),
+    ("web-developer", None, "London", "United Kingdom", "2024-02-03 10:00", None),
+    ("web-developer", "Female", "London", "United Kingdom", "2024-02-03 16:00", "2024-02-04"),
+    ("designer", "Male", "Galle", "Sri Lanka", "2023-12-30 08:00", "2024-01-12"),
+])
+# New job type, city, country and gender value the first export never saw
+SECOND = applications([
+    ("ux-researcher", "Non-binary", "Lagos", "Nigeria", "2024-03-01 11:00", "2024-03-02"),
+    ("data-scientist", "Female", "London", "United Kingdom", "2024-03-02 13:00", "2024-03-20"),
+    ("designer", None, None, None, "2024-03-03 09:30", None),
+])
+
+
+def all_rows(*frames):
+    # Plain concatenation with the categoricals as objects, so nothing depends on append_frames
+    return pd.concat([frame.astype({c: object for c in CUBE_DIMENSIONS if c in frame}) for frame in frames],
+                     ignore_index=True)
+
+
+def sorted_cells(cube):
+    cells = cube.astype({d: object for d in CUBE_DIMENSIONS})
+    return cells.sort_values(CUBE_DIMENSIONS, na_position="last", ignore_index=True)[CUBE_DIMENSIONS + ["count"]]
+
+
+def test_job_kpis_match_row_counts():
+    cube = build_cube(FIRST)
+    days = (FIRST["Earliest Available Date"] - FIRST["Submission Date"]).dt.days
+    for job_types in (["data-scientist", "web-developer", "designer"], ["web-developer"], []):
+        rows = FIRST["job_type"].isin(job_types)
+        kpis = page_data.job_kpis(cube, job_types)
+        assert kpis["total"] == rows.sum()
+        assert kpis["female"] == (rows & (FIRST["gender"] == "Female")).sum()
+        assert kpis["male"] == (rows & (FIRST["gender"] == "Male")).sum()
+        assert kpis["within_a_week"] == (rows & (days <= 7)).sum()
+        expected = FIRST.loc[rows, "job_type"].astype(str).value_counts()
+        assert kpis["job_counts"].astype(int).to_dict() == expected.to_dict()
+
+
+def test_applicants_without_city_or_gender_still_count():
+    cube = build_cube(FIRST)
+    assert cube_total(cube) == len(FIRST)
+    assert cube_total(cube, {"availability_bucket": ["Unknown"]}) == 1
+    assert cube_counts(cube, "City").to_dict() == {"London": 2, "Colombo": 1, "Galle": 1}
+
+
+def test_merged_cube_equals_cube_of_all_rows():
+    merged = merge_cubes(build_cube(FIRST), build_cube(SECOND))
+    rebuilt = build_cube(all_rows(FIRST, SECOND))
+    pd.testing.assert_frame_equal(sorted_cells(merged), sorted_cells(rebuilt), check_dtype=False)
+    assert isinstance(merged["job_type"].dtype, pd.CategoricalDtype)
+    assert cube_total(merged, {"job_type": ["ux-researcher"]}) == 1
+    assert cube_counts(merged, "City").to_dict() == {"London": 3, "Colombo": 1, "Galle": 1, "Lagos": 1}
@@ -0,0 +1,22 @@
+import pandas as pd
+
+from utils.data_processor import parse_addresses
+
+
+def test_parse_addresses_splits_city_region_and_country():
+    addresses = pd.Series([
+        "Leeds, West Yorkshire, United Kingdom",
+        "Colombo, Sri Lanka",
+        " Lagos, Lagos State, Nigeria (NG) ",
+        None,
+        "Colombo, Sri Lanka",
+    ])
+    parsed = parse_addresses(addresses)
+    assert parsed["City"].tolist() == ["Leeds", "Colombo", "Lagos", None, "Colombo"]
+    assert parsed["State/Region"].isna().tolist() == [False, True, False, True, True]
+    assert parsed["State/Region"][[0, 2]].tolist() == ["West Yorkshire", "Lagos State"]
+    assert parsed["Country"].tolist()[:3] == ["United Kingdom", "Sri Lanka", "NG"]
+    assert parsed["location"].tolist()[:3] == [
+        "Leeds, West Yorkshire, United Kingdom", "Colombo, Sri Lanka", "Lagos, Lagos State, NG",
+    ]
+    assert parsed.iloc[3].isna().all()
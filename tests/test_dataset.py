@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from tests.test_cube import FIRST, SECOND, all_rows, sorted_cells
+from utils import dataset as dataset_module
+from utils.cube import build_cube
+from utils.dataset import PreparedDataset
+from utils.ingest import append_frames
+
+
+def dataset():
+    frame = pd.DataFrame({
+        "Submission Date": pd.to_datetime(["2024-01-01 09:00", "2024-01-02 15:00", "2024-01-03 11:00"]),
+        "Earliest Available Date": pd.to_datetime(["2024-01-05", "2024-01-02", "2024-02-03"]),
+        "job_type": ["Data Scientist", "Engineer", "Data Scientist"],
+        "Score": np.array([1.0, 2.0, 3.0]),
+    })
+    return PreparedDataset(frame, data_version=1)
+
+
+def test_columns_share_the_base_data():
+    data = dataset()
+    view = data.columns("Score", "availability_days")
+    assert np.shares_memory(view["Score"].to_numpy(), data.frame["Score"].to_numpy())
+    assert view["availability_days"].tolist() == [3, -1, 30]
+
+
+def test_memoised_properties_compute_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(dataset_module, "build_cube", lambda frame: calls.append(1) or build_cube(frame))
+    data = PreparedDataset(FIRST, data_version=1)
+    assert data.cube is data.cube
+    assert data.availability_days is data.availability_days
+    assert data.job_types is data.job_types
+    assert len(calls) == 1
+
+
+def test_extend_merges_the_aggregates_already_built(monkeypatch):
+    first = PreparedDataset(FIRST, data_version=1)
+    # As the pages would have, before the next export arrives
+    first.cube, first.availability_sketches
+    built = []
+    monkeypatch.setattr(dataset_module, "build_cube", lambda frame: built.append(len(frame)) or build_cube(frame))
+
+    extended = first.extend(append_frames(FIRST, SECOND), SECOND, data_version=2)
+    # Only the new rows were counted; the first cube was merged rather than rebuilt
+    assert built == [len(SECOND)]
+    assert set(extended._memo) == {"cube", "availability_sketches"}
+    rebuilt = build_cube(all_rows(FIRST, SECOND))
+    pd.testing.assert_frame_equal(sorted_cells(extended.cube), sorted_cells(rebuilt), check_dtype=False)
+    sketches = extended.availability_sketches
+    assert {job: len(sketch) for job, sketch in sketches.items()} == {
+        "data-scientist": 3, "designer": 1, "ux-researcher": 1, "web-developer": 1,
+    }
+    # The first dataset's aggregates are left as they were
+    assert len(first.availability_sketches["data-scientist"]) == 2
+
+
+def test_extend_skips_aggregates_nobody_asked_for():
+    first = PreparedDataset(FIRST, data_version=1)
+    extended = first.extend(append_frames(FIRST, SECOND), SECOND, data_version=2)
+    assert extended._memo == {}
+    assert extended.cube["count"].sum() == len(FIRST) + len(SECOND)
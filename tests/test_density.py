@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from scipy.stats import gaussian_kde
+
+from benchmarks.density_benchmark import BW_FACTOR, TOLERANCE, daytime_hours, max_relative_error
+from utils.density import HOURS_PER_DAY, bin_circular, circular_kde, closed_curve
+
+
+@pytest.mark.parametrize("integer", [True, False])
+def test_matches_scipy_away_from_midnight(integer):
+    assert max_relative_error(daytime_hours(5000, integer=integer)) < TOLERANCE
+
+
+def test_weighted_matches_scipy():
+    rng = np.random.default_rng(1)
+    values = daytime_hours(2000, seed=1, integer=False)
+    weights = rng.uniform(0.5, 2, len(values))
+    grid, density = circular_kde(values, bw_factor=BW_FACTOR, weights=weights)
+    reference = gaussian_kde(values, bw_method=BW_FACTOR, weights=weights)(grid)
+    assert np.abs(density - reference).max() / reference.max() < TOLERANCE
+
+
+def test_density_integrates_to_one():
+    grid, density = circular_kde(daytime_hours(1000))
+    assert density.sum() * (grid[1] - grid[0]) == pytest.approx(1, abs=1e-9)
+
+
+def test_wraps_around_midnight():
+    # Half the mass just before midnight, half just after: the peak sits at 00:00, not at either edge
+    grid, density = circular_kde(np.array([23.5] * 50 + [0.5] * 50), bandwidth=1.0)
+    assert grid[np.argmax(density)] == 0
+    assert density[1:].tolist() == pytest.approx(density[:0:-1].tolist())
+
+
+def test_binning_keeps_the_total_weight():
+    counts = bin_circular(np.array([0.0, 23.9, 12.25]), HOURS_PER_DAY, 24)
+    assert counts.sum() == pytest.approx(3)
+    assert counts[23] == pytest.approx(0.1) and counts[0] == pytest.approx(1.9)
+
+
+def test_empty_and_single_value():
+    grid, density = circular_kde([])
+    assert len(grid) == 240 and not density.any()
+    grid, density = circular_kde([5.0, np.nan])
+    assert np.isfinite(density).all() and grid[np.argmax(density)] == 5
+
+
+def test_closed_curve_repeats_the_first_point():
+    x, y = closed_curve(np.array([0.0, 12.0]), np.array([1.0, 2.0]))
+    assert x.tolist() == [0, 12, 24] and y.tolist() == [1, 2, 1]
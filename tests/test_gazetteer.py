@@ -0,0 +1,59 @@
+import pytest
+
+from utils.gazetteer import Gazetteer
+
+PARIS_FR = (48.85, 2.35)
+PARIS_TX = (33.66, -95.56)
+LONDON_UK = (51.51, -0.13)
+LONDON_ON = (42.98, -81.25)
+GALLE = (6.03, 80.22)
+
+
+@pytest.fixture
+def gazetteer():
+    gazetteer = Gazetteer()
+    for code, name in [("FR", "France"), ("US", "United States"), ("GB", "United Kingdom"),
+                       ("CA", "Canada"), ("LK", "Sri Lanka")]:
+        gazetteer.add_country(code, name)
+    gazetteer.add_city(["Paris"], "Île-de-France", "FR", *PARIS_FR, population=2_100_000)
+    gazetteer.add_city(["Paris"], "Texas", "US", *PARIS_TX, population=25_000)
+    gazetteer.add_city(["London"], "England", "GB", *LONDON_UK, population=8_900_000)
+    gazetteer.add_city(["London"], "Ontario", "CA", *LONDON_ON, population=400_000)
+    gazetteer.add_city(["Galle"], "Southern Province", "LK", *GALLE, population=90_000)
+    return gazetteer
+
+
+def test_exact_city_region_country(gazetteer):
+    assert gazetteer.lookup_location("London, Ontario, Canada") == LONDON_ON
+    assert gazetteer.lookup_location("paris, ILE-DE-FRANCE, france") == PARIS_FR
+
+
+def test_unknown_region_falls_back_to_the_city_in_that_country(gazetteer):
+    assert gazetteer.lookup_location("Paris, TX, United States") == PARIS_TX
+    assert gazetteer.lookup_location("London, Canada") == LONDON_ON
+
+
+@pytest.mark.parametrize("country", ["United States of America", "USA", "U.S.A.", "US", "america"])
+def test_country_aliases(gazetteer, country):
+    assert gazetteer.lookup_location(f"Paris, TX, {country}") == PARIS_TX
+
+
+def test_trailing_dot_on_the_country(gazetteer):
+    assert gazetteer.lookup_location("London, Ontario, Canada.") == LONDON_ON
+
+
+def test_fuzzy_match_within_the_country(gazetteer):
+    assert gazetteer.lookup_location("Gallee, Sri Lanka") == GALLE
+    assert gazetteer.lookup_location("Gallee, Sri Lanka", fuzzy=False) is None
+
+
+def test_unknown_country_is_left_to_the_geocoder(gazetteer):
+    # Not the most populous Paris or London anywhere: the store and Nominatim get these instead
+    assert gazetteer.lookup_location("Paris, TX, Republic of Texas") is None
+    assert gazetteer.lookup("London", "Ontario", "Kanada") is None
+
+
+def test_no_country_uses_the_most_populous_city_of_that_name(gazetteer):
+    assert gazetteer.lookup_location("Paris") == PARIS_FR
+    assert gazetteer.lookup("London") == LONDON_UK
+    assert gazetteer.lookup_location("Atlantis") is None
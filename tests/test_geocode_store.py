@@ -0,0 +1,30 @@
+import threading
+
+from utils.geocode_store import GeocodeStore
+
+
+def test_get_many_finds_stored_locations_under_their_normalised_key(tmp_path):
+    store = GeocodeStore(tmp_path / "geocode.sqlite")
+    store.put("San Jose, California", 37.3, -121.9)
+    found, missing = store.get_many(["  san jose,California , None", "Toronto, Ontario"])
+    assert found == {"  san jose,California , None": (37.3, -121.9)}
+    assert missing == ["Toronto, Ontario"]
+    assert store.stats() == {"hits": 1, "misses": 1}
+
+
+def test_counters_stay_exact_under_concurrent_lookups(tmp_path):
+    store = GeocodeStore(tmp_path / "geocode.sqlite")
+    for i in range(50):
+        store.put(f"city {i}", float(i), float(i))
+    locations = [f"city {i}" for i in range(100)]
+
+    def lookups():
+        for _ in range(20):
+            store.get_many(locations)
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.stats() == {"hits": 8 * 20 * 50, "misses": 8 * 20 * 50}
@@ -0,0 +1,30 @@
+from utils.geometry import LEVELS, load_country_geometry, simplify_geojson
+
+
+def square(x, y, size):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+
+
+def feature(name, *polygons):
+    return {"type": "Feature", "properties": {"name": name, "iso_a3": name[:3].upper()},
+            "geometry": {"type": "MultiPolygon", "coordinates": [[p] for p in polygons]}}
+
+
+def test_collapsed_country_keeps_a_minimal_ring():
+    source = {"type": "FeatureCollection", "features": [
+        feature("Bigland", square(0, 0, 10)),
+        # Both islands are smaller than the tolerance; the larger one is kept as a triangle
+        feature("Tinyland", square(20, 0, 0.2), square(30, 0, 0.3)),
+    ]}
+    simplified = simplify_geojson(source, tolerance=0.5)
+    names = [f["properties"]["name"] for f in simplified["features"]]
+    assert names == ["Bigland", "Tinyland"]
+    (ring,), = simplified["features"][1]["geometry"]["coordinates"]
+    assert len(ring) == 4 and ring[0] == ring[-1]
+    assert all(30 <= x <= 30.3 for x, _ in ring)
+
+
+def test_every_level_has_every_country():
+    names = {level: {f["properties"]["name"] for f in load_country_geometry(level)["features"]} for level in LEVELS}
+    assert names["low"] == names["medium"] == names["high"]
+    assert {"Luxembourg", "Gambia", "Palestine", "Bahamas", "Vanuatu", "Solomon Islands", "Northern Cyprus"} <= names["low"]
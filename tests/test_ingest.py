@@ -0,0 +1,101 @@
+import os
+
+import pandas as pd
+import pyarrow.csv as pacsv
+
+from utils.ingest import DeltaStore, append_frames
+
+
+def write_export(directory, name, ids, label="x"):
+    path = directory / name
+    pd.DataFrame({"Submission ID": ids, "Value": [f"{label}{i}" for i in ids]}).to_csv(path, index=False)
+    return path
+
+
+def derive(df):
+    return df.assign(Double=df["Submission ID"] * 2)
+
+
+def make_store(tmp_path, read_fn=pd.read_csv, **kwargs):
+    calls = []
+
+    def counting_derive(df):
+        calls.append(len(df))
+        return derive(df)
+
+    store = DeltaStore("exports", tmp_path / "exports", read_fn, counting_derive, key=["Submission ID"],
+                       cache_dir=tmp_path / "cache", min_interval=0, **kwargs)
+    return store, calls
+
+
+def test_overlapping_exports_are_deduplicated_on_the_key(tmp_path):
+    (tmp_path / "exports").mkdir()
+    write_export(tmp_path / "exports", "a-2025-01-01.csv", [1, 2, 3], "first")
+    # The next day's export repeats 2 and 3 (and 4 twice)
+    write_export(tmp_path / "exports", "a-2025-01-02.csv", [2, 3, 4, 4], "second")
+    store, calls = make_store(tmp_path)
+    assert store.frame["Submission ID"].tolist() == [1, 2, 3, 4]
+    # The first export to carry a key wins
+    assert store.frame["Value"].tolist() == ["first1", "first2", "first3", "second4"]
+    assert store.frame["Double"].tolist() == [2, 4, 6, 8]
+    assert calls == [4]
+
+
+def test_only_new_rows_are_derived_and_appended(tmp_path):
+    (tmp_path / "exports").mkdir()
+    write_export(tmp_path / "exports", "a-2025-01-01.csv", [1, 2])
+    store, calls = make_store(tmp_path)
+    version = store.data_version
+    assert store.refresh(force=True) is None and store.data_version == version
+
+    write_export(tmp_path / "exports", "a-2025-01-02.csv", [2, 3])
+    delta = store.refresh(force=True)
+    assert delta["Submission ID"].tolist() == [3]
+    assert store.frame["Submission ID"].tolist() == [1, 2, 3]
+    assert calls == [2, 1] and store.data_version != version
+
+
+def test_warm_start_reads_parts_without_rederiving(tmp_path):
+    (tmp_path / "exports").mkdir()
+    write_export(tmp_path / "exports", "a-2025-01-01.csv", [1, 2])
+    write_export(tmp_path / "exports", "a-2025-01-02.csv", [3])
+    first, _ = make_store(tmp_path)
+    second, calls = make_store(tmp_path)
+    assert calls == []
+    pd.testing.assert_frame_equal(first.frame, second.frame)
+    assert first.data_version == second.data_version
+
+
+def test_changed_pipeline_version_rebuilds(tmp_path):
+    (tmp_path / "exports").mkdir()
+    write_export(tmp_path / "exports", "a-2025-01-01.csv", [1, 2])
+    make_store(tmp_path)
+    rebuilt, calls = make_store(tmp_path, pipeline_version=2)
+    assert calls == [2] and len(rebuilt.frame) == 2
+
+
+def test_arrow_reads_on_worker_threads(tmp_path):
+    (tmp_path / "exports").mkdir()
+    for day in range(1, 5):
+        write_export(tmp_path / "exports", f"a-2025-01-0{day}.csv", [day, day + 1])
+    store, _ = make_store(tmp_path, read_fn=lambda path: pacsv.read_csv(os.fspath(path)), workers=3)
+    assert store.frame["Submission ID"].tolist() == [1, 2, 3, 4, 5]
+
+
+def test_append_frames_merges_categories():
+    left = pd.DataFrame({"c": pd.Categorical(["a", "b"])})
+    right = pd.DataFrame({"c": pd.Categorical(["c", "a"])})
+    merged = append_frames(left, right)
+    assert isinstance(merged["c"].dtype, pd.CategoricalDtype)
+    assert merged["c"].tolist() == ["a", "b", "c", "a"]
+
+
+def test_read_export_table_skips_dropped_columns(tmp_path):
+    from utils.data_processor import read_export_table
+
+    path = tmp_path / "export.csv"
+    path.write_text("Submission ID,Source URL,Message\n1,https://a,\"two\nlines\"\n2,https://b,hi\n", encoding="utf-8-sig")
+    table = read_export_table(path, drop=["Source URL", "Notes"])
+    assert table.column_names == ["Submission ID", "Message"]
+    assert table.column("Message").to_pylist() == ["two\nlines", "hi"]
+    assert read_export_table(path).column_names == ["Submission ID", "Source URL", "Message"]
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from utils.ip_dimension import IpDimension
+
+
+class FakeResolver:
+    """Answers from `known`; IPs listed in `failing` are left out, as after a failed remote batch."""
+
+    def __init__(self, known, failing=()):
+        self.known = known
+        self.failing = set(failing)
+        self.asked = []
+
+    def resolve(self, ips):
+        ips = list(ips)
+        self.asked.append(ips)
+        return {ip: self.known.get(ip, (None, None)) for ip in ips if ip not in self.failing}
+
+
+def dates(*days):
+    return pd.to_datetime([f"2025-01-{d:02d}" for d in days])
+
+
+def test_extend_tracks_first_last_and_counts_per_dataset():
+    dim = IpDimension()
+    dim.extend("messages", pd.Series(["a", "b", "a"]), dates(3, 1, 5))
+    dim.extend("messages", pd.Series(["a", None]), dates(2, 9))
+    dim.extend("applications", pd.Series(["b"]), dates(7))
+    table = dim.table
+    assert list(table.index) == ["a", "b"]
+    assert table.loc["a", "messages_count"] == 3
+    assert table.loc["a", "messages_first"] == pd.Timestamp("2025-01-02")
+    assert table.loc["a", "messages_last"] == pd.Timestamp("2025-01-05")
+    assert table.loc["b", "applications_count"] == 1 and table.loc["a", "applications_count"] == 0
+
+
+def test_sync_only_reads_new_rows_and_restarts_on_rebuild():
+    dim = IpDimension()
+    frame = pd.DataFrame({"Submitter IP": ["a", "b"], "Submission Create Date": dates(1, 2)})
+    dim.sync({"mailing_list": (frame, "Submission Create Date")})
+    dim.sync({"mailing_list": (frame, "Submission Create Date")})
+    assert dim.table["mailing_list_count"].sum() == 2
+    # A smaller frame means the store was rebuilt
+    dim.sync({"mailing_list": (frame.iloc[:1], "Submission Create Date")})
+    assert dim.table["mailing_list_count"].tolist() == [1, 0]
+
+
+def test_resolve_leaves_unanswered_ips_pending():
+    dim = IpDimension()
+    dim.extend("messages", pd.Series(["a", "b"]), dates(1, 2))
+    resolver = FakeResolver({"a": ("UK", "London"), "b": ("US", "Austin")}, failing={"b"})
+    dim.resolve(resolver)
+    assert dim.table["resolved"].tolist() == [True, False]
+    # Retried on the next call, and only b is asked for
+    resolver.failing.clear()
+    dim.resolve(resolver)
+    assert resolver.asked[-1] == ["b"]
+    assert dim.table.loc["b", "country"] == "US" and dim.table["resolved"].all()
+
+
+def test_lookup_and_funnel():
+    dim = IpDimension()
+    dim.extend("messages", pd.Series(["a", "b", "c"]), dates(1, 1, 9))
+    dim.extend("mailing_list", pd.Series(["a", "c"]), dates(2, 3))
+    dim.extend("applications", pd.Series(["a", "c"]), dates(4, 4))
+    dim.resolve(FakeResolver({"a": ("UK", "London")}))
+    looked_up = dim.lookup(pd.Series(["a", "zzz"], index=[10, 11]), ["country"])
+    assert looked_up.loc[10, "country"] == "UK" and pd.isna(looked_up.loc[11, "country"])
+    assert dim.funnel()["IPs"].tolist() == [3, 2, 2]
+    # c messaged after signing up and applying
+    assert dim.funnel(in_order=True)["IPs"].tolist() == [3, 1, 1]
+
+
+def test_categorical_ips_look_up_by_code():
+    dim = IpDimension()
+    ips = pd.Series(pd.Categorical(["b", "a", None, "x"], categories=["a", "b", "x"]))
+    dim.extend("messages", pd.Series(["a", "b"]), dates(1, 2))
+    assert dim.codes(ips).tolist() == [1, 0, -1, -1]
+    assert np.array_equal(dim.codes(pd.Series(["a", "q"])), [0, -1])
+
+
+def test_lookup_matches_categorical_and_arrow_ips_alike():
+    dim = IpDimension()
+    dim.extend("messages", pd.Series(["a", "b"]), dates(1, 2))
+    plain = pd.Series(["b", None, "z", "a"])
+    for ips in (plain, plain.astype("category"), plain.astype(pd.ArrowDtype(pa.string()))):
+        assert dim.codes(ips).tolist() == [1, -1, -1, 0]
+        found = dim.lookup(ips, ["messages_first"])["messages_first"]
+        assert found.isna().tolist() == [False, True, True, False]
@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.stubs import IpApiStub, fake_ip_location
+from utils.ip_geo import BATCH_SIZE, IpResolver
+
+
+def ips(n, prefix="81.2"):
+    return [f"{prefix}.{i // 250}.{i % 250 + 1}" for i in range(n)]
+
+
+@pytest.fixture
+def stub():
+    with IpApiStub() as stub:
+        yield stub
+
+
+def resolver_for(tmp_path, stub, **kwargs):
+    return IpResolver(mmdb_path=tmp_path / "missing.mmdb", cache_path=tmp_path / "ipgeo.sqlite", remote=True,
+                      remote_url=stub.url, remote_delay=0, **kwargs)
+
+
+def test_batches_of_distinct_ips(tmp_path, stub):
+    resolver = resolver_for(tmp_path, stub)
+    wanted = ips(250)
+    result = resolver.resolve(wanted + wanted[:10] + [None, ""])
+    assert stub.batches == [BATCH_SIZE, BATCH_SIZE, 50]
+    assert result == {ip: fake_ip_location(ip) for ip in wanted}
+    assert resolver.stats["remote"] == 250 and resolver.stats["ips"] == 250
+
+
+def test_results_are_cached_across_calls_and_instances(tmp_path, stub):
+    resolver_for(tmp_path, stub).resolve(ips(120))
+    resolver = resolver_for(tmp_path, stub)
+    result = resolver.resolve(ips(130))
+    # Only the 10 new IPs go out
+    assert stub.batches == [BATCH_SIZE, 20, 10]
+    assert resolver.stats["cache_hits"] == 120 and len(result) == 130
+
+
+def test_failed_batch_is_left_out_and_retried(tmp_path, stub):
+    resolver = resolver_for(tmp_path, stub)
+    stub.fail_next(1)
+    wanted = ips(150)
+    result = resolver.resolve(wanted)
+    assert len(result) == 50 and set(result) <= set(wanted)
+    # Not cached, so the next call asks again for just the failed batch
+    result = resolver.resolve(wanted)
+    assert stub.batches == [BATCH_SIZE, 50, BATCH_SIZE]
+    assert result == {ip: fake_ip_location(ip) for ip in wanted}
+
+
+def test_failed_lookups_are_cached_until_their_ttl(tmp_path, stub):
+    private = ["10.0.0.1", "10.0.0.2"]
+    resolver = resolver_for(tmp_path, stub)
+    assert resolver.resolve(private) == {ip: (None, None) for ip in private}
+    resolver.resolve(private)
+    assert stub.requests == 1
+    expired = resolver_for(tmp_path, stub, negative_ttl=-1)
+    expired.resolve(private)
+    assert stub.requests == 2
+
+
+def test_no_remote_lookups_unless_enabled(tmp_path, stub):
+    resolver = IpResolver(mmdb_path=tmp_path / "missing.mmdb", cache_path=tmp_path / "ipgeo.sqlite",
+                          remote=False, remote_url=stub.url, remote_delay=0)
+    assert resolver.resolve(ips(5)) == {ip: (None, None) for ip in ips(5)}
+    assert stub.requests == 0
+    # Nothing stored, so turning remote lookups on later still resolves them
+    assert resolver_for(tmp_path, stub).resolve(ips(5)) == {ip: fake_ip_location(ip) for ip in ips(5)}
+
+
+class FakeReader:
+    # Stands in for geoip2's Reader: {ip: (country, city)}, unknown IPs raise like AddressNotFoundError
+    def __init__(self, locations):
+        self.locations = locations
+
+    def city(self, ip):
+        country, city = self.locations[ip]
+        return SimpleNamespace(country=SimpleNamespace(name=country), city=SimpleNamespace(name=city))
+
+
+@pytest.mark.parametrize("remote", [False, True])
+def test_country_without_city_from_the_db_is_kept(tmp_path, stub, remote):
+    resolver = IpResolver(mmdb_path=tmp_path / "missing.mmdb", cache_path=tmp_path / "ipgeo.sqlite", remote=remote,
+                          remote_url=stub.url, remote_delay=0)
+    resolver.reader = FakeReader({"41.58.1.1": ("Nigeria", None), "81.2.0.1": ("United Kingdom", "London")})
+    result = resolver.resolve(["41.58.1.1", "81.2.0.1", "81.2.0.2"])
+    assert result["41.58.1.1"] == ("Nigeria", None)
+    assert result["81.2.0.1"] == ("United Kingdom", "London")
+    assert resolver.stats["mmdb_hits"] == 2
+    # Only the IP the db has no country for is sent to ip-api
+    assert stub.batches == ([1] if remote else [])
+    if remote:
+        assert result["81.2.0.2"] == fake_ip_location("81.2.0.2")
+    else:
+        assert result["81.2.0.2"] == (None, None)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from utils.minhash import (
+    EMPTY, NUM_PERM, cluster_summary, clusters, from_bytes, normalise_messages, sender_summary, signature_column,
+    signatures,
+)
+
+TEMPLATE = "Hi there\nCheck cadware.house SEO score in under 2 minutes\nhttps://seo-check.example/{n}"
+
+
+def test_normalise_lowercases_collapses_space_and_digits():
+    text = normalise_messages(["  Hello\n\nWORLD 2024 ref 17 ", None])
+    assert text.to_pylist() == ["hello world 0 ref 0", ""]
+
+
+def test_signatures_are_deterministic_and_shaped():
+    sig = signatures(["one message", "another message", ""])
+    assert sig.shape == (3, NUM_PERM) and sig.dtype == np.uint32
+    assert np.array_equal(sig, signatures(["one message", "another message", ""]))
+    assert (sig[2] == EMPTY).all() and (sig[:2] != EMPTY).all()
+
+
+def test_signature_column_round_trips_in_batches():
+    messages = [f"message number {i} about something else {i % 7}" for i in range(10)]
+    column = signature_column(messages, rows=3)
+    assert np.array_equal(from_bytes(column), signatures(messages))
+
+
+def test_templated_messages_cluster_and_one_offs_do_not():
+    messages = [TEMPLATE.format(n=n) for n in range(20)] + [
+        "Is the data scientist role still open? I applied last week.",
+        "Hello, I'd like to know more about your internship programme.",
+        "",
+        "",
+    ]
+    labels = clusters(signatures(messages))
+    # Largest cluster gets id 0
+    assert set(labels[:20]) == {0}
+    singles = labels[20:]
+    assert len(set(singles)) == 4 and 0 not in singles
+
+
+def test_threshold_controls_merging():
+    a = "the quick brown fox jumps over the lazy dog near the river bank today"
+    b = "the quick brown fox jumps over the lazy cat near the river bank today"
+    sig = signatures([a, b])
+    assert clusters(sig, threshold=0.3)[0] == clusters(sig, threshold=0.3)[1]
+    assert clusters(sig, threshold=0.95)[0] != clusters(sig, threshold=0.95)[1]
+
+
+def test_summaries():
+    labels = np.array([0, 0, 0, 1, 2])
+    dates = pd.to_datetime(["2025-01-01", "2025-01-03", "2025-01-02", "2025-01-04", "2025-01-05"])
+    ips = pd.Series(["a", "b", "a", "a", "c"])
+    messages = pd.Series(["spam 1", "spam 2", "spam 3", "hello", "question"])
+    summary = cluster_summary(labels, messages, ips, dates)
+    assert summary.loc[0, "messages"] == 3 and summary.loc[0, "senders"] == 2
+    assert summary.loc[0, "last_seen"] == pd.Timestamp("2025-01-03")
+    senders = sender_summary(labels, ips, dates)
+    assert senders.index.tolist() == ["a"]
+    assert senders.loc["a", "messages"] == 3 and senders.loc["a", "near_duplicates"] == 2
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from utils import page_data
+from utils.data_processor import signup_hour_rollups, signup_rollups
+from utils.dataset import PreparedDataset
+
+
+def mailing_list():
+    return pd.DataFrame({
+        "Submission Create Date": pd.to_datetime([
+            "2024-03-01 09:00", "2024-03-02 23:30", "2024-03-03 00:10", "2024-03-03 12:00",
+        ]),
+        "How did you hear about us?": ["LinkedIn", "Referral", "LinkedIn", "Online"],
+        "Submitter Device": ["iPhone", "Windows", "Android", "Linux"],
+    })
+
+
+def test_select_rows_includes_the_whole_end_day():
+    df = mailing_list()
+    rows = page_data.select_rows(df, ["LinkedIn", "Referral"], pd.Timestamp("2024-03-01"), pd.Timestamp("2024-03-02"))
+    assert rows.tolist() == [True, True, False, False]
+
+
+def test_device_ratio_counts_device_types_not_raw_devices():
+    df = mailing_list()
+    rollups = signup_rollups(df)
+    start, end = df["Submission Create Date"].min(), df["Submission Create Date"].max()
+    ratio = page_data.device_ratio(rollups, ["LinkedIn", "Referral", "Online"], start, end)
+    assert list(ratio.columns) == ["Device Type", "Count"]
+    assert dict(zip(ratio["Device Type"], ratio["Count"])) == {"Mobile": 2, "Desktop": 1, "Other": 1}
+
+
+def test_device_trends_shares_add_up_within_mobile_and_desktop():
+    df = mailing_list()
+    rollups = signup_rollups(df)
+    start, end = df["Submission Create Date"].min(), df["Submission Create Date"].max()
+    trends = page_data.device_trends(rollups, "D", ["LinkedIn", "Referral"], start, end)
+    shares = trends.pivot(index="Submission Create Date", columns="variable", values="value")
+    assert shares["Mobile Share"].tolist() == [100.0, 0.0, 100.0]
+    assert shares["Desktop Share"].tolist() == [0.0, 100.0, 0.0]
+
+
+def test_signup_hourly_density_is_closed_around_midnight():
+    df = mailing_list()
+    x_grid, density = page_data.signup_hourly_density(df, np.ones(len(df), dtype=bool))
+    assert x_grid[0] == 0 and x_grid[-1] == 24
+    assert density[0] == density[-1]
+
+
+def test_popular_job_breaks_ties_alphabetically():
+    counts = pd.Series({"web-developer": 3, "data-scientist": 3, "designer": 1})
+    assert page_data.popular_job(counts) == "Data Scientist"
+    assert page_data.popular_job(counts.iloc[:0]) is None
+
+
+def test_signup_hourly_density_from_rollups_matches_the_rows():
+    df = mailing_list()
+    channels = ["LinkedIn", "Online"]
+    start, end = pd.Timestamp("2024-03-02"), pd.Timestamp("2024-03-03")
+    expected = page_data.signup_hourly_density(df, page_data.select_rows(df, channels, start, end))
+    got = page_data.signup_hourly_density_from_rollups(signup_hour_rollups(df), channels, start, end)
+    np.testing.assert_allclose(got[1], expected[1])
+
+
+def test_job_hourly_density_from_counts_matches_the_rows():
+    rng = np.random.default_rng(0)
+    n = 500
+    dataset = PreparedDataset(pd.DataFrame({
+        "job_type": rng.choice(["designer", "data-scientist", "web-developer"], n),
+        "Submission Date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 86400 * 30, n), unit="s"),
+    }), "test")
+    counts = page_data.job_hour_counts(dataset)
+    for job_types in (["designer"], ["designer", "web-developer"]):
+        expected = page_data.job_hourly_density(dataset, job_types)
+        got = page_data.job_hourly_density_from_counts(counts, job_types)
+        np.testing.assert_allclose(got[1], expected[1])
+    assert page_data.job_hourly_density_from_counts(counts, []) is None
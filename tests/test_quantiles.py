@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from utils.quantiles import KllSketch, box_summaries, box_summary, merge_sketches, sketch_by
+
+
+def rank_of(sorted_values, value):
+    return np.searchsorted(sorted_values, value, side="right") / len(sorted_values)
+
+
+def test_exact_while_nothing_is_compacted():
+    values = np.array([3.0, 1, 4, 1, 5, 9, 2, 6])
+    sketch = KllSketch().update(values)
+    assert sketch.quantiles([0, 0.25, 0.5, 0.75, 1]).tolist() == np.quantile(values, [0, 0.25, 0.5, 0.75, 1]).tolist()
+
+
+def test_rank_error_and_size_stay_bounded():
+    values = np.random.default_rng(0).normal(20, 10, 200_000)
+    sketch = KllSketch().update(values)
+    ordered = np.sort(values)
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        assert rank_of(ordered, sketch.quantiles([q])[0]) == pytest.approx(q, abs=0.02)
+    assert sum(map(len, sketch.levels)) < 1000
+    assert sketch.min == values.min() and sketch.max == values.max()
+
+
+def test_merge_matches_one_pass_and_leaves_inputs_alone():
+    values = np.random.default_rng(1).exponential(10, 100_000)
+    parts = [KllSketch().update(part) for part in np.array_split(values, 20)]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged = merged.merged(part)
+    assert merged.n == len(values) and parts[0].n == 5000
+    ordered = np.sort(values)
+    for q in (0.1, 0.5, 0.9):
+        assert rank_of(ordered, merged.quantiles([q])[0]) == pytest.approx(q, abs=0.02)
+
+
+def test_incremental_updates():
+    values = np.random.default_rng(2).integers(0, 60, 50_000).astype(float)
+    sketch = KllSketch()
+    for part in np.array_split(values, 500):
+        sketch.update(part)
+    assert sketch.quantiles([0.5])[0] == pytest.approx(np.median(values), abs=2)
+
+
+def test_nan_ignored_and_empty_sketch():
+    assert KllSketch().update([np.nan, 1.0]).n == 1
+    assert np.isnan(KllSketch().quantiles([0.5])).all()
+
+
+def test_box_summary_finds_rare_outliers():
+    values = np.concatenate([np.random.default_rng(3).integers(0, 30, 100_000), [250, 300, -90]]).astype(float)
+    summary = box_summary(KllSketch().update(values), outliers=10)
+    assert summary["q1"] <= summary["median"] <= summary["q3"]
+    assert summary["upperfence"] <= 29 and summary["lowerfence"] >= 0
+    # Exact tails keep the few extreme values however rarely a sample would hold them
+    assert {-90, 250, 300} <= set(summary["outliers"])
+    assert len(summary["outliers"]) <= 10
+
+
+def test_sketches_per_group_merge_by_group():
+    base = sketch_by([1, 2, 3, 10], ["a", "a", "b", "b"])
+    more = merge_sketches(base, sketch_by([4, 5], ["a", "c"]))
+    assert {g: s.n for g, s in more.items()} == {"a": 3, "b": 2, "c": 1}
+    assert base["a"].n == 2
+    table = box_summaries(more)
+    assert table["group"].tolist() == ["a", "b", "c"] and table.loc[0, "max"] == 4
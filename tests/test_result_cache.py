@@ -0,0 +1,73 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.result_cache import ResultCache, canonical, date_range
+
+
+def test_selections_in_any_order_share_a_key():
+    assert canonical({"channels": ["Referral", "LinkedIn"]}) == canonical({"channels": ["LinkedIn", "Referral", "LinkedIn"]})
+    # Tuples are positional
+    assert canonical((1, 2)) != canonical((2, 1))
+
+
+def test_missing_values_and_numpy_scalars_canonicalise():
+    assert canonical([None, float("nan"), pd.NaT, "a"]) == ("set", None, "a")
+    assert canonical(np.int64(3)) == 3
+    with pytest.raises(TypeError):
+        canonical(object())
+
+
+def test_date_range_ignores_time_of_day():
+    assert date_range("2024-01-01 09:30", pd.Timestamp("2024-02-01 23:59")) == date_range("2024-01-01", "2024-02-01")
+
+
+def test_hit_after_miss_and_counters():
+    cache = ResultCache()
+    calls = []
+    for channels in (["a", "b"], ["b", "a"]):
+        cache.get_or_compute("totals", {"version": 1, "channels": channels}, lambda: calls.append(1) or 42)
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = ResultCache(max_bytes=10_000, max_entries=2)
+    for i in range(3):
+        cache.get_or_compute("x", i, lambda: np.zeros(10))
+    assert len(cache) == 2 and cache.stats()["evictions"] == 1
+    # Touch 1 so that 2 is the least recently used
+    cache.get_or_compute("x", 1, lambda: pytest.fail("should be cached"))
+    cache.get_or_compute("x", 3, lambda: np.zeros(10))
+    assert {key[1] for key in cache._entries} == {1, 3}
+    # Bigger than the whole cap: returned but not stored
+    assert cache.get_or_compute("x", 4, lambda: np.zeros(5000)).shape == (5000,)
+    assert len(cache) == 2 and cache.stats()["mb"] < 0.01
+
+
+def test_errors_are_not_cached():
+    cache = ResultCache()
+    with pytest.raises(ZeroDivisionError):
+        cache.get_or_compute("x", 1, lambda: 1 / 0)
+    assert cache.get_or_compute("x", 1, lambda: 7) == 7
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResultCache()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return 1
+
+    threads = [threading.Thread(target=cache.get_or_compute, args=("slow", ["b", "a"], slow)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 5
@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+from utils import snapshots
+
+
+def test_read_table_keeps_only_the_current_snapshot(tmp_path):
+    first = snapshots.write_snapshot({"daily": pd.DataFrame({"n": [1, 2]})}, {}, {}, 1, tmp_path)
+    assert snapshots.read_table("daily", first, tmp_path)["n"].tolist() == [1, 2]
+    second = snapshots.write_snapshot({"daily": pd.DataFrame({"n": [3]})}, {}, {}, 1, tmp_path)
+    assert snapshots.read_table("daily", second, tmp_path)["n"].tolist() == [3]
+    assert set(snapshots._tables) == {second["tables"]["daily"]["sha256"]}
+
+
+def test_read_table_rejects_a_changed_file(tmp_path):
+    manifest = snapshots.write_snapshot({"other": pd.DataFrame({"n": [4]})}, {}, {}, 1, tmp_path)
+    entry = manifest["tables"]["other"]
+    (tmp_path / entry["file"]).write_bytes(b"not parquet")
+    snapshots._tables.pop(entry["sha256"], None)
+    with pytest.raises(ValueError, match="does not match its hash"):
+        snapshots.read_table("other", manifest, tmp_path)
+
+
+def test_latest_snapshot_ignores_one_missing_a_page_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshots, "ENABLED", True)
+    snapshots.write_snapshot({"applications_cube": pd.DataFrame({"n": [1]})}, {}, {}, 1, tmp_path)
+    assert snapshots.latest_snapshot(["applications_cube"], tmp_path)["tables"].keys() == {"applications_cube"}
+    # Built before the page needed more tables: the page computes from the rows instead
+    assert snapshots.latest_snapshot(snapshots.APPLICATION_TABLES, tmp_path) is None
+    monkeypatch.setattr(snapshots, "ENABLED", False)
+    assert snapshots.latest_snapshot(["applications_cube"], tmp_path) is None
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from utils.spatial import MAX_RADIUS, MIN_RADIUS, aggregate_points, coordinate_table, location_counts
+
+LAT_LON = {
+    "colombo": (6.93, 79.85),
+    "galle": (6.03, 80.22),
+    "negombo": (7.21, 79.84),
+    "london": (51.51, -0.13),
+    "atlantis": (None, None),
+}
+
+
+def test_unresolved_locations_are_dropped():
+    table = coordinate_table(LAT_LON)
+    assert list(table.index) == ["colombo", "galle", "negombo", "london"]
+    counts = location_counts(pd.Series(["colombo", "atlantis", "atlantis", None, "london"]))
+    points = aggregate_points(counts, table)
+    assert points["count"].tolist() == [1, 1]
+    assert set(points["latitude"]) == {6.93, 51.51}
+
+
+def test_grid_cells_sit_at_the_count_weighted_centroid():
+    counts = pd.DataFrame({"location": ["colombo", "negombo", "london"], "count": [3, 1, 2]})
+    points = aggregate_points(counts, coordinate_table(LAT_LON), cell_degrees=5.0)
+    # Colombo and Negombo share a 5° cell, London has its own
+    assert sorted(points["count"]) == [2, 4]
+    west_coast = points[points["count"] == 4].iloc[0]
+    assert west_coast["latitude"] == pytest.approx((3 * 6.93 + 7.21) / 4)
+    assert west_coast["longitude"] == pytest.approx((3 * 79.85 + 79.84) / 4)
+
+
+def test_size_scales_with_count_down_to_the_floor():
+    counts = pd.DataFrame({"location": ["colombo", "galle", "london"], "count": [10_000, 1, 2_500]})
+    points = aggregate_points(counts, coordinate_table(LAT_LON)).set_index("count")
+    assert points.loc[10_000, "size"] == MAX_RADIUS
+    assert points.loc[2_500, "size"] == pytest.approx(MAX_RADIUS / 2)
+    assert points.loc[1, "size"] == MIN_RADIUS
+
+
+def test_empty_input_gives_an_empty_frame_with_size():
+    nothing = pd.DataFrame({"location": [], "count": []})
+    only_unresolved = pd.DataFrame({"location": ["atlantis"], "count": [5]})
+    for counts, coordinates, cell in [(nothing, coordinate_table(LAT_LON), None),
+                                      (only_unresolved, coordinate_table(LAT_LON), 1.0),
+                                      (nothing, coordinate_table({}), None)]:
+        points = aggregate_points(counts, coordinates, cell)
+        assert points.empty
+        assert {"latitude", "longitude", "count", "size"} <= set(points.columns)
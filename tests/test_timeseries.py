@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.timeseries import Rollups, downsample, lttb, pick_frequency, rebucket
+
+
+def signups(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Series(pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 400 * 86400, n), unit="s"))
+    channel = pd.Series(rng.choice(["LinkedIn", "Referral", "Online"], n))
+    return dates, channel
+
+
+def brute_force(dates, channel, freq, start, end, channels=None):
+    rows = pd.DataFrame({"date": dates, "channel": channel})
+    rows = rows[(rows["date"] >= start) & (rows["date"] < pd.Timestamp(end) + pd.Timedelta(days=1))]
+    if channels is not None:
+        rows = rows[rows["channel"].isin(channels)]
+    rows["date"] = rows["date"].dt.to_period(freq).dt.start_time
+    return rows.groupby(["date", "channel"]).size().rename("count").reset_index()
+
+
+@pytest.mark.parametrize("freq", ["D", "W", "M", "Q"])
+@pytest.mark.parametrize("start, end", [
+    (None, None),
+    ("2024-01-01", "2024-12-31"),
+    # Both ends inside partial buckets
+    ("2024-02-14", "2024-09-03"),
+    # Start and end inside the same bucket
+    ("2024-05-06", "2024-05-09"),
+])
+def test_counts_match_rows_including_edge_buckets(freq, start, end):
+    dates, channel = signups()
+    rollups = Rollups(dates, pd.DataFrame({"channel": channel}))
+    start_ts = dates.min().normalize() if start is None else pd.Timestamp(start)
+    end_ts = dates.max().normalize() if end is None else pd.Timestamp(end)
+    got = rollups.counts(freq, "channel", {"channel": ["LinkedIn", "Online"]}, start, end)
+    expected = brute_force(dates, channel, freq, start_ts, end_ts, ["LinkedIn", "Online"])
+    got = got.sort_values(["date", "channel"]).reset_index(drop=True)
+    expected = expected.sort_values(["date", "channel"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_counts_empty_range():
+    dates, channel = signups(50)
+    rollups = Rollups(dates, pd.DataFrame({"channel": channel}))
+    assert rollups.counts("W", "channel", start="2024-06-01", end="2024-05-01").empty
+
+
+def test_totals_and_from_daily_agree():
+    dates, channel = signups()
+    rollups = Rollups(dates, pd.DataFrame({"channel": channel}))
+    restored = Rollups.from_daily(rollups.daily)
+    totals = restored.totals("channel", start="2024-03-01", end="2024-03-31")
+    in_march = channel[(dates >= "2024-03-01") & (dates < "2024-04-01")].value_counts()
+    assert dict(zip(totals["channel"], totals["count"])) == in_march.to_dict()
+    assert totals["count"].is_monotonic_decreasing
+
+
+def test_rebucket_sums_into_bucket_starts():
+    counts = pd.DataFrame({"date": pd.to_datetime(["2024-01-30", "2024-01-31", "2024-02-01"]), "count": [1, 2, 3]})
+    assert rebucket(counts, "M")["count"].tolist() == [3, 3]
+
+
+def test_pick_frequency_steps_up_with_the_range():
+    assert pick_frequency("2024-01-01", "2024-03-01") == "D"
+    assert pick_frequency("2024-01-01", "2025-06-01") == "W"
+    assert pick_frequency("2016-01-01", "2025-01-01") == "M"
+    assert pick_frequency("2015-01-01", "2025-01-01") == "Q"
+    assert pick_frequency(pd.NaT, "2025-01-01") == "D"
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    x = np.arange(1000)
+    y = np.sin(x / 50)
+    y[537] = 25
+    keep = lttb(x, y, 50)
+    assert len(keep) == 50 and keep[0] == 0 and keep[-1] == 999
+    assert np.all(np.diff(keep) > 0)
+    assert 537 in keep
+    # Nothing to drop
+    assert lttb(x[:10], y[:10], 50).tolist() == list(range(10))
+
+
+def test_downsample_caps_each_series():
+    dates = pd.date_range("2020-01-01", periods=1000, freq="D")
+    df = pd.DataFrame({"date": np.tile(dates, 2), "count": np.arange(2000), "series": ["a"] * 1000 + ["b"] * 1000})
+    out = downsample(df, "date", "count", series="series", max_points=100)
+    assert out.groupby("series").size().tolist() == [100, 100]
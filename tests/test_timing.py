@@ -0,0 +1,65 @@
+import json
+import time
+
+import pytest
+
+from utils import timing
+
+
+@pytest.fixture
+def timing_on(tmp_path, monkeypatch):
+    monkeypatch.setattr(timing, "LOG_PATH", tmp_path / "timings.jsonl")
+    monkeypatch.setattr(timing, "ENABLED", True)
+    timing.reset()
+    yield tmp_path / "timings.jsonl"
+    timing.reset()
+
+
+def test_one_rerun_with_two_sections(timing_on):
+    timing.start_rerun("page")
+    timing.section("page.load")
+    time.sleep(0.01)
+    with timing.span("page.lookup"):
+        timing.count("page.hit", 2)
+    timing.section("page.chart")
+    timing.count("page.hit")
+    entry = timing.end_rerun()
+
+    assert entry["page"] == "page"
+    assert set(entry["spans_ms"]) == {"page.load", "page.lookup", "page.chart", "page.total"}
+    assert entry["spans_ms"]["page.load"] >= 10
+    assert entry["spans_ms"]["page.total"] >= entry["spans_ms"]["page.load"] + entry["spans_ms"]["page.chart"]
+    assert entry["counters"] == {"page.hit": 3}
+    assert timing.counters() == {"page.hit": 3}
+
+    # One sample per span per rerun
+    table = timing.percentiles()
+    assert set(table) == set(entry["spans_ms"])
+    assert all(row["n"] == 1 for row in table.values())
+    assert table["page.load"]["p50_ms"] == pytest.approx(entry["spans_ms"]["page.load"], abs=0.01)
+
+    logged = [json.loads(line) for line in timing_on.read_text().splitlines()]
+    assert logged == [entry]
+
+
+def test_spans_outside_a_rerun_go_straight_to_the_histograms(timing_on):
+    with timing.span("ingest"):
+        pass
+    with timing.span("ingest"):
+        pass
+    assert timing.percentiles()["ingest"]["n"] == 2
+    assert not timing_on.exists()
+
+
+def test_nothing_is_recorded_when_disabled(tmp_path, monkeypatch):
+    monkeypatch.setattr(timing, "LOG_PATH", tmp_path / "timings.jsonl")
+    monkeypatch.setattr(timing, "ENABLED", False)
+    timing.reset()
+    timing.start_rerun("page")
+    timing.section("page.load")
+    with timing.span("page.lookup"):
+        timing.count("page.hit", 5)
+    assert timing.end_rerun() is None
+    assert timing.counters() == {}
+    assert timing.percentiles() == {}
+    assert not (tmp_path / "timings.jsonl").exists()
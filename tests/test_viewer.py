@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from utils.viewer import matching_positions, page_slice, search_mask
+
+
+def frame():
+    return pd.DataFrame({
+        "Source": pd.Categorical(["LinkedIn", "Referral", None, "linkedin"]),
+        "Message": ["Hello there", "hi", "HELLO", None],
+        # No IP resolved yet: every value missing, no categories at all
+        "Country": pd.Categorical([None] * 4, categories=[]),
+    })
+
+
+def test_search_is_case_insensitive_across_columns():
+    df = frame()
+    positions = np.arange(len(df))
+    assert search_mask(df, positions, ["Source", "Message"], "LINKEDIN").tolist() == [True, False, False, True]
+    assert search_mask(df, positions, ["Source", "Message"], "hello").tolist() == [True, False, True, False]
+
+
+def test_search_skips_categorical_without_categories():
+    df = frame()
+    positions = np.arange(len(df))
+    assert search_mask(df, positions, ["Country"], "uk").tolist() == [False] * 4
+    assert search_mask(df, positions, ["Country", "Source"], "referral").tolist() == [False, True, False, False]
+
+
+def test_search_arrow_strings_never_matches_missing():
+    df = pd.DataFrame({"Address": pd.array(["Nairobi, Kenya", None, "Canada"], dtype=pd.ArrowDtype(pa.string()))})
+    positions = np.arange(len(df))
+    assert search_mask(df, positions, ["Address"], "NA").tolist() == [True, False, True]
+    assert search_mask(df, positions, ["Address"], "<na>").tolist() == [False] * 3
+
+
+def test_matching_positions_respects_row_mask():
+    df = frame()
+    rows = np.array([True, True, False, False])
+    assert matching_positions(df, ["Source"], rows, "linkedin").tolist() == [0]
+
+
+def test_page_slice_sorts_and_pages():
+    df = pd.DataFrame({"n": [3, 1, 2, 5, 4]})
+    page = page_slice(df, np.arange(5), ["n"], sort_by="n", ascending=False, page=1, page_size=2)
+    assert page["n"].tolist() == [3, 2]
+
+
+def test_page_slice_copies_only_the_page():
+    df = pd.DataFrame({"Score": np.array([1.0, 2.0, 3.0]), "job_type": ["a", "b", "c"]})
+    page = page_slice(df, np.array([2, 0, 1]), ["Score", "job_type"], page=0, page_size=2)
+    assert page["Score"].tolist() == [3.0, 1.0]
+    page.loc[page.index[0], "Score"] = 0.0
+    assert df["Score"].tolist() == [1.0, 2.0, 3.0]
@@ -0,0 +1,52 @@
+import pandas as pd
+
+from utils.ingest import append_frames
+
+# Every dimension the dashboard filters or groups applications on
+CUBE_DIMENSIONS = [
+    "job_type", "gender", "submit_year", "submit_month", "City", "Country",
+    "availability_bucket", "submit_time_of_day",
+]
+
+AVAILABILITY_BINS = [-float("inf"), 7, 14, 30, float("inf")]
+AVAILABILITY_BUCKETS = ["<= 7 days", "8-14 days", "15-30 days", "> 30 days"]
+
+
+def availability_bucket(days):
+    buckets = pd.cut(days, bins=AVAILABILITY_BINS, labels=AVAILABILITY_BUCKETS)
+    return buckets.astype(object).where(days.notna(), "Unknown")
+
+
+def build_cube(df):
+    """Count applications per combination of CUBE_DIMENSIONS, one row per non-empty cell."""
+    keys = df[[d for d in CUBE_DIMENSIONS if d != "availability_bucket"]].copy()
+    days = (df["Earliest Available Date"] - df["Submission Date"]).dt.days
+    keys["availability_bucket"] = availability_bucket(days)
+    # dropna=False so applicants with e.g. no address still count towards the totals
+    return keys.groupby(CUBE_DIMENSIONS, dropna=False, observed=True).size().reset_index(name="count")
+
+
+def slice_cube(cube, filters=None):
+    # filters: {dimension: allowed values}
+    if not filters:
+        return cube
+    mask = pd.Series(True, index=cube.index)
+    for dim, values in filters.items():
+        mask &= cube[dim].isin(values)
+    return cube[mask]
+
+
+def cube_total(cube, filters=None):
+    return int(slice_cube(cube, filters)["count"].sum())
+
+
+def cube_counts(cube, by, filters=None):
+    """Counts grouped by `by` (a dimension or list of them), largest first, ties alphabetical."""
+    counts = slice_cube(cube, filters).groupby(by, observed=True)["count"].sum()
+    return counts.sort_values(ascending=False, kind="stable")
+
+
+def merge_cubes(cube, delta_cube):
+    # Cubes are plain counts, so adding new rows is a sum over the union of cells
+    merged = append_frames(cube, delta_cube)
+    return merged.groupby(CUBE_DIMENSIONS, dropna=False, observed=True)["count"].sum().reset_index()
@@ -1,28 +1,32 @@
+import csv
+import os
+import threading
 import pandas as pd
 from pathlib import Path
-import re
 import streamlit as st
 import time
-from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
+from utils.ingest import DeltaStore
+from utils.geocode_store import GeocodeStore, normalise_location
+from utils.gazetteer import load_gazetteer
+from utils.dataset import PreparedDataset
+from utils.ip_dimension import IpDimension
+from utils.minhash import signature_column
+from utils.timeseries import Rollups
+from utils.schema import (
+    APPLICATION_CATEGORIES, APPLICATION_STRINGS, EXPORT_COLUMN_TYPES, EXPORT_TIMESTAMP_FORMATS,
+    MAILING_LIST_CATEGORIES, SMALL_INTS, compact,
+)
+from utils.timing import count, span
 
-job_apps_dir = Path("Application/")
-
-csv_files = list(job_apps_dir.rglob("*.csv"))
+# Bump whenever a derive_* function changes so stale stores get rebuilt
+PIPELINE_VERSION = 9
 
-dfs = {}
-for file in csv_files:
-    # Extract the job type from the csv filename
-    job_type = file.stem.split("-application")[0] 
-    
-    df = pd.read_csv(file)
-    df["job_type"] = job_type  # add new column
-    
-    dfs[file.stem.split("-application")[0]] = df
-job_apps_types = list(dfs.keys())
-all_applications = pd.concat(dfs[x] for x in job_apps_types)
+# Files parsed concurrently when several exports changed at once
+INGEST_WORKERS = int(os.environ.get("CADWARE_INGEST_WORKERS", os.cpu_count() or 1))
 
-reduced_all_applications = all_applications.drop(columns = ['User Id', 'Notes', 'Submission Admin View URL', 'Submitter IP', 'Submitter Browser', 'Submitter Device', 'Submission ID', 'Submission Serial Number', 'Source URL', 'Submission Status'])
+job_apps_dir = Path("Application/")
+mailing_list_dir = Path("Join Mailing List/")
+messages_dir = Path("Send Us a message/")
 
 gender_map = {
     "Mr": "Male",
@@ -30,101 +34,399 @@ gender_map = {
     "Miss": "Female"
 }
 
-reduced_all_applications["gender"] = reduced_all_applications["Title"].map(gender_map)
-
-reduced_all_applications.drop('Title',axis=1, inplace=True)
-
-
-def extract_country(address):
-    if pd.isna(address):
-        return None
-    match = re.search(r'\((.*?)\)$', address.strip())
-    if match:
-        return match.group(1)
-    return address.split(',')[-1].strip()
-
-def extract_city(address):
-    if pd.isna(address):
-        return None
-    parts = address.split(',')
-    return parts[0].strip()
-
-def extract_state(address):
-    if pd.isna(address):
-        return None
-    parts = address.split(',')
-    if len(parts) > 2:
-        return parts[1].strip()
-    elif len(parts) == 2:
-        # Only city and country
-        return None
-    return None
-
-# Function to geocode locations with persistent caching
-@st.cache_data(persist=True)  # Persist cache to disk for reuse across sessions
-def geocode_locations(unique_locations_tuple, _cache_key="geocode_cache"):
+
+def parse_addresses(addresses):
+    """City, State/Region and Country of each address, plus the joined `location` string.
+
+    The city is the first comma-separated part, the region the second when there are three or more,
+    and the country the text in trailing brackets or else the last part. Each distinct address is
+    parsed once with pandas string kernels and the results are broadcast back to every row, so cost
+    scales with unique addresses rather than rows.
+    """
+    codes, uniques = pd.factorize(addresses)
+    uniques = pd.Series(uniques, dtype=object).str.strip()
+    parts = uniques.str.split(',')
+
+    city = parts.str[0].str.strip()
+    state = parts.str[1].str.strip().where(parts.str.len() > 2)
+    country = uniques.str.extract(r'\((.*?)\)$', expand=False).fillna(parts.str[-1].str.strip())
+
+    # Same as f"{City}, {State/Region}, {Country}" but without literal "None" for missing parts
+    location = city.str.cat([state, country], sep=', ', na_rep='').str.replace(r'(, )+', ', ', regex=True).str.strip(', ')
+
+    parsed = pd.DataFrame({"City": city, "State/Region": state, "Country": country, "location": location})
+    # Append an all-missing row so factorize's -1 (missing address) maps to None
+    parsed = pd.concat([parsed, pd.DataFrame([[None] * 4], columns=parsed.columns)], ignore_index=True)
+    values = parsed.to_numpy(dtype=object)[codes]
+    return pd.DataFrame(values, columns=parsed.columns, index=addresses.index)
+
+# Set CADWARE_GEOCODE_REMOTE=0 on hosts without outbound network
+GEOCODE_REMOTE = os.environ.get("CADWARE_GEOCODE_REMOTE", "1") != "0"
+
+# One store and one gazetteer per process, shared by every session
+@st.cache_resource
+def get_geocode_store():
+    return GeocodeStore()
+
+@st.cache_resource
+def get_gazetteer():
+    return load_gazetteer()
+
+# Function to geocode locations: offline gazetteer first, then the persistent store, then Nominatim
+def geocode_locations(unique_locations_tuple, _cache_key="geocode_cache", remote=None):
+    gazetteer = get_gazetteer()
+    lat_lon, unresolved = {}, []
+    with span("geocode.gazetteer"):
+        for loc in unique_locations_tuple:
+            coords = gazetteer.lookup_location(loc) if len(gazetteer) else None
+            if coords:
+                lat_lon[loc] = coords
+            else:
+                unresolved.append(loc)
+    count("geocode.gazetteer_hit", len(lat_lon))
+    if not unresolved:
+        return lat_lon
+
+    store = get_geocode_store()
+    with span("geocode.store"):
+        cached, missing = store.get_many(unresolved)
+    lat_lon.update(cached)
+    count("geocode.store_hit", len(cached))
+    count("geocode.store_miss", len(missing))
+    if remote is None:
+        remote = GEOCODE_REMOTE
+    if not remote:
+        lat_lon.update({loc: (None, None) for loc in missing})
+        return lat_lon
+    if not missing:
+        return lat_lon
+
+    # Only cache misses reach Nominatim, once per normalised address; geopy is only imported for them
+    count("geocode.remote", len(missing))
+    from geopy.geocoders import Nominatim
+    from geopy.extra.rate_limiter import RateLimiter
     geolocator = Nominatim(user_agent="cadware_dash")
     geocode = RateLimiter(geolocator.geocode, min_delay_seconds=2, error_wait_seconds = 10)
-    lat_lon = {}
-    for loc in unique_locations_tuple:
+    resolved = {}
+    for loc in missing:
+        key = normalise_location(loc)
+        if key in resolved:
+            lat_lon[loc] = resolved[key]
+            continue
         try:
             location = geocode(loc)
             if location:
                 lat_lon[loc] = (location.latitude, location.longitude)
             else:
                 lat_lon[loc] = (None, None)
+            # Negative results are stored too and expire after the store's TTL
+            store.put(loc, *lat_lon[loc])
         except Exception as e:
+            # Transient errors are not persisted, so the next run retries them
             st.warning(f"Error geocoding {loc}: {e}")
             lat_lon[loc] = (None, None)
             time.sleep(1)
+        resolved[key] = lat_lon[loc]
     return lat_lon
 
-reduced_all_applications["Country"] = reduced_all_applications["Address"].apply(extract_country)
-reduced_all_applications["City"] = reduced_all_applications["Address"].apply(extract_city)
-reduced_all_applications["State/Region"] = reduced_all_applications["Address"].apply(extract_state)
+# Define function to categorize time of day
+def categorize_time_of_day(hour):
+    if 0 <= hour < 12:
+        return 'Morning'
+    elif 12 <= hour < 18:
+        return 'Afternoon'
+    else:
+        return 'Evening'
+
 
+# Export columns no page reads. The Arrow readers skip them, so they are never parsed into memory
+# or turned into Python strings; the derive_* functions drop them from frames read other ways.
+# Submission ID stays everywhere (it is the dedup key), and so does Submitter IP, for the IP dimension
+APPLICATION_UNUSED = ['User Id', 'Notes', 'Submission Admin View URL', 'Submitter Browser', 'Submitter Device',
+                      'Submission Serial Number', 'Source URL', 'Submission Status']
+MAILING_LIST_UNUSED = ['Submitter Browser', 'User Id', 'Submission Status', 'Submission Admin View URL', 'Source URL',
+                       'Submission Serial Number']
+MESSAGES_UNUSED = ['User Id', 'Submission Status', 'Submission Admin View URL', 'Source URL', 'Submission Serial Number']
 
-reduced_all_applications.rename(columns={"What is your earliest available date": "Earliest Available Date"}, inplace=True)
-reduced_all_applications.rename(columns={"Submission Create Date": "Submission Date"}, inplace=True)
 
-reduced_all_applications['Earliest Available Date'] = pd.to_datetime(reduced_all_applications['Earliest Available Date'], format='%d/%m/%Y')
+def read_export_table(file, drop=()):
+    """One export parsed by Arrow's CSV reader, with explicit column types and date formats.
 
-reduced_all_applications["Available_DayOfWeek"] = reduced_all_applications["Earliest Available Date"].dt.day_name()
-reduced_all_applications["Available_Month"] = reduced_all_applications["Earliest Available Date"].dt.month_name()
-reduced_all_applications["Available_Year"] = reduced_all_applications["Earliest Available Date"].dt.year
+    Columns in `drop` are skipped by the reader, so they are never converted or held in memory.
+    """
+    # Imported here: only ingest needs the CSV reader, page imports shouldn't pay for it
+    import pyarrow.csv as pacsv
 
+    include = []
+    if drop:
+        with open(file, newline="", encoding="utf-8-sig") as f:
+            header = next(csv.reader(f), [])
+        include = [column for column in header if column not in drop]
+    return pacsv.read_csv(
+        file,
+        # Messages span several lines inside quotes
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            column_types=EXPORT_COLUMN_TYPES,
+            timestamp_parsers=EXPORT_TIMESTAMP_FORMATS,
+            strings_can_be_null=True,
+            include_columns=include,
+        ),
+    )
 
-# Ensure 'Submission Date' is in datetime format
-reduced_all_applications['Submission Date'] = pd.to_datetime(reduced_all_applications['Submission Date'])
 
-# Extract year, month (as full name), day
-reduced_all_applications['submit_year'] = reduced_all_applications['Submission Date'].dt.year
-reduced_all_applications['submit_month'] = reduced_all_applications['Submission Date'].dt.strftime('%B')
-reduced_all_applications['submit_day'] = reduced_all_applications['Submission Date'].dt.day
+def read_application_table(file):
+    import pyarrow as pa
 
-# Define function to categorize time of day
-def categorize_time_of_day(hour):
-    if 0 <= hour < 12:
-        return 'Morning'
-    elif 12 <= hour < 18:
-        return 'Afternoon'
+    table = read_export_table(file, APPLICATION_UNUSED)
+    job_type = file.stem.split("-application")[0]
+    return table.append_column("job_type", pa.array([job_type] * table.num_rows, pa.string()))
+
+
+def read_mailing_list_table(file):
+    return read_export_table(file, MAILING_LIST_UNUSED)
+
+
+def read_messages_table(file):
+    return read_export_table(file, MESSAGES_UNUSED)
+
+
+def derive_applications(all_applications):
+    # Submission ID stays: together with job_type it identifies a row across dated exports
+    reduced_all_applications = all_applications.drop(columns=APPLICATION_UNUSED, errors='ignore')
+
+    # A batch made only of address-less forms (e.g. Product Manager) has no Address column at all
+    if "Address" not in reduced_all_applications:
+        reduced_all_applications["Address"] = None
+
+    reduced_all_applications["gender"] = reduced_all_applications["Title"].map(gender_map)
+    reduced_all_applications.drop('Title',axis=1, inplace=True)
+
+    # City, State/Region, Country and location in one pass over the distinct addresses
+    with span("derive.parse_addresses"):
+        parsed = parse_addresses(reduced_all_applications["Address"])
+    for column in ("Country", "City", "State/Region", "location"):
+        reduced_all_applications[column] = parsed[column].to_numpy()
+
+    reduced_all_applications.rename(columns={"What is your earliest available date": "Earliest Available Date"}, inplace=True)
+    reduced_all_applications.rename(columns={"Submission Create Date": "Submission Date"}, inplace=True)
+
+    reduced_all_applications['Earliest Available Date'] = pd.to_datetime(reduced_all_applications['Earliest Available Date'], format='%d/%m/%Y')
+
+    reduced_all_applications["Available_DayOfWeek"] = reduced_all_applications["Earliest Available Date"].dt.day_name()
+    reduced_all_applications["Available_Month"] = reduced_all_applications["Earliest Available Date"].dt.month_name()
+    reduced_all_applications["Available_Year"] = reduced_all_applications["Earliest Available Date"].dt.year
+
+    # Ensure 'Submission Date' is in datetime format
+    reduced_all_applications['Submission Date'] = pd.to_datetime(reduced_all_applications['Submission Date'])
+
+    # Extract year, month (as full name), day
+    reduced_all_applications['submit_year'] = reduced_all_applications['Submission Date'].dt.year
+    reduced_all_applications['submit_month'] = reduced_all_applications['Submission Date'].dt.strftime('%B')
+    reduced_all_applications['submit_day'] = reduced_all_applications['Submission Date'].dt.day
+
+    # Extract hour and apply time of day categorization
+    reduced_all_applications['submit_time_of_day'] = reduced_all_applications['Submission Date'].dt.hour.apply(categorize_time_of_day)
+
+    # Low-cardinality strings as categoricals (Parquet keeps them dictionary-encoded in the snapshot),
+    # near-unique ones like Address and Submitter IP as Arrow strings
+    return compact(reduced_all_applications, APPLICATION_CATEGORIES, SMALL_INTS, APPLICATION_STRINGS)
+
+
+def derive_mailing_list(df):
+    df['Submission Create Date'] = pd.to_datetime(df['Submission Create Date'])
+    df = df.drop(columns=MAILING_LIST_UNUSED, errors='ignore')
+    df['How did you hear about us?'] = df['How did you hear about us?'].fillna(value="Online")
+    # Channel and device as categoricals, so copies handed to each session stay small
+    return compact(df, MAILING_LIST_CATEGORIES)
+
+
+# Map devices to categories
+def device_type(device):
+    if device in ['Android', 'iPhone']:
+        return 'Mobile'
+    elif device in ['Windows', 'Apple']:
+        return 'Desktop'
     else:
-        return 'Evening'
+        return 'Other'
+
+
+def signup_rollups(df):
+    """Daily mailing-list sign-ups per channel, device and device type; every mailing-list chart slices these."""
+    dimensions = pd.DataFrame({
+        'How did you hear about us?': df['How did you hear about us?'],
+        'Submitter Device': df['Submitter Device'],
+        'Device Type': df['Submitter Device'].map(device_type),
+    })
+    return Rollups(df['Submission Create Date'], dimensions)
+
+
+def signup_hour_rollups(df):
+    """Daily mailing-list sign-ups per channel and hour of day, for the hourly pattern without the rows."""
+    dates = df['Submission Create Date']
+    dimensions = pd.DataFrame({
+        'How did you hear about us?': df['How did you hear about us?'],
+        'Hour': dates.dt.hour,
+    })
+    return Rollups(dates, dimensions)
+
+
+def derive_messages(df):
+    df['Submission Create Date'] = pd.to_datetime(df['Submission Create Date'])
+    df = df.drop(columns=MESSAGES_UNUSED, errors='ignore')
+    # MinHash signatures are stored with the rows, so a new export only hashes its own messages
+    with span("derive.minhash"):
+        df['minhash'] = signature_column(df['Message'])
+    return df
+
+
+# Append-only stores: each dated export is parsed once, rows are deduplicated on Submission ID
+# and only new rows are derived and appended. A warm start is a stat per file plus mmap'd Parquet reads.
+_stores = None
+_stores_lock = threading.Lock()
+
+def load():
+    """Open the export stores, ingesting whatever is new; the first call does the work, later ones are free.
+
+    Nothing is read at import time, so importing this module stays cheap for pages, the
+    benchmarks and file-watch reloads that never touch the data.
+    """
+    global _stores
+    with _stores_lock:
+        if _stores is None:
+            with span("load.stores"):
+                _stores = {
+                    "applications": DeltaStore(
+                        "applications", job_apps_dir, read_application_table, derive_applications,
+                        key=["job_type", "Submission ID"], pipeline_version=PIPELINE_VERSION, workers=INGEST_WORKERS
+                    ),
+                    "mailing_list": DeltaStore(
+                        "mailing_list", mailing_list_dir, read_mailing_list_table, derive_mailing_list,
+                        key=["Submission ID"], pipeline_version=PIPELINE_VERSION, workers=INGEST_WORKERS
+                    ),
+                    "messages": DeltaStore(
+                        "messages", messages_dir, read_messages_table, derive_messages,
+                        key=["Submission ID"], pipeline_version=PIPELINE_VERSION, workers=INGEST_WORKERS
+                    ),
+                }
+        return _stores
+
+
+def count_immediate(frame):
+    # Applicants available within a week of submitting
+    candidates = frame.dropna(subset=['Earliest Available Date', 'Submission Date'])
+    return int((candidates['Earliest Available Date'] <= candidates['Submission Date'] + pd.Timedelta(days=7)).sum())
+
+
+# Old module-level names, now computed on first access through load()
+_LAZY = {
+    "applications_store": lambda: load()["applications"],
+    "mailing_list_store": lambda: load()["mailing_list"],
+    "messages_store": lambda: load()["messages"],
+    "export_stores": lambda: list(load().values()),
+    "reduced_all_applications": lambda: load()["applications"].frame,
+    "data_version": lambda: load()["applications"].data_version,
+    "num_immediate": lambda: count_immediate(load()["applications"].frame),
+    "csv_files": lambda: list(job_apps_dir.rglob("*.csv")),
+}
+
+def __getattr__(name):
+    if name in _LAZY:
+        return _LAZY[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_dataset = None
+_dataset_lock = threading.Lock()
+
+def get_dataset():
+    """The read-only PreparedDataset for the latest exports, shared by every session and page.
+
+    New exports are picked up on the next call (at most one stat sweep every couple of seconds);
+    the previous dataset is extended with just the new rows so its aggregates update incrementally.
+    """
+    global _dataset
+    with _dataset_lock:
+        store = load()["applications"]
+        store.refresh()
+        frame, version = store.frame, store.data_version
+        if _dataset is None or _dataset.data_version != version:
+            # The store only ever appends, so everything past the old length is new
+            if _dataset is not None and len(frame) > len(_dataset):
+                _dataset = _dataset.extend(frame, frame.iloc[len(_dataset):], version)
+            else:
+                _dataset = PreparedDataset(frame, version)
+        return _dataset
+
+
+def get_mailing_list():
+    store = load()["mailing_list"]
+    store.refresh()
+    return store.frame, store.data_version
+
+
+def get_messages():
+    store = load()["messages"]
+    store.refresh()
+    return store.frame, store.data_version
+
+
+# Submission timestamp column of each store, for first/last seen in the IP dimension
+DATE_COLUMNS = {
+    "applications": "Submission Date",
+    "mailing_list": "Submission Create Date",
+    "messages": "Submission Create Date",
+}
+
+_ip_resolver = None
+_ip_dimension = None
+_ip_lock = threading.Lock()
+
+def get_ip_resolver():
+    # One per process: the GeoLite2 db stays memory-mapped and the IP cache persists on disk
+    global _ip_resolver
+    with _ip_lock:
+        if _ip_resolver is None:
+            from utils.ip_geo import IpResolver
+            _ip_resolver = IpResolver()
+        return _ip_resolver
+
+
+def get_ip_dimension():
+    """The IP dimension shared by every page, caught up with whatever the stores ingested since the last call.
 
-# Extract hour and apply time of day categorization
-reduced_all_applications['submit_time_of_day'] = reduced_all_applications['Submission Date'].dt.hour.apply(categorize_time_of_day)
+    IPs are only geolocated when a page asks for them (IpDimension.resolve), and then only once per process.
+    """
+    global _ip_dimension
+    frames = {}
+    for name, store in load().items():
+        store.refresh()
+        frames[name] = (store.frame, DATE_COLUMNS[name])
+    with _ip_lock:
+        if _ip_dimension is None:
+            _ip_dimension = IpDimension()
+        _ip_dimension.sync(frames)
+        return _ip_dimension
 
 
-reduced_all_applications['Earliest Available Date'] = pd.to_datetime(reduced_all_applications['Earliest Available Date'], errors='coerce')
-reduced_all_applications['Submission Date'] = pd.to_datetime(reduced_all_applications['Submission Date'], errors='coerce')
+def watch_exports(interval=5.0):
+    """Poll the export folders in the background so new files are ingested before anyone reruns."""
+    def poll():
+        while True:
+            time.sleep(interval)
+            for store in load().values():
+                try:
+                    store.refresh(force=True)
+                except Exception:
+                    # A half-copied export fails to parse; the next sweep picks it up again
+                    pass
 
-# Drop rows with invalid dates
-temp = reduced_all_applications
-immediate_candidates = temp.dropna(subset=['Earliest Available Date', 'Submission Date'])
+    thread = threading.Thread(target=poll, name="cadware-export-watcher", daemon=True)
+    thread.start()
+    return thread
 
-# Filter for candidates available within 10 days of submission
-immediate_candidates = immediate_candidates[
-    immediate_candidates['Earliest Available Date'] <= immediate_candidates['Submission Date'] + pd.Timedelta(days=7)
-]
 
-num_immediate = len(immediate_candidates)
\ No newline at end of file
+# One watcher per process
+@st.cache_resource
+def start_export_watcher():
+    return watch_exports()
@@ -0,0 +1,131 @@
+import threading
+from functools import wraps
+
+import pandas as pd
+
+from utils.cube import build_cube, merge_cubes
+from utils.quantiles import box_summaries, merge_sketches, sketch_by
+from utils.schema import MONTH_ORDER
+from utils.spatial import location_counts
+from utils.timing import count, span
+
+DERIVED_COLUMNS = ("location", "gender", "availability_days", "submit_month", "submit_hour")
+
+
+def memoised(method):
+    """Like functools.cached_property, but computed once even when sessions ask concurrently."""
+    name = method.__name__
+
+    @wraps(method)
+    def getter(self):
+        try:
+            value = self._memo[name]
+            count("dataset.memo_hit")
+            return value
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._memo:
+                count("dataset.memo_miss")
+                with span(f"dataset.{name}"):
+                    self._memo[name] = method(self)
+            return self._memo[name]
+
+    return property(getter)
+
+
+def _availability_days(frame):
+    return (frame["Earliest Available Date"] - frame["Submission Date"]).dt.days
+
+
+class PreparedDataset:
+    """Read-only applications frame for one data version, with derived columns computed on first use.
+
+    One instance is shared by every session and page in the process; never assign into `frame`.
+    """
+
+    def __init__(self, frame, data_version):
+        self.frame = frame
+        self.data_version = data_version
+        self._memo = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.frame)
+
+    @memoised
+    def location(self):
+        if "location" in self.frame:
+            return self.frame["location"]
+        from utils.data_processor import parse_addresses
+        return parse_addresses(self.frame["Address"])["location"]
+
+    @memoised
+    def gender(self):
+        if "gender" in self.frame:
+            return self.frame["gender"]
+        from utils.data_processor import gender_map
+        return self.frame["Title"].map(gender_map)
+
+    @memoised
+    def availability_days(self):
+        return _availability_days(self.frame)
+
+    @memoised
+    def submit_month(self):
+        if isinstance(self.frame["submit_month"].dtype, pd.CategoricalDtype):
+            return self.frame["submit_month"]
+        return pd.Categorical(self.frame["submit_month"], categories=MONTH_ORDER, ordered=True)
+
+    @memoised
+    def submit_hour(self):
+        return self.frame["Submission Date"].dt.hour
+
+    @memoised
+    def unique_locations(self):
+        return tuple(self.location.dropna().unique())
+
+    @memoised
+    def location_counts(self):
+        # Applicants per (location, job type); the map filters and aggregates this instead of the rows
+        return location_counts(self.location, by={"job_type": self.frame["job_type"]})
+
+    @memoised
+    def job_types(self):
+        return sorted(self.frame["job_type"].dropna().unique())
+
+    @memoised
+    def cube(self):
+        return build_cube(self.frame)
+
+    @memoised
+    def availability_sketches(self):
+        # {job type: quantile sketch of availability_days}; the box plot is drawn from these
+        return sketch_by(self.availability_days, self.frame["job_type"])
+
+    @memoised
+    def availability_box(self):
+        # Five-number summary and outlier sample per job type, a few hundred bytes whatever the row count
+        return box_summaries(self.availability_sketches).rename(columns={"group": "job_type"})
+
+    def extend(self, frame, delta, data_version):
+        """Dataset for `frame` (this one plus the appended `delta` rows), reusing aggregates already built."""
+        extended = PreparedDataset(frame, data_version)
+        if "cube" in self._memo:
+            extended._memo["cube"] = merge_cubes(self._memo["cube"], build_cube(delta))
+        if "availability_sketches" in self._memo:
+            extended._memo["availability_sketches"] = merge_sketches(
+                self._memo["availability_sketches"], sketch_by(_availability_days(delta), delta["job_type"])
+            )
+        return extended
+
+    def columns(self, *names):
+        """New frame holding the requested base and derived columns, sharing the underlying data.
+
+        Filter it into new frames as usual, but don't assign into it: that would write to the shared columns.
+        """
+        data = {}
+        for name in names:
+            value = getattr(self, name) if name in DERIVED_COLUMNS else self.frame[name]
+            data[name] = value.array if isinstance(value, pd.Series) else value
+        return pd.DataFrame(data, index=self.frame.index, copy=False)
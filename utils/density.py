@@ -0,0 +1,81 @@
+import numpy as np
+
+HOURS_PER_DAY = 24
+
+
+def _weighted_std(values, weights):
+    # Same estimate gaussian_kde uses (np.cov with aweights), so bw_factor means the same thing
+    total = weights.sum()
+    mean = np.dot(weights, values) / total
+    dof = total - np.dot(weights, weights) / total
+    if dof <= 0:
+        return 0.0
+    return float(np.sqrt(np.dot(weights, (values - mean) ** 2) / dof))
+
+
+def bin_circular(values, period, bins, weights=None):
+    """Linear binning onto `bins` evenly spaced grid points around a circle of length `period`.
+
+    Each value splits its weight between the two nearest grid points, and the last point
+    wraps onto the first, so 23:30 lands between 23:00 and 00:00 rather than at the edge.
+    """
+    step = period / bins
+    pos = np.mod(values, period) / step
+    lower = np.floor(pos).astype(np.int64)
+    frac = pos - lower
+    lower %= bins
+    upper = (lower + 1) % bins
+    if weights is None:
+        weights = np.ones(len(pos))
+    counts = np.bincount(lower, weights=weights * (1 - frac), minlength=bins)
+    counts += np.bincount(upper, weights=weights * frac, minlength=bins)
+    return counts
+
+
+def wrapped_gaussian(period, bins, bandwidth):
+    # Kernel value at each grid offset, summed over enough wraps that the tails come back around
+    step = period / bins
+    offsets = np.arange(bins) * step
+    wraps = int(np.ceil(4 * bandwidth / period)) + 1
+    kernel = np.zeros(bins)
+    for k in range(-wraps, wraps + 1):
+        kernel += np.exp(-0.5 * ((offsets + k * period) / bandwidth) ** 2)
+    return kernel / (kernel.sum() * step)
+
+
+def circular_kde(values, period=HOURS_PER_DAY, bins=240, bandwidth=None, bw_factor=None, weights=None):
+    """Gaussian KDE for a circular quantity (hour of day by default), evaluated on `bins` grid points.
+
+    Values are binned first and then smoothed with a wrapped Gaussian by FFT convolution, so the
+    cost is O(n + bins log bins) however many rows there are. `bandwidth` is the kernel's standard
+    deviation in the units of `values`; without it, it is `bw_factor` (Scott's rule if None) times
+    the sample standard deviation, which matches scipy's gaussian_kde(values, bw_method=bw_factor)
+    away from the wrap-around point.
+
+    Returns (grid, density) with density integrating to 1 over one period.
+    """
+    values = np.asarray(values, dtype=float)
+    weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=float)
+    keep = np.isfinite(values) & (weights > 0)
+    values, weights = values[keep], weights[keep]
+    grid = np.arange(bins) * (period / bins)
+    if not len(values):
+        return grid, np.zeros(bins)
+
+    if bandwidth is None:
+        if bw_factor is None:
+            n_eff = weights.sum() ** 2 / np.dot(weights, weights)
+            bw_factor = n_eff ** (-1 / 5)
+        bandwidth = bw_factor * _weighted_std(values, weights)
+    # Never narrower than the grid spacing (a single distinct value has zero spread)
+    bandwidth = max(bandwidth, period / bins)
+
+    counts = bin_circular(values, period, bins, weights) / weights.sum()
+    kernel = wrapped_gaussian(period, bins, bandwidth)
+    density = np.fft.irfft(np.fft.rfft(counts) * np.fft.rfft(kernel), n=bins)
+    return grid, np.clip(density, 0, None)
+
+
+def closed_curve(grid, density, period=HOURS_PER_DAY):
+    # Repeat the first point at `period` so a line plot meets itself at midnight
+    return np.append(grid, period), np.append(density, density[:1])
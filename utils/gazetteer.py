@@ -0,0 +1,182 @@
+import io
+import sys
+import unicodedata
+import zipfile
+from collections import defaultdict
+from pathlib import Path
+
+from utils.geocode_store import normalise_location
+
+# GeoNames dumps (https://download.geonames.org/export/dump/), not committed like the GeoLite2 db
+GEONAMES_DIR = Path("utils/assets/geonames")
+GEONAMES_URL = "https://download.geonames.org/export/dump/"
+CITIES_FILE = "cities15000.txt"
+ADMIN1_FILE = "admin1CodesASCII.txt"
+COUNTRY_FILE = "countryInfo.txt"
+
+# Codes and long forms the application form uses that differ from ISO 3166 and GeoNames' names
+COUNTRY_ALIASES = {
+    "uk": "GB", "u.k.": "GB", "england": "GB", "scotland": "GB", "wales": "GB", "northern ireland": "GB",
+    "great britain": "GB", "britain": "GB",
+    "usa": "US", "u.s.a.": "US", "u.s.": "US", "america": "US", "united states": "US",
+    "united states of america": "US",
+    "uae": "AE", "holland": "NL", "the netherlands": "NL", "czech republic": "CZ",
+}
+
+
+def normalise_name(name):
+    # Fold accents and case so "Galle" and "GALLE" or "Kraków" and "Krakow" meet
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFKD", str(name))
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(name.casefold().replace("-", " ").split())
+
+
+def trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Gazetteer:
+    """In-memory city index: exact hash lookups on city|region|country, trigram fallback for typos."""
+
+    def __init__(self):
+        self.exact = {}
+        self.countries = {}
+        self.by_country = defaultdict(set)
+        self.trigram_index = defaultdict(set)
+        self._population = {}
+
+    def __len__(self):
+        return len(self._population)
+
+    def add_country(self, code, name):
+        self.countries[code.casefold()] = code
+        self.countries[normalise_name(name)] = code
+
+    def add_city(self, names, region, country, lat, lon, population=0):
+        country = country.upper()
+        region = normalise_name(region)
+        for name in {normalise_name(n) for n in names if n}:
+            # Keep the most populous match when a name is ambiguous at a given level
+            for key in (f"{name}|{region}|{country}", f"{name}||{country}", f"{name}||"):
+                if population >= self._population.get(key, -1):
+                    self.exact[key] = (lat, lon)
+                    self._population[key] = population
+            if name not in self.by_country[country]:
+                self.by_country[country].add(name)
+                for gram in trigrams(name):
+                    self.trigram_index[gram].add((name, country))
+
+    def resolve_country(self, country):
+        """ISO code for a country name, code or alias; "" if it isn't one (or is empty)."""
+        key = normalise_name(country)
+        # "Canada." as typed on the form, as well as "U.S.A."
+        for candidate in (key, key.rstrip(".")):
+            if candidate in COUNTRY_ALIASES:
+                return COUNTRY_ALIASES[candidate]
+            if candidate in self.countries:
+                return self.countries[candidate]
+        key = key.rstrip(".")
+        return key.upper() if len(key) == 2 else ""
+
+    def lookup(self, city, region=None, country=None, fuzzy=True):
+        city = normalise_name(city)
+        if not city:
+            return None
+        code = self.resolve_country(country)
+        if normalise_name(country) and not code:
+            # A country we can't place: the most populous city of that name anywhere would be a
+            # confident wrong answer, so leave it to the store and Nominatim
+            return None
+        region = normalise_name(region)
+        for key in (f"{city}|{region}|{code}", f"{city}||{code}"):
+            if key in self.exact:
+                return self.exact[key]
+        if not code:
+            # No country given at all: the most populous city of that name
+            return self.exact.get(f"{city}||")
+        if fuzzy:
+            match = self._fuzzy(city, code)
+            if match:
+                return self.exact[f"{match}||{code}"]
+        return None
+
+    def lookup_location(self, location, fuzzy=True):
+        # Accepts the "City, State/Region, Country" strings app.py builds
+        parts = normalise_location(location).split(", ")
+        if len(parts) >= 3:
+            return self.lookup(parts[0], parts[1], parts[-1], fuzzy)
+        if len(parts) == 2:
+            return self.lookup(parts[0], None, parts[1], fuzzy)
+        return self.lookup(parts[0], fuzzy=fuzzy)
+
+    def _fuzzy(self, city, country, threshold=0.5):
+        grams = trigrams(city)
+        scores = defaultdict(int)
+        for gram in grams:
+            for name, name_country in self.trigram_index.get(gram, ()):
+                if name_country == country:
+                    scores[name] += 1
+        best, best_score = None, threshold
+        for name, shared in scores.items():
+            score = shared / len(grams | trigrams(name))
+            if score > best_score:
+                best, best_score = name, score
+        return best
+
+
+def load_gazetteer(directory=GEONAMES_DIR):
+    """Build a Gazetteer from GeoNames dumps; empty if the files are not installed."""
+    directory = Path(directory)
+    gazetteer = Gazetteer()
+    if not (directory / CITIES_FILE).exists():
+        return gazetteer
+
+    if (directory / COUNTRY_FILE).exists():
+        with open(directory / COUNTRY_FILE, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#"):
+                    continue
+                cols = line.rstrip("\n").split("\t")
+                gazetteer.add_country(cols[0], cols[4])
+
+    admin1 = {}
+    if (directory / ADMIN1_FILE).exists():
+        with open(directory / ADMIN1_FILE, encoding="utf-8") as f:
+            for line in f:
+                code, name, *_ = line.rstrip("\n").split("\t")
+                admin1[code] = name
+
+    with open(directory / CITIES_FILE, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            country = cols[8]
+            region = admin1.get(f"{country}.{cols[10]}", "")
+            population = int(cols[14] or 0)
+            gazetteer.add_city((cols[1], cols[2]), region, country, float(cols[4]), float(cols[5]), population)
+    return gazetteer
+
+
+def download(directory=GEONAMES_DIR):
+    import requests
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    archive = requests.get(GEONAMES_URL + "cities15000.zip", timeout=60)
+    archive.raise_for_status()
+    zipfile.ZipFile(io.BytesIO(archive.content)).extract(CITIES_FILE, directory)
+    for name in (ADMIN1_FILE, COUNTRY_FILE):
+        res = requests.get(GEONAMES_URL + name, timeout=60)
+        res.raise_for_status()
+        (directory / name).write_bytes(res.content)
+
+
+if __name__ == "__main__":
+    # python -m utils.gazetteer download
+    if sys.argv[1:] == ["download"]:
+        download()
+        print(f"GeoNames dumps written to {GEONAMES_DIR}")
+    else:
+        print("usage: python -m utils.gazetteer download")
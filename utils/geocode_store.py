@@ -0,0 +1,75 @@
+import re
+import sqlite3
+import threading
+import time
+
+from utils.ingest import CACHE_DIR
+
+# Failed lookups are retried after a week, in case the geocoder learns the place
+NEGATIVE_TTL = 7 * 24 * 3600
+
+
+def normalise_location(location):
+    # "  San Jose,California , None" and "san jose, california" share one key
+    if location is None:
+        return ""
+    parts = [re.sub(r"\s+", " ", p).strip().casefold() for p in str(location).split(",")]
+    return ", ".join(p for p in parts if p and p not in ("none", "nan"))
+
+
+class GeocodeStore:
+    """Persistent per-location (lat, lon) cache backed by SQLite."""
+
+    def __init__(self, path=CACHE_DIR / "geocode.sqlite", negative_ttl=NEGATIVE_TTL):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            "key TEXT PRIMARY KEY, lat REAL, lon REAL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, locations):
+        """Return ({location: (lat, lon)} for cached entries, [locations still to geocode])."""
+        keys = {loc: normalise_location(loc) for loc in locations}
+        unique_keys = list(set(keys.values()))
+        rows = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(unique_keys), 500):
+                chunk = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for key, lat, lon, updated_at in self._conn.execute(
+                    f"SELECT key, lat, lon, updated_at FROM geocode WHERE key IN ({placeholders})", chunk
+                ):
+                    rows[key] = (lat, lon, updated_at)
+
+        now = time.time()
+        found, missing = {}, []
+        for loc, key in keys.items():
+            row = rows.get(key)
+            if row is None or (row[0] is None and now - row[2] > self.negative_ttl):
+                missing.append(loc)
+            else:
+                found[loc] = (row[0], row[1])
+        # Sessions call this concurrently; += on a shared counter isn't atomic
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def put(self, location, lat, lon):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode (key, lat, lon, updated_at) VALUES (?, ?, ?, ?)",
+                (normalise_location(location), lat, lon, time.time()),
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,175 @@
+import json
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+ASSETS_DIR = Path("utils/assets")
+# Douglas-Peucker tolerance in degrees for each bundled level; "high" is the source outline
+LEVELS = {"low": 0.5, "medium": 0.1, "high": 0.0}
+DEFAULT_LEVEL = "medium"
+
+# Natural Earth short names -> the English names GeoLite2 / ip-api report, baked into the assets
+SOURCE_RENAMES = {
+    "United States of America": "United States",
+    "Bosnia and Herz.": "Bosnia and Herzegovina",
+    "Central African Rep.": "Central African Republic",
+    "Dem. Rep. Congo": "DR Congo",
+    "Congo": "Congo Republic",
+    "Côte d'Ivoire": "Ivory Coast",
+    "Dominican Rep.": "Dominican Republic",
+    "Eq. Guinea": "Equatorial Guinea",
+    "Falkland Is.": "Falkland Islands",
+    "Fr. S. Antarctic Lands": "French Southern Territories",
+    "N. Cyprus": "Northern Cyprus",
+    "S. Sudan": "South Sudan",
+    "Solomon Is.": "Solomon Islands",
+    "W. Sahara": "Western Sahara",
+    "eSwatini": "Eswatini",
+}
+
+# Other spellings that turn up in the data, mapped onto the asset names
+COUNTRY_ALIASES = {
+    "united states of america": "United States",
+    "usa": "United States",
+    "us": "United States",
+    "uk": "United Kingdom",
+    "great britain": "United Kingdom",
+    "england": "United Kingdom",
+    "the netherlands": "Netherlands",
+    "türkiye": "Turkey",
+    "czech republic": "Czechia",
+    "russian federation": "Russia",
+    "republic of the congo": "Congo Republic",
+    "democratic republic of the congo": "DR Congo",
+    "côte d'ivoire": "Ivory Coast",
+    "swaziland": "Eswatini",
+    "macedonia": "North Macedonia",
+}
+
+
+def normalise_country_name(name):
+    if not isinstance(name, str) or not name.strip():
+        return None
+    name = " ".join(name.split())
+    return COUNTRY_ALIASES.get(name.casefold(), SOURCE_RENAMES.get(name, name))
+
+
+def _simplify_line(points, tolerance):
+    # Iterative Douglas-Peucker; always keeps both end points
+    if tolerance <= 0 or len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = points[start], points[end]
+        segment = b - a
+        inner = points[start + 1:end]
+        length = np.hypot(*segment)
+        if length == 0:
+            dists = np.hypot(*(inner - a).T)
+        else:
+            dists = np.abs(segment[0] * (inner[:, 1] - a[1]) - segment[1] * (inner[:, 0] - a[0])) / length
+        i = int(np.argmax(dists))
+        if dists[i] > tolerance:
+            keep[start + 1 + i] = True
+            stack.append((start, start + 1 + i))
+            stack.append((start + 1 + i, end))
+    return points[keep]
+
+
+def _simplify_polygon(rings, tolerance, decimals):
+    out = []
+    for ring in rings:
+        simplified = _simplify_line(np.asarray(ring, dtype=float), tolerance)
+        # Drop rings that collapsed (islands smaller than the tolerance)
+        if len(simplified) >= 4:
+            out.append(np.round(simplified, decimals).tolist())
+    return out
+
+
+def _ring_area(ring):
+    # Shoelace formula, in square degrees
+    x, y = ring[:, 0], ring[:, 1]
+    return abs(np.dot(x, np.roll(y, 1)) - np.dot(y, np.roll(x, 1))) / 2
+
+
+def _minimal_ring(ring, decimals):
+    # Closed triangle through the ring's start, the point furthest from it and the point furthest
+    # from that chord: the first points Douglas-Peucker would keep at any tolerance
+    start = ring[0]
+    far = int(np.argmax(np.hypot(*(ring - start).T)))
+    segment = ring[far] - start
+    off = int(np.argmax(np.abs(segment[0] * (ring[:, 1] - start[1]) - segment[1] * (ring[:, 0] - start[0]))))
+    points = ring[sorted({0, far, off})]
+    return np.round(np.vstack([points, points[:1]]), decimals).tolist()
+
+
+def simplify_geojson(geojson, tolerance, decimals=2):
+    features = []
+    for feature in geojson["features"]:
+        geometry = feature["geometry"]
+        if geometry["type"] == "Polygon":
+            polygons = [geometry["coordinates"]]
+        else:
+            polygons = geometry["coordinates"]
+        if not polygons:
+            continue
+        simplified = [p for p in (_simplify_polygon(rings, tolerance, decimals) for rings in polygons) if p]
+        if not simplified:
+            # Every ring collapsed (a small country or island state): keep a triangle of its largest
+            # outline so the country still shows up, instead of vanishing from the map
+            largest = max((np.asarray(rings[0], dtype=float) for rings in polygons), key=_ring_area)
+            simplified = [[_minimal_ring(largest, decimals)]]
+        polygons = simplified
+        name = feature["properties"]["name"]
+        features.append({
+            "type": "Feature",
+            "id": feature["properties"].get("iso_a3"),
+            "properties": {"name": SOURCE_RENAMES.get(name, name)},
+            "geometry": {"type": "MultiPolygon", "coordinates": polygons},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def asset_path(level):
+    return ASSETS_DIR / f"countries_{level}.geo.json"
+
+
+@lru_cache(maxsize=None)
+def load_country_geometry(level=DEFAULT_LEVEL):
+    """Bundled country outlines at `level`; parsed once per process and shared by every session."""
+    with open(asset_path(level), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def subset_geometry(geojson, names):
+    # Only ship outlines for countries that actually appear in the figure
+    names = set(names)
+    return {
+        "type": "FeatureCollection",
+        "features": [f for f in geojson["features"] if f["properties"]["name"] in names],
+    }
+
+
+def build_assets(source_path):
+    with open(source_path, encoding="utf-8") as f:
+        source = json.load(f)
+    for level, tolerance in LEVELS.items():
+        simplified = simplify_geojson(source, tolerance)
+        with open(asset_path(level), "w", encoding="utf-8") as f:
+            json.dump(simplified, f, separators=(",", ":"), ensure_ascii=False)
+        print(f"{asset_path(level)}: {asset_path(level).stat().st_size / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    # python -m utils.geometry build <countries.geo.json with name/iso_a3 properties>
+    if len(sys.argv) == 3 and sys.argv[1] == "build":
+        build_assets(sys.argv[2])
+    else:
+        print("usage: python -m utils.geometry build <countries.geo.json>")
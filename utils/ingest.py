@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+from utils.timing import count, span
+
+# Everything derived from the form exports lives here so it can be wiped safely
+CACHE_DIR = Path(".cache")
+
+
+def hash_file(path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint(path, previous=None):
+    # Key a file on size + mtime, only re-hashing the content when those moved
+    stat = path.stat()
+    fp = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+    if previous and previous["size"] == fp["size"] and previous["mtime"] == fp["mtime"]:
+        fp["sha1"] = previous["sha1"]
+    else:
+        fp["sha1"] = hash_file(path)
+    return fp
+
+
+def fingerprint_files(files, previous=None):
+    previous = previous or {}
+    return {str(f): fingerprint(f, previous.get(str(f))) for f in files}
+
+
+def _atomic_write(path, write):
+    # Write next to the target and swap it in, so concurrent readers never see half a file
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _read_manifest(path):
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _data_version(files_manifest, pipeline_version):
+    h = hashlib.sha1(str(pipeline_version).encode())
+    for name in sorted(files_manifest):
+        h.update(name.encode())
+        h.update(files_manifest[name]["sha1"].encode())
+    return h.hexdigest()[:16]
+
+
+def _unchanged(files, manifest):
+    # Cheap warm-start check: same set of files, same size and mtime for each
+    known = manifest["files"]
+    if sorted(known) != sorted(str(f) for f in files):
+        return False
+    for f in files:
+        stat = f.stat()
+        fp = known[str(f)]
+        if fp["size"] != stat.st_size or fp["mtime"] != stat.st_mtime_ns:
+            return False
+    return True
+
+
+def append_frames(frame, delta):
+    """pd.concat that keeps categorical columns categorical when the two sides saw different labels."""
+    if frame is None or frame.empty:
+        return delta.reset_index(drop=True)
+    frame = frame.copy()
+    delta = delta.copy()
+    for column in frame.columns:
+        if column not in delta:
+            continue
+        left, right = frame[column], delta[column]
+        if not isinstance(left.dtype, pd.CategoricalDtype) or left.cat.ordered:
+            continue
+        if not isinstance(right.dtype, pd.CategoricalDtype):
+            right = right.astype("category")
+        missing = right.cat.categories.difference(left.cat.categories)
+        if len(missing):
+            frame[column] = left.cat.add_categories(missing)
+        delta[column] = right.cat.set_categories(frame[column].cat.categories)
+    return pd.concat([frame, delta], ignore_index=True)
+
+
+class DeltaStore:
+    """Append-only store of derived rows for one family of dated form exports.
+
+    Exports are fingerprinted; new or changed files are parsed, rows whose `key` was already
+    ingested are dropped, and only the remaining rows go through `derive_fn` and get appended
+    as a new Parquet part. A warm start is a stat per export plus memory-mapped part reads.
+
+    `read_fn` may return a DataFrame or an Arrow table; with Arrow tables, several changed files
+    are parsed on `workers` threads (Arrow releases the GIL) and stitched together without copies.
+    """
+
+    # Parts are merged back into one file once a store accumulates this many
+    MAX_PARTS = 32
+
+    def __init__(self, name, directory, read_fn, derive_fn, key, pipeline_version=1,
+                 cache_dir=CACHE_DIR, pattern="*.csv", min_interval=2.0, workers=1):
+        self.name = name
+        self.directory = Path(directory)
+        self.read_fn = read_fn
+        self.derive_fn = derive_fn
+        self.key = list(key)
+        self.pipeline_version = pipeline_version
+        self.pattern = pattern
+        self.min_interval = min_interval
+        self.workers = max(1, int(workers))
+        self.store_dir = Path(cache_dir) / name
+        self.manifest_path = self.store_dir / "manifest.json"
+
+        self.frame = None
+        self.data_version = None
+        self._seen = pd.Index([])
+        self._last_check = 0.0
+        self._lock = threading.RLock()
+        self._load()
+
+    def files(self):
+        return sorted(self.directory.rglob(self.pattern))
+
+    def _load(self):
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        manifest = _read_manifest(self.manifest_path)
+        if (
+            manifest is not None
+            and manifest.get("pipeline_version") == self.pipeline_version
+            and manifest["parts"]
+            and all((self.store_dir / part).exists() for part in manifest["parts"])
+        ):
+            import pyarrow.parquet as pq
+
+            self._manifest = manifest
+            tables = [pq.read_table(self.store_dir / part, memory_map=True) for part in manifest["parts"]]
+            # Parts can disagree on types (an all-null column in one, categories in another)
+            self.frame = pa.concat_tables(tables, promote_options="permissive").to_pandas()
+            self.data_version = manifest["data_version"]
+            self._seen = pd.Index(self._keys(self.frame))
+        else:
+            # Unknown or outdated pipeline: start over from the raw exports
+            for stale in self.store_dir.glob("part-*.parquet"):
+                stale.unlink()
+            self._manifest = {"pipeline_version": self.pipeline_version, "data_version": None,
+                              "files": {}, "parts": [], "next_part": 0}
+        self.refresh(force=True)
+
+    def _keys(self, df):
+        keys = df[self.key[0]].astype(str)
+        for column in self.key[1:]:
+            keys = keys + "|" + df[column].astype(str)
+        return keys
+
+    def refresh(self, force=False):
+        """Ingest new or changed exports and return the derived rows that were appended (None if nothing)."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_check < self.min_interval:
+                return None
+            self._last_check = now
+
+            files = self.files()
+            if self.frame is not None and _unchanged(files, self._manifest):
+                count(f"ingest.{self.name}.unchanged")
+                return None
+
+            known = self._manifest["files"]
+            files_manifest = fingerprint_files(files, known)
+            changed = [f for f in files if known.get(str(f), {}).get("sha1") != files_manifest[str(f)]["sha1"]]
+
+            delta = None
+            raw = self._read(changed)
+            if raw is not None:
+                # Files are in name (i.e. date) order, so the first export to carry a key wins
+                keys = self._keys(raw)
+                fresh = (~keys.isin(self._seen) & ~keys.duplicated()).to_numpy()
+                if fresh.any():
+                    with span(f"ingest.{self.name}.derive"):
+                        # A cold start keeps every row, so skip the filtered copy
+                        new_rows = raw if fresh.all() else raw[fresh].reset_index(drop=True)
+                        del raw
+                        delta = self.derive_fn(new_rows).reset_index(drop=True)
+                        del new_rows
+                        frame = append_frames(self.frame, delta)
+                    with span(f"ingest.{self.name}.write"):
+                        self._write_part(delta, frame)
+                    count(f"ingest.{self.name}.rows_appended", len(delta))
+                    self.frame = frame
+                    # Only mark keys as ingested once their rows are safely stored
+                    self._seen = self._seen.append(pd.Index(keys[fresh]))
+            if self.frame is None:
+                self.frame = pd.DataFrame()
+
+            self._manifest["files"] = files_manifest
+            self.data_version = self._manifest["data_version"] = _data_version(files_manifest, self.pipeline_version)
+            _atomic_write(self.manifest_path, lambda p: p.write_text(json.dumps(self._manifest, indent=1)))
+            return delta
+
+    def _read(self, files):
+        """Parse `files` into one frame, in order; None if there are none."""
+        if not files:
+            return None
+        with span(f"ingest.{self.name}.read"):
+            if self.workers > 1 and len(files) > 1:
+                with ThreadPoolExecutor(min(self.workers, len(files))) as pool:
+                    parts = list(pool.map(self.read_fn, files))
+            else:
+                parts = [self.read_fn(f) for f in files]
+            if not all(isinstance(part, pa.Table) for part in parts):
+                return pd.concat(parts, ignore_index=True)
+            # Missing columns (forms without an Address) come back as nulls
+            table = pa.concat_tables(parts, promote_options="permissive")
+            del parts
+            # Free each Arrow column as soon as it is converted, so both copies never coexist in full,
+            # then hand the parse buffers back to the OS instead of leaving them in Arrow's pool
+            frame = table.to_pandas(split_blocks=True, self_destruct=True)
+            del table
+            pa.default_memory_pool().release_unused()
+            return frame
+
+    def _write_part(self, delta, frame):
+        if len(self._manifest["parts"]) + 1 > self.MAX_PARTS:
+            # Compact everything ingested so far into a single part
+            old_parts = self._manifest["parts"]
+            delta, self._manifest["parts"] = frame, []
+        else:
+            old_parts = []
+        part = f"part-{self._manifest['next_part']:05d}.parquet"
+        self._manifest["next_part"] += 1
+        _atomic_write(self.store_dir / part, lambda p: delta.to_parquet(p, index=False))
+        self._manifest["parts"].append(part)
+        for old in old_parts:
+            (self.store_dir / old).unlink(missing_ok=True)
@@ -0,0 +1,166 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.timing import count, span
+
+# Funnel order: contact message, then mailing list sign-up, then job application
+DATASETS = ("messages", "mailing_list", "applications")
+FUNNEL_LABELS = {"messages": "Sent a message", "mailing_list": "Joined the mailing list", "applications": "Applied"}
+
+
+def ip_codes(index, ips):
+    """Row of each of `ips` in `index` (-1 if absent) through the index's hash table.
+
+    Categorical columns are looked up once per category and broadcast through the codes. Arrow
+    strings are matched inside Arrow, without a Python string per row.
+    """
+    if isinstance(ips.dtype, pd.CategoricalDtype):
+        lookup = np.append(index.get_indexer(ips.cat.categories), -1)
+        return lookup[ips.cat.codes.to_numpy()]
+    if isinstance(ips.dtype, pd.ArrowDtype):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        rows = pc.index_in(pa.array(ips.array), value_set=pa.array(index.to_numpy(), pa.string()))
+        return rows.fill_null(-1).to_numpy().astype(np.intp)
+    return index.get_indexer(pd.Index(ips))
+
+
+class IpDimension:
+    """One row per submitter IP across every export: resolved geo plus first/last seen and counts per dataset.
+
+    The three datasets are append-only, so `sync` only folds in the rows past what it saw last
+    time. Rows are found through a hash index on the IP, which makes joining any of the datasets
+    to the dimension (and so to each other) a single O(n) pass.
+    """
+
+    def __init__(self):
+        columns = {"country": pd.Series(dtype=object), "city": pd.Series(dtype=object),
+                   "resolved": pd.Series(dtype=bool)}
+        for name in DATASETS:
+            columns[f"{name}_first"] = pd.Series(dtype="datetime64[ns]")
+            columns[f"{name}_last"] = pd.Series(dtype="datetime64[ns]")
+            columns[f"{name}_count"] = pd.Series(dtype="int64")
+        self.table = pd.DataFrame(columns, index=pd.Index([], dtype=object, name="Submitter IP"))
+        self.rows_seen = {name: 0 for name in DATASETS}
+        # Bumped whenever the table changes, for caches keyed on it
+        self.version = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.table)
+
+    def codes(self, ips):
+        return ip_codes(self.table.index, ips)
+
+    def extend(self, dataset, ips, dates):
+        """Fold rows of `dataset` (their IPs and submission dates) into the dimension."""
+        # Categorical IPs group on their integer codes, never hashing a string per row
+        frame = pd.DataFrame({"ip": pd.Series(ips).reset_index(drop=True), "date": pd.Series(dates).reset_index(drop=True)})
+        frame = frame.dropna(subset=["ip"])
+        if frame.empty:
+            return
+        seen = frame.groupby("ip", sort=False, observed=True)["date"].agg(["min", "max", "size"])
+        seen.index = seen.index.astype(object)
+        with self._lock:
+            rows = self.table.index.get_indexer(seen.index)
+            new = rows < 0
+            if new.any():
+                # New IPs go on the end, in the order they were first seen
+                rows[new] = len(self.table) + np.arange(new.sum())
+                self._grow(seen.index[new])
+                count("ipdim.new_ips", int(new.sum()))
+            first = self.table[f"{dataset}_first"].to_numpy().copy()
+            last = self.table[f"{dataset}_last"].to_numpy().copy()
+            counts = self.table[f"{dataset}_count"].to_numpy().copy()
+            earlier, later = seen["min"].to_numpy(), seen["max"].to_numpy()
+            # NaT never compares smaller, so a first sighting always wins
+            first[rows] = np.where(np.isnat(first[rows]) | (earlier < first[rows]), earlier, first[rows])
+            last[rows] = np.where(np.isnat(last[rows]) | (later > last[rows]), later, last[rows])
+            counts[rows] += seen["size"].to_numpy()
+            self.table = self.table.assign(**{f"{dataset}_first": first, f"{dataset}_last": last,
+                                              f"{dataset}_count": counts})
+            self.version += 1
+
+    def _grow(self, ips):
+        # Append rows for IPs not seen before: unresolved, nothing seen in any dataset yet.
+        # Built column by column, as pd.concat would check every blank cell for missing values
+        blank = {"country": None, "city": None, "resolved": False}
+        for name in DATASETS:
+            blank.update({f"{name}_first": np.datetime64("NaT", "ns"), f"{name}_last": np.datetime64("NaT", "ns"),
+                          f"{name}_count": 0})
+        columns = {}
+        for column, dtype in self.table.dtypes.items():
+            extra = np.full(len(ips), blank[column], dtype=dtype)
+            columns[column] = np.concatenate([self.table[column].to_numpy(), extra])
+        self.table = pd.DataFrame(columns, index=self.table.index.append(pd.Index(ips, dtype=object)).rename("Submitter IP"))
+
+    def sync(self, frames):
+        """Catch up with {dataset: (frame, date column)}; only rows added since the last sync are read."""
+        with self._lock, span("ipdim.sync"):
+            for name, (frame, date_column) in frames.items():
+                start = self.rows_seen[name]
+                if len(frame) < start:
+                    # The store was rebuilt from scratch; start this dataset over
+                    self._forget(name)
+                    start = 0
+                if len(frame) > start and "Submitter IP" in frame:
+                    rows = frame.iloc[start:]
+                    self.extend(name, rows["Submitter IP"], rows[date_column])
+                self.rows_seen[name] = len(frame)
+
+    def _forget(self, dataset):
+        self.table = self.table.assign(**{f"{dataset}_first": pd.NaT, f"{dataset}_last": pd.NaT, f"{dataset}_count": 0})
+        self.version += 1
+
+    def resolve(self, resolver, ips=None):
+        """Geolocate the IPs (all, or just those in `ips`) that haven't been resolved yet."""
+        with self._lock:
+            pending = ~self.table["resolved"].to_numpy()
+            if ips is not None:
+                wanted = np.zeros(len(self.table), dtype=bool)
+                rows = self.codes(ips)
+                wanted[rows[rows >= 0]] = True
+                pending &= wanted
+            if not pending.any():
+                count("ipdim.resolve_hit")
+                return
+            todo = self.table.index[pending]
+            resolved = resolver.resolve(todo)
+            # IPs the resolver left out (a failed remote batch) stay pending, so a later call retries them
+            answered = np.array([ip in resolved for ip in todo], dtype=bool)
+            if not answered.any():
+                return
+            geo = pd.DataFrame([resolved[ip] for ip in todo[answered]], columns=["country", "city"])
+            country = self.table["country"].to_numpy().copy()
+            city = self.table["city"].to_numpy().copy()
+            done = self.table["resolved"].to_numpy().copy()
+            rows = np.flatnonzero(pending)[answered]
+            country[rows], city[rows], done[rows] = geo["country"].to_numpy(), geo["city"].to_numpy(), True
+            self.table = self.table.assign(country=country, city=city, resolved=done)
+            count("ipdim.resolved", len(rows))
+            self.version += 1
+
+    def lookup(self, ips, columns):
+        """Columns of the dimension for each of `ips`, aligned with them (missing IPs give NaN)."""
+        rows = self.codes(ips)
+        found = rows >= 0
+        take = np.where(found, rows, 0)
+        return pd.DataFrame({column: pd.Series(self.table[column].to_numpy()[take], index=ips.index).where(found)
+                             for column in columns})
+
+    def funnel(self, in_order=False):
+        """IPs reaching each step of DATASETS; with in_order, each step must come no earlier than the one before."""
+        table = self.table
+        reached = np.ones(len(table), dtype=bool)
+        previous = None
+        steps = []
+        for name in DATASETS:
+            reached &= table[f"{name}_count"].to_numpy() > 0
+            if in_order and previous is not None:
+                # Some visit at this step has to come after the first visit at the previous one
+                reached &= table[f"{name}_last"].to_numpy() >= table[f"{previous}_first"].to_numpy()
+            steps.append((FUNNEL_LABELS[name], int(reached.sum())))
+            previous = name
+        return pd.DataFrame(steps, columns=["Step", "IPs"])
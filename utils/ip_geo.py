@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+from utils.geocode_store import NEGATIVE_TTL
+from utils.ingest import CACHE_DIR
+from utils.timing import count, span
+
+MMDB_PATH = Path("utils/assets/GeoLite2-City.mmdb")
+IP_API_BATCH_URL = "http://ip-api.com/batch"
+# ip-api.com allows 100 IPs per batch and 15 batch requests per minute on the free tier
+BATCH_SIZE = 100
+REMOTE_DELAY = 4.0
+# Sending submitter IPs to ip-api.com is opt-in (CADWARE_IP_REMOTE=1); by default only the local
+# cache and GeoLite2 db are used, and IPs neither knows stay unresolved
+IP_REMOTE = os.environ.get("CADWARE_IP_REMOTE", "0") == "1"
+
+
+class IpResolver:
+    """Resolve IPs to (country, city): persistent cache, then the mmap'd GeoLite2 db, then (if `remote`) ip-api batches."""
+
+    def __init__(self, mmdb_path=MMDB_PATH, cache_path=CACHE_DIR / "ipgeo.sqlite", remote=None,
+                 remote_url=IP_API_BATCH_URL, remote_delay=REMOTE_DELAY, negative_ttl=NEGATIVE_TTL):
+        self.remote = IP_REMOTE if remote is None else remote
+        self.remote_url = remote_url
+        self.remote_delay = remote_delay
+        self.negative_ttl = negative_ttl
+        self._stats = {"ips": 0, "cache_hits": 0, "mmdb_hits": 0, "remote": 0, "seconds": 0.0, "ips_per_second": 0.0}
+        self._last_remote_call = 0.0
+        self._lock = threading.Lock()
+
+        self.reader = None
+        try:
+            import geoip2.database
+            self.reader = geoip2.database.Reader(str(mmdb_path), mode=geoip2.database.MODE_MMAP)
+        except FileNotFoundError:
+            pass
+
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(cache_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ipgeo ("
+            "ip TEXT PRIMARY KEY, country TEXT, city TEXT, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @property
+    def stats(self):
+        # A consistent copy; sessions resolve concurrently
+        with self._lock:
+            return dict(self._stats)
+
+    def resolve(self, ips):
+        """Return {ip: (country, city)} for the distinct, non-null values of `ips`.
+
+        IPs the db places in a country but not a city give (country, None). IPs in a remote batch that
+        failed are left out, and not cached, so a later call retries them. With remote lookups off, IPs
+        neither the cache nor the db knows map to (None, None) uncached.
+        """
+        start = time.perf_counter()
+        unique_ips = list({ip for ip in ips if isinstance(ip, str) and ip})
+        with self._lock:
+            result = self._from_cache(unique_ips)
+            missing = [ip for ip in unique_ips if ip not in result]
+
+            fresh = {}
+            remote = []
+            for ip in missing:
+                country, city = self._from_mmdb(ip)
+                # GeoLite2 often knows the country but not the city; that is kept as (country, None)
+                # rather than asking ip-api, so only IPs without a country go out
+                if country:
+                    fresh[ip] = (country, city or None)
+                else:
+                    remote.append(ip)
+            self._stats["mmdb_hits"] += len(fresh)
+            count("ipgeo.mmdb_hit", len(fresh))
+            if self.remote:
+                with span("ipgeo.remote"):
+                    fresh.update(self._from_remote(remote))
+                count("ipgeo.remote", len(remote))
+            self._store(fresh)
+            result.update(fresh)
+            if not self.remote:
+                result.update({ip: (None, None) for ip in remote})
+
+            elapsed = time.perf_counter() - start
+            self._stats["ips"] += len(unique_ips)
+            self._stats["seconds"] += elapsed
+            if self._stats["seconds"]:
+                self._stats["ips_per_second"] = self._stats["ips"] / self._stats["seconds"]
+        return result
+
+    def _from_cache(self, ips):
+        found = {}
+        now = time.time()
+        for i in range(0, len(ips), 500):
+            chunk = ips[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for ip, country, city, updated_at in self._conn.execute(
+                f"SELECT ip, country, city, updated_at FROM ipgeo WHERE ip IN ({placeholders})", chunk
+            ):
+                # Failed lookups are retried once their TTL has passed
+                if country is None and now - updated_at > self.negative_ttl:
+                    continue
+                found[ip] = (country, city)
+        self._stats["cache_hits"] += len(found)
+        count("ipgeo.cache_hit", len(found))
+        return found
+
+    def _from_mmdb(self, ip):
+        if self.reader is None:
+            return None, None
+        try:
+            response = self.reader.city(ip)
+            return response.country.name, response.city.name
+        except Exception:
+            return None, None
+
+    def _from_remote(self, ips):
+        found = {}
+        for i in range(0, len(ips), BATCH_SIZE):
+            batch = ips[i:i + BATCH_SIZE]
+            # to be polite with public API limits, but only between actual remote calls
+            wait = self._last_remote_call + self.remote_delay - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_remote_call = time.monotonic()
+            self._stats["remote"] += len(batch)
+            try:
+                payload = [{"query": ip, "fields": "status,country,city,query"} for ip in batch]
+                rows = requests.post(self.remote_url, json=payload, timeout=10).json()
+            except Exception:
+                # Transient errors are not cached, so the next run retries this batch
+                continue
+            for row in rows:
+                if row.get("status") == "success":
+                    found[row.get("query")] = (row.get("country"), row.get("city"))
+            for ip in batch:
+                found.setdefault(ip, (None, None))
+        return found
+
+    def _store(self, resolved):
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO ipgeo (ip, country, city, updated_at) VALUES (?, ?, ?, ?)",
+            [(ip, country, city, now) for ip, (country, city) in resolved.items()],
+        )
+        self._conn.commit()
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+        self._conn.close()
@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# 128 signature slots, split into 32 LSH bands of 4: two messages whose shingle sets overlap by
+# Jaccard 0.6 share at least one band ~99% of the time, while 0.3 pairs rarely do
+NUM_PERM = 128
+BANDS = 32
+# 5-byte shingles of the normalised UTF-8 text
+SHINGLE = 5
+# Estimated Jaccard similarity for two messages to count as near-duplicates
+THRESHOLD = 0.6
+# Normalised bytes hashed per batch; bounds the working set however many messages there are
+CHUNK_BYTES = 1 << 20
+# Messages signed per call when building the stored column
+ROW_BATCH = 65_536
+# Candidate pairs whose full signatures are compared at once
+PAIR_BATCH = 65_536
+SEED = 1
+
+EMPTY = np.iinfo(np.uint32).max
+
+
+def normalise_messages(messages):
+    """Lowercased text with whitespace collapsed and digit runs as "0", so templated outreach lines up.
+
+    Returns an Arrow string array; Arrow's string kernels run in C++, one pass per step.
+    """
+    text = pa.array(pd.Series(messages, dtype=object), type=pa.string(), from_pandas=True)
+    text = pc.replace_substring_regex(pc.utf8_lower(text.fill_null("")), r"\d+", "0")
+    return pc.utf8_trim_whitespace(pc.replace_substring_regex(text, r"\s+", " "))
+
+
+def _shingle_hashes(data, offsets, k, seed):
+    """64-bit hash of every k-byte window inside each text, and the text each hash belongs to.
+
+    `data` is the texts' UTF-8 bytes back to back and `offsets` where each one starts and ends.
+    """
+    codes = data.astype(np.uint64)
+    h = codes[:len(codes) - k + 1].copy()
+    for j in range(1, k):
+        h = h * np.uint64(1000003) + codes[j:len(codes) - k + 1 + j]
+    # MurmurHash3's 64-bit finaliser, so nearby shingles land far apart and every bit is usable
+    h ^= np.uint64(seed * 0x9E3779B97F4A7C15 % (1 << 64))
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xFF51AFD7ED558CCD)
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xC4CEB9FE1A85EC53)
+    h ^= h >> np.uint64(33)
+
+    # Windows that straddle two texts are skipped
+    counts = np.diff(offsets) - k + 1
+    first = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    owner = np.repeat(np.arange(len(counts)), counts)
+    positions = offsets[:-1][owner] + np.arange(counts.sum()) - first[owner]
+    return h[positions], owner
+
+
+def _densify(sig):
+    # Empty slots borrow the value of the next filled slot to the right (wrapping round), so short
+    # messages still get a full signature that similar short messages reproduce slot for slot
+    gaps = np.flatnonzero((sig == EMPTY).any(axis=1))
+    if not len(gaps):
+        return sig
+    slots = sig.shape[1]
+    filled = sig[gaps] != EMPTY
+    positions = np.arange(2 * slots, dtype=np.int16)
+    index = np.where(np.concatenate([filled, filled], axis=1), positions, np.int16(2 * slots))
+    nearest = np.minimum.accumulate(index[:, ::-1], axis=1)[:, ::-1][:, :slots]
+    donor = np.where(nearest < 2 * slots, nearest % slots, np.arange(slots))
+    sig[gaps] = np.take_along_axis(sig[gaps], donor, axis=1)
+    return sig
+
+
+def signatures(messages, num_perm=NUM_PERM, k=SHINGLE, seed=SEED, chunk_bytes=CHUNK_BYTES):
+    """(n, num_perm) uint32 MinHash signatures of `messages`; empty messages get an all-EMPTY row.
+
+    One-permutation MinHash: each shingle is hashed once, the hash picks one of `num_perm` slots
+    and each slot keeps its minimum, so the cost is one hash per shingle rather than `num_perm`.
+    Shingles are read straight out of the normalised Arrow buffer in batches of about
+    `chunk_bytes`, so no per-message Python strings are made. Signatures only depend on the text,
+    `num_perm`, `k` and `seed`, so they can be stored and compared with ones computed later.
+    """
+    text = normalise_messages(messages)
+    empty = pc.equal(pc.binary_length(text), 0).to_numpy(zero_copy_only=False)
+    # Short messages are padded to one whole shingle
+    text = pc.utf8_rpad(text, width=k, padding=" ")
+    if isinstance(text, pa.ChunkedArray):
+        text = text.combine_chunks()
+    n = len(text)
+    _, offsets_buffer, data_buffer = text.buffers()
+    offsets = np.frombuffer(offsets_buffer, dtype=np.int32)[text.offset:text.offset + n + 1].astype(np.int64)
+    data = np.frombuffer(data_buffer, dtype=np.uint8) if data_buffer is not None else np.empty(0, dtype=np.uint8)
+
+    sig = np.full((n, num_perm), EMPTY, dtype=np.uint32)
+    lo = 0
+    while lo < n:
+        hi = max(int(np.searchsorted(offsets, offsets[lo] + chunk_bytes, side="right")) - 1, lo + 1)
+        hi = min(hi, n)
+        hashes, owner = _shingle_hashes(data[offsets[lo]:offsets[hi]], offsets[lo:hi + 1] - offsets[lo], k, seed)
+        # High 32 bits pick the slot, low 32 bits are the value competing for it
+        slot = ((hashes >> np.uint64(32)) * np.uint64(num_perm)) >> np.uint64(32)
+        batch = np.full((hi - lo) * num_perm, EMPTY, dtype=np.uint32)
+        np.minimum.at(batch, owner * num_perm + slot.astype(np.int64), hashes.astype(np.uint32))
+        sig[lo:hi] = _densify(batch.reshape(hi - lo, num_perm))
+        lo = hi
+    sig[empty] = EMPTY
+    return sig
+
+
+def to_bytes(sig):
+    # One fixed-width bytes value per row, which Parquet stores as a plain binary column
+    return [row.tobytes() for row in np.ascontiguousarray(sig, dtype=np.uint32)]
+
+
+def signature_column(messages, rows=ROW_BATCH):
+    """to_bytes(signatures(messages)), a slice of `rows` messages at a time so the matrix never exists in full."""
+    messages = pd.Series(messages, dtype=object)
+    column = []
+    for start in range(0, len(messages), rows):
+        column.extend(to_bytes(signatures(messages.iloc[start:start + rows])))
+    return column
+
+
+def from_bytes(values, num_perm=NUM_PERM):
+    """Inverse of to_bytes: a column of stored signatures back to an (n, num_perm) matrix."""
+    if not len(values):
+        return np.empty((0, num_perm), dtype=np.uint32)
+    return np.frombuffer(b"".join(values), dtype=np.uint32).reshape(len(values), -1)
+
+
+def _band_keys(sig, rows, band, rows_per_band):
+    # A band's values folded into one 64-bit bucket key
+    key = np.zeros(len(rows), dtype=np.uint64)
+    for column in range(band * rows_per_band, (band + 1) * rows_per_band):
+        key = key * np.uint64(0x100000001B3) + sig[rows, column]
+    return key
+
+
+def _components(n, edges, root):
+    # Merge `edges` into the forest given by `root` (each row's component representative)
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    rows = np.concatenate([edges[:, 0], np.arange(n)])
+    cols = np.concatenate([edges[:, 1], root])
+    graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n, n))
+    count, labels = connected_components(graph, directed=False)
+    lowest = np.full(count, n)
+    np.minimum.at(lowest, labels, np.arange(n))
+    return lowest[labels]
+
+
+def clusters(sig, threshold=THRESHOLD, bands=BANDS):
+    """Near-duplicate cluster id per row: rows linked by estimated Jaccard >= threshold share an id.
+
+    Bands are bucketed one at a time. In each bucket every member is compared with the bucket's
+    first row only, and pairs already in the same cluster are skipped, so a template sent ten
+    thousand times costs about ten thousand comparisons rather than fifty million, and memory
+    stays linear in the number of messages. Ids are numbered by cluster size, largest first;
+    unlinked and empty messages get their own id.
+    """
+    n, num_perm = sig.shape
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    rows_per_band = num_perm // bands
+    present = np.flatnonzero(sig[:, 0] != EMPTY)
+    root = np.arange(n)
+    for band in range(bands):
+        _, first, inverse = np.unique(_band_keys(sig, present, band, rows_per_band),
+                                      return_index=True, return_inverse=True)
+        rep, member = present[first[inverse]], present
+        # Only band collisions between rows not yet known to be in the same cluster
+        open_ = root[rep] != root[member]
+        rep, member = rep[open_], member[open_]
+        if not len(rep):
+            continue
+        # Candidates are only a band collision; keep the ones whose full signatures agree enough
+        keep = np.zeros(len(rep), dtype=bool)
+        for i in range(0, len(rep), PAIR_BATCH):
+            a, b = rep[i:i + PAIR_BATCH], member[i:i + PAIR_BATCH]
+            keep[i:i + PAIR_BATCH] = (sig[a] == sig[b]).mean(axis=1) >= threshold
+        if keep.any():
+            root = _components(n, np.stack([rep[keep], member[keep]], axis=1), root)
+    _, labels, sizes = np.unique(root, return_inverse=True, return_counts=True)
+    order = np.argsort(-sizes, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[labels]
+
+
+def cluster_summary(labels, messages, ips, dates):
+    """One row per cluster: size, distinct sender IPs, first and last message, and an example."""
+    frame = pd.DataFrame({"cluster": labels, "Message": messages, "Submitter IP": ips, "date": dates})
+    summary = frame.groupby("cluster").agg(
+        messages=("Message", "size"),
+        senders=("Submitter IP", "nunique"),
+        first_seen=("date", "min"),
+        last_seen=("date", "max"),
+        example=("Message", "first"),
+    )
+    summary["example"] = summary["example"].fillna("").astype(str).str.slice(0, 160)
+    return summary.sort_values("messages", ascending=False, kind="stable")
+
+
+def sender_summary(labels, ips, dates, sizes=None):
+    """One row per sender IP with more than one message: messages, distinct clusters, first and last."""
+    frame = pd.DataFrame({"cluster": labels, "Submitter IP": ips, "date": dates})
+    if sizes is None:
+        sizes = np.bincount(labels)
+    frame["near_duplicates"] = sizes[labels] > 1
+    summary = frame.groupby("Submitter IP").agg(
+        messages=("cluster", "size"),
+        clusters=("cluster", "nunique"),
+        near_duplicates=("near_duplicates", "sum"),
+        first_seen=("date", "min"),
+        last_seen=("date", "max"),
+    )
+    summary = summary[summary["messages"] > 1]
+    return summary.sort_values("messages", ascending=False, kind="stable")
@@ -0,0 +1,189 @@
+"""What the dashboard pages compute, kept apart from how they draw it.
+
+The pages wrap these in the result cache and hand the results to Plotly; benchmarks/suite.py
+calls the same functions, so its page stages time exactly what a cold page load runs. The
+*_from_counts / *_from_rollups variants give the same results from snapshot tables instead of rows.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.cube import cube_counts, cube_total
+from utils.density import circular_kde, closed_curve
+from utils.geometry import normalise_country_name
+from utils.schema import compact
+from utils.spatial import aggregate_points, coordinate_table
+from utils.timeseries import downsample, pick_frequency, rebucket
+
+CHANNEL = 'How did you hear about us?'
+# Smoothing of the hourly KDEs, relative to Scott's rule as scipy's bw_method was
+HOURLY_BW_FACTOR = 0.3
+
+
+def hourly_density(hours):
+    """(hour grid, density) of `hours` on the 24h circle, closed so the line wraps around midnight."""
+    return closed_curve(*circular_kde(hours, bw_factor=HOURLY_BW_FACTOR))
+
+
+def _hourly_density_from_counts(hours, counts):
+    # Repeating each hour by its count rather than weighting it keeps the bandwidth exactly as from the rows
+    return hourly_density(np.repeat(np.asarray(hours, dtype=float), np.asarray(counts, dtype=np.int64)))
+
+
+# -------------------
+# Job Stats (app.py)
+# -------------------
+def job_types(cube):
+    return sorted(cube['job_type'].dropna().unique())
+
+
+def job_kpis(cube, job_types):
+    """Headline counts for the selected job types, all sliced from the count cube."""
+    job_filter = {'job_type': job_types}
+    return {
+        'total': cube_total(cube, job_filter),
+        'female': cube_total(cube, {**job_filter, 'gender': ['Female']}),
+        'male': cube_total(cube, {**job_filter, 'gender': ['Male']}),
+        'within_a_week': cube_total(cube, {**job_filter, 'availability_bucket': ['<= 7 days']}),
+        'job_counts': cube_counts(cube, 'job_type', job_filter),
+    }
+
+
+def popular_job(job_counts):
+    """Most applied-for job title, alphabetically first among ties; None without applications."""
+    if job_counts.empty:
+        return None
+    tied_jobs = job_counts[job_counts == job_counts.max()].index.tolist()
+    return sorted(tied_jobs)[0].replace("-", " ").title()
+
+
+def top_cities(cube, n=3):
+    return cube_counts(cube, 'City').head(n)
+
+
+def map_points(location_counts, lat_lon, job_types, cell_degrees=None):
+    """Weighted map points for the selected job types: one per place, or per grid cell."""
+    location_counts = location_counts[location_counts['job_type'].isin(job_types)]
+    return aggregate_points(location_counts, coordinate_table(lat_lon), cell_degrees)
+
+
+def monthly_counts(cube, job_types):
+    """(applications per job type per period, period frequency); monthly, quarterly once the history is long."""
+    agg_df = cube_counts(cube, ['submit_year', 'submit_month', 'job_type'], {'job_type': job_types}).reset_index(name='count')
+    if agg_df.empty:
+        return agg_df, None
+    # Year and month together, so the same month in different years stays apart
+    agg_df['date'] = pd.to_datetime(
+        agg_df['submit_year'].astype(str) + '-' + (agg_df['submit_month'].cat.codes + 1).astype(str) + '-01'
+    )
+    freq = pick_frequency(agg_df['date'].min(), agg_df['date'].max(), frequencies=['M', 'Q'])
+    agg_df = rebucket(agg_df, freq, ['job_type']).rename(columns={'date': 'submit_period', 'count': 'Application Count'})
+    return agg_df, freq
+
+
+def job_hourly_density(dataset, job_types):
+    """Hourly submission density for the selected job types; None if none are selected."""
+    hours_df = dataset.columns('job_type', 'submit_hour')
+    hours = hours_df['submit_hour'][hours_df['job_type'].isin(job_types)]
+    return hourly_density(hours) if len(hours) else None
+
+
+def job_hour_counts(dataset):
+    """Applications per (job type, submit hour): what the hourly chart needs, without the rows."""
+    hours_df = dataset.columns('job_type', 'submit_hour')
+    return hours_df.groupby(['job_type', 'submit_hour'], observed=True).size().reset_index(name='count')
+
+
+def job_hourly_density_from_counts(hour_counts, job_types):
+    """job_hourly_density from a job_hour_counts table."""
+    hour_counts = hour_counts[hour_counts['job_type'].isin(job_types)]
+    if not hour_counts['count'].sum():
+        return None
+    return _hourly_density_from_counts(hour_counts['submit_hour'], hour_counts['count'])
+
+
+def availability_boxes(box_stats, job_types):
+    return box_stats[box_stats['job_type'].isin(job_types)]
+
+
+# -------------------
+# Mailing list Stats (pages/mailing_list.py)
+# -------------------
+def source_counts(rollups):
+    return rollups.totals(CHANNEL).set_axis(['Source', 'Count'], axis=1)
+
+
+def geolocate(df, dimension):
+    """`df` with Country and City from the IP dimension every page shares, joined on its hash index."""
+    geo = dimension.lookup(df['Submitter IP'], ['country', 'city'])
+    # assign() returns a new frame; the store's frame is shared by every session
+    df = df.assign(Country=geo['country'], City=geo['city'])
+    return compact(df, ['Country', 'City'])
+
+
+def select_rows(df, channels, start, end):
+    """Boolean mask of sign-ups from `channels` between the days `start` and `end`, both inclusive."""
+    return (
+        df[CHANNEL].isin(channels) &
+        (df['Submission Create Date'] >= start) &
+        (df['Submission Create Date'] < end + pd.Timedelta(days=1))
+    ).to_numpy()
+
+
+def channel_trend(rollups, freq, channels, start, end):
+    channel_time = rollups.counts(freq, CHANNEL, {CHANNEL: channels}, start, end)
+    channel_time = channel_time.rename(columns={'date': 'Submission Create Date', 'count': 'Count'})
+    # LTTB keeps each channel's line within the point budget even at daily resolution over years
+    return downsample(channel_time, 'Submission Create Date', 'Count', series=CHANNEL)
+
+
+def device_share(rollups, channels, start, end):
+    return rollups.totals('Submitter Device', {CHANNEL: channels}, start, end)
+
+
+def signup_hourly_density(df, rows):
+    return hourly_density(df['Submission Create Date'].dt.hour.to_numpy()[rows])
+
+
+def signup_hourly_density_from_rollups(hour_rollups, channels, start, end):
+    """signup_hourly_density for the same channels and days, from data_processor.signup_hour_rollups."""
+    counts = hour_rollups.totals('Hour', {CHANNEL: channels}, start, end)
+    return _hourly_density_from_counts(counts['Hour'], counts['count'])
+
+
+def device_ratio(rollups, channels, start, end):
+    """Sign-ups per device type (Mobile, Desktop, Other; see data_processor.device_type)."""
+    return rollups.totals('Device Type', {CHANNEL: channels}, start, end).set_axis(['Device Type', 'Count'], axis=1)
+
+
+def device_trends(rollups, freq, channels, start, end):
+    """Mobile and Desktop share of each period's sign-ups, in long form for one line per device type."""
+    device_time = rollups.counts(freq, 'Device Type', {CHANNEL: channels}, start, end)
+    device_time = device_time.rename(columns={'date': 'Submission Create Date', 'count': 'Count'})
+
+    # Pivot so columns are Device Types
+    device_pivot = device_time.pivot(index='Submission Create Date', columns='Device Type', values='Count').fillna(0)
+
+    # Calculate total sign-ups per bucket
+    device_pivot['Total'] = device_pivot.sum(axis=1)
+
+    # Calculate percentage share
+    device_pivot['Mobile Share'] = device_pivot.get('Mobile', 0) / device_pivot['Total'] * 100
+    device_pivot['Desktop Share'] = device_pivot.get('Desktop', 0) / device_pivot['Total'] * 100
+
+    # Prepare data for plotting, capped at the point budget per share line
+    plot_df = device_pivot.reset_index().melt(
+        id_vars='Submission Create Date', value_vars=['Mobile Share', 'Desktop Share'],
+        var_name='variable', value_name='value'
+    )
+    return downsample(plot_df, 'Submission Create Date', 'value', series='variable')
+
+
+def signups_by_country(df):
+    """Sign-ups per country, under the names the bundled outlines use."""
+    country_counts = df.groupby('Country', observed=True).size().reset_index(name='Count')
+    country_counts['Country'] = country_counts['Country'].map(normalise_country_name)
+    return country_counts.groupby('Country', as_index=False, observed=True)['Count'].sum()
+
+
+def channel_device_heatmap(rollups, channels, start, end):
+    return rollups.totals([CHANNEL, 'Submitter Device'], {CHANNEL: channels}, start, end).rename(columns={'count': 'Count'})
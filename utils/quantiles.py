@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+# Items kept by the top compactor; rank error is about 1.7 / K, so ~1% of the rows per job type
+K = 200
+# Each compactor below the top holds 2/3 as many items as the one above it
+SHRINK = 2 / 3
+# Outlier points drawn per box at most, however many applicants fall outside the whiskers
+OUTLIER_SAMPLE = 50
+# Distinct smallest and largest values kept exactly, as sampled items would mostly miss rare outliers
+TAIL = 50
+SEED = 0
+
+
+class KllSketch:
+    """Mergeable quantile sketch (KLL) over a stream of numbers, in O(K log(n / K)) memory.
+
+    Level h holds items standing for 2**h values each. A full level is sorted and every other item,
+    from a random start, moves up a level, so at most a couple of thousand items are kept whatever
+    the number of values. The TAIL smallest and largest distinct values (and so min and max) are
+    kept exactly. Sketches of separate batches merge into the sketch of their union, so a new
+    export only needs a sketch of its own rows.
+    """
+
+    def __init__(self, k=K, seed=SEED):
+        self.k = k
+        self.n = 0
+        self.low = np.empty(0)
+        self.high = np.empty(0)
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def min(self):
+        return self.low[0] if len(self.low) else np.nan
+
+    @property
+    def max(self):
+        return self.high[-1] if len(self.high) else np.nan
+
+    def _tails(self, *values):
+        distinct = np.unique(np.concatenate(values))
+        self.low, self.high = distinct[:TAIL], distinct[-TAIL:]
+
+    def _capacity(self, level):
+        return max(int(np.ceil(self.k * SHRINK ** (len(self.levels) - 1 - level))), 2)
+
+    def _compress(self):
+        # Compact the lowest full level until none is; a new top level shrinks every capacity below it
+        while True:
+            full = [h for h, items in enumerate(self.levels) if len(items) > self._capacity(h)]
+            if not full:
+                return
+            level = full[0]
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # An odd item out stays behind; the rest halve, keeping odd or even positions at random
+            keep, pair = items[:len(items) % 2], items[len(items) % 2:]
+            self.levels[level] = keep
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], pair[self._rng.integers(2)::2]])
+
+    def update(self, values):
+        """Add a batch of values (NaN ignored)."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        self._tails(self.low, self.high, values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merged(self, other):
+        """New sketch of both streams; neither sketch is changed."""
+        sketch = KllSketch(self.k)
+        sketch._rng = np.random.default_rng(self._rng.integers(1 << 32))
+        sketch.n = self.n + other.n
+        sketch._tails(self.low, self.high, other.low, other.high)
+        depth = max(len(self.levels), len(other.levels))
+        sketch.levels = [
+            np.concatenate([s.levels[h] for s in (self, other) if h < len(s.levels)]) for h in range(depth)
+        ]
+        sketch._compress()
+        return sketch
+
+    def items(self):
+        """Retained items, sorted, with the number of values each stands for."""
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        return values[order], weights[order]
+
+    def quantiles(self, qs):
+        """Approximate values at the fractions `qs`; 0 and 1 give the exact min and max.
+
+        Interpolates linearly between items at the middle of the ranks they stand for, which is
+        numpy's (and Plotly's) default method exactly while nothing has been compacted.
+        """
+        qs = np.asarray(qs, dtype=float)
+        if not self.n:
+            return np.full(qs.shape, np.nan)
+        values, weights = self.items()
+        middles = np.cumsum(weights) - (weights + 1) / 2
+        result = np.interp(qs * (weights.sum() - 1), middles, values)
+        return np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, result))
+
+
+def sketch_by(values, groups, k=K):
+    """{group: KllSketch of its values}, one pass over the rows per group."""
+    frame = pd.DataFrame({"value": np.asarray(values, dtype=float), "group": np.asarray(groups, dtype=object)})
+    return {group: KllSketch(k).update(part.to_numpy())
+            for group, part in frame.groupby("group", sort=True)["value"]}
+
+
+def merge_sketches(sketches, more):
+    """{group: sketch} for both inputs, merging groups they share; the inputs are left as they were."""
+    merged = dict(sketches)
+    for group, sketch in more.items():
+        merged[group] = merged[group].merged(sketch) if group in merged else sketch
+    return merged
+
+
+def box_summary(sketch, outliers=OUTLIER_SAMPLE):
+    """Quartiles, Tukey whiskers and up to `outliers` points beyond them, as a box plot draws them.
+
+    Whiskers stop at the furthest known value within 1.5 IQR of the box. Outlier points are the
+    distinct known values beyond them (the exact tails plus retained items), thinned evenly when
+    there are more than `outliers`, always keeping the min and max.
+    """
+    q1, median, q3 = sketch.quantiles([0.25, 0.5, 0.75])
+    values, _ = sketch.items()
+    values = np.unique(np.concatenate([values, sketch.low, sketch.high]))
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    lower, upper = (inside.min(), inside.max()) if len(inside) else (q1, q3)
+    beyond = values[(values < lower) | (values > upper)]
+    if len(beyond) > outliers:
+        beyond = beyond[np.unique(np.linspace(0, len(beyond) - 1, outliers).round().astype(int))]
+    return {
+        "count": sketch.n, "min": sketch.min, "q1": q1, "median": median, "q3": q3, "max": sketch.max,
+        "lowerfence": lower, "upperfence": upper, "outliers": beyond.tolist(),
+    }
+
+
+def box_summaries(sketches, outliers=OUTLIER_SAMPLE):
+    """One row of box_summary per group, in group order."""
+    rows = [{"group": group, **box_summary(sketch, outliers)} for group, sketch in sorted(sketches.items()) if len(sketch)]
+    columns = ["group", "count", "min", "q1", "median", "q3", "max", "lowerfence", "upperfence", "outliers"]
+    return pd.DataFrame(rows, columns=columns)
@@ -0,0 +1,178 @@
+"""Process-wide cache for filter-driven results, shared by every session.
+
+    version = snapshot["version"] if snapshot else data_version
+    counts = cached("mailing.devices", {"version": version, "channels": channels, "dates": date_range(start, end)},
+                    lambda: rollups.totals("Device Type", {...}, start, end))
+
+Keys are canonicalised, so ["Referral", "LinkedIn"] and ["LinkedIn", "Referral"] hit the same entry
+and a date range means the same whatever time of day it was picked at. Always put the data
+version in the key; entries for old versions simply age out. Results are shared between sessions,
+so treat them as read-only: copy before editing a cached frame in place.
+"""
+import datetime
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.timing import count
+
+# Memory cap across all entries; results bigger than this are returned but never stored
+MAX_BYTES = int(os.environ.get("CADWARE_RESULT_CACHE_MB", "256")) * 2**20
+MAX_ENTRIES = 4096
+
+
+def canonical(value):
+    """Hashable, order-independent form of a filter value.
+
+    Lists, sets, arrays and indexes are selections: deduplicated and sorted. Tuples keep their
+    order (for ranges and positional arguments). Dicts are sorted by key, timestamps become ISO
+    strings and missing values (None, NaN, NaT) all become None.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), canonical(v)) for k, v in value.items()))
+    if isinstance(value, tuple):
+        return tuple(canonical(v) for v in value)
+    if isinstance(value, (list, set, frozenset, np.ndarray, pd.Index, pd.Series)):
+        # Mixed types (e.g. a None option among strings) sort by type name first
+        items = {canonical(v) for v in value}
+        return ("set", *sorted(items, key=lambda v: (type(v).__name__, repr(v))))
+    if value is None or (not isinstance(value, str) and pd.api.types.is_scalar(value) and pd.isna(value)):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime.date, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError(f"can't use {type(value).__name__} in a result cache key")
+
+
+def date_range(start, end):
+    """Canonical inclusive day range: any times of day inside the same two days give the same key."""
+    return ("days", pd.Timestamp(start).normalize().isoformat(), pd.Timestamp(end).normalize().isoformat())
+
+
+def nbytes(value):
+    """Approximate memory held by a cached result."""
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(nbytes(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """LRU of computed results bounded by total size and entry count, with hit/miss/eviction counters.
+
+    Concurrent misses on the same key wait for one computation instead of each running it.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES, max_entries=MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key):
+        # Caller holds the lock
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def get_or_compute(self, name, key, compute):
+        """Cached result of `compute()` for `name` and the filter state `key`."""
+        key = (name, canonical(key))
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                pending = self._pending.setdefault(key, threading.Lock())
+        if entry is not None:
+            return self._hit(name, entry)
+
+        with pending:
+            with self._lock:
+                entry = self._lookup(key)
+            if entry is not None:
+                # Another session computed it while this one waited
+                return self._hit(name, entry)
+            try:
+                value = compute()
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+            self._store(name, key, value)
+            return value
+
+    def _hit(self, name, entry):
+        with self._lock:
+            self.hits += 1
+        count("result_cache.hit")
+        count(f"result_cache.hit.{name}")
+        return entry[0]
+
+    def _store(self, name, key, value):
+        size = nbytes(value)
+        evicted = 0
+        with self._lock:
+            self.misses += 1
+            if size <= self.max_bytes:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._bytes -= old[1]
+                self._entries[key] = (value, size)
+                self._bytes += size
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                _, (_, freed) = self._entries.popitem(last=False)
+                self._bytes -= freed
+                evicted += 1
+            self.evictions += evicted
+        count("result_cache.miss")
+        count(f"result_cache.miss.{name}")
+        count("result_cache.evicted", evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "mb": round(self._bytes / 2**20, 2),
+                "max_mb": round(self.max_bytes / 2**20, 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+# One per process: Streamlit runs every session's script in the same interpreter
+_cache = ResultCache()
+
+
+def cached(name, key, compute):
+    """_cache.get_or_compute: the shared result for `name` under filter state `key`, computed at most once."""
+    return _cache.get_or_compute(name, key, compute)
+
+
+def stats():
+    return _cache.stats()
@@ -0,0 +1,97 @@
+import pandas as pd
+import pyarrow as pa
+
+MONTH_ORDER = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Calendar columns get a fixed, ordered category so charts sort correctly without re-categorising
+ORDERED_CATEGORIES = {
+    "submit_month": MONTH_ORDER,
+    "Available_Month": MONTH_ORDER,
+    "Available_DayOfWeek": DAY_ORDER,
+}
+
+# Column types for the raw form exports, so CSV parsing never has to infer them; columns a form
+# doesn't have are simply absent from its file
+EXPORT_COLUMN_TYPES = {
+    "Submission ID": pa.int64(),
+    "Submission Serial Number": pa.int64(),
+    "User Id": pa.int64(),
+    "Submission Create Date": pa.timestamp("ns"),
+    "What is your earliest available date": pa.timestamp("ns"),
+    "Title": pa.string(),
+    "Address": pa.string(),
+    "Submission Status": pa.string(),
+    "Submitter Device": pa.string(),
+    "Submitter IP": pa.string(),
+    "Submitter Browser": pa.string(),
+    "Source URL": pa.string(),
+    "Submission Admin View URL": pa.string(),
+    "Notes": pa.string(),
+    "How did you hear about us?": pa.string(),
+    "Message": pa.string(),
+}
+# Tried in order: submission timestamps, then the dd/mm/yyyy availability date
+EXPORT_TIMESTAMP_FORMATS = ["%Y-%m-%d %H:%M:%S", "%d/%m/%Y"]
+
+# Low-cardinality string columns stored as categoricals (int8/int16 codes + one copy of each label)
+APPLICATION_CATEGORIES = [
+    "job_type", "gender", "City", "Country", "State/Region",
+    "submit_month", "Available_Month", "Available_DayOfWeek", "submit_time_of_day",
+]
+# Near-unique strings: as categoricals every append would grow a category per row, so they stay
+# Arrow strings (one buffer, no per-value Python objects)
+APPLICATION_STRINGS = ["Address", "location", "Submitter IP"]
+MAILING_LIST_CATEGORIES = [
+    "How did you hear about us?", "Submitter Device", "Submitter Browser", "Country", "City",
+]
+SMALL_INTS = ["submit_year", "submit_day", "Available_Year"]
+
+
+def compact(df, categories, small_ints=(), strings=()):
+    """Return `df` with `categories` as categoricals, `small_ints` downcast to the narrowest int and
+    `strings` as Arrow strings."""
+    # Shallow: each converted column replaces its own slot, the input frame keeps its columns
+    df = df.copy(deep=False)
+    for column in strings:
+        if column in df:
+            df[column] = df[column].astype(pd.ArrowDtype(pa.string()))
+    for column in categories:
+        if column not in df:
+            continue
+        if column in ORDERED_CATEGORIES:
+            df[column] = pd.Categorical(df[column], categories=ORDERED_CATEGORIES[column], ordered=True)
+        else:
+            df[column] = df[column].astype("category")
+    for column in small_ints:
+        if column in df and df[column].notna().all():
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+    return df
+
+
+def memory_report(before, after):
+    before_bytes = int(before.memory_usage(deep=True).sum())
+    after_bytes = int(after.memory_usage(deep=True).sum())
+    return {
+        "before_bytes": before_bytes,
+        "after_bytes": after_bytes,
+        "ratio": round(before_bytes / after_bytes, 2) if after_bytes else None,
+    }
+
+
+def decompact(df):
+    # Back to plain object columns, e.g. to measure what the compact layout saves
+    df = df.copy()
+    for column in df.columns:
+        if isinstance(df[column].dtype, (pd.CategoricalDtype, pd.ArrowDtype)):
+            df[column] = df[column].astype(object)
+    return df
+
+
+if __name__ == "__main__":
+    # python -m utils.schema: resident memory of the applications frame, plain vs. compact
+    from utils.data_processor import reduced_all_applications
+
+    report = memory_report(decompact(reduced_all_applications), reduced_all_applications)
+    print(f"applications: {report['before_bytes']:,} -> {report['after_bytes']:,} bytes ({report['ratio']}x)")
@@ -0,0 +1,294 @@
+"""Precomputed KPI and aggregate snapshots the pages (and other tools) can read instead of recomputing.
+
+    python -m utils.snapshots build                 # run the pipeline, write .cache/snapshots/
+    python -m utils.snapshots serve --port 8765     # read-only HTTP with ETags
+
+Each table is a Parquet file and the headline KPIs a JSON file, named after their SHA-256 so a
+file never changes once written. manifest.json lists the current files with their hashes and the
+data versions they were built from, and is swapped in atomically.
+
+With CADWARE_SNAPSHOTS=1 the pages draw every chart from the latest snapshot's tables and only load
+the rows (the full ingest, geocoding and IP lookups) when someone asks for them in a raw data
+viewer. The KPIs they show follow the page filters, so they slice the cube themselves; kpis.json
+is the unfiltered headline numbers for other tools, through `serve`.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pandas as pd
+
+from utils.ingest import CACHE_DIR, _atomic_write, _read_manifest
+
+SNAPSHOT_DIR = CACHE_DIR / "snapshots"
+ENABLED = os.environ.get("CADWARE_SNAPSHOTS", "0") == "1"
+MANIFEST = "manifest.json"
+# Tables each page reads in snapshot mode; an older snapshot missing any of them is ignored
+APPLICATION_TABLES = ("applications_cube", "availability_box", "location_counts", "hourly_counts")
+MAILING_LIST_TABLES = ("mailing_list_daily", "mailing_list_hourly", "signups_by_country")
+
+# Parsed tables by content hash, for the newest manifest read only
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_blob(root, prefix, suffix, data):
+    digest = _content_hash(data)
+    name = f"{prefix}-{digest[:16]}{suffix}"
+    if not (root / name).exists():
+        _atomic_write(root / name, lambda p: p.write_bytes(data))
+    return {"file": name, "sha256": digest}
+
+
+def write_snapshot(tables, kpis, data_versions, pipeline_version, root=SNAPSHOT_DIR):
+    """Write `tables` ({name: DataFrame}) and `kpis` (a JSON-able dict), then point the manifest at them."""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    previous = _read_manifest(root / MANIFEST)
+
+    entries = {}
+    for name, frame in tables.items():
+        buffer = io.BytesIO()
+        frame.to_parquet(buffer, index=False)
+        entries[name] = {**_write_blob(root, name, ".parquet", buffer.getvalue()), "rows": len(frame)}
+    kpi_entry = _write_blob(root, "kpis", ".json", json.dumps(kpis, indent=1, sort_keys=True, default=str).encode())
+
+    # The snapshot's own version: changes exactly when any of its content does
+    combined = hashlib.sha256(kpi_entry["sha256"].encode())
+    for name in sorted(entries):
+        combined.update(f"{name}:{entries[name]['sha256']}".encode())
+    manifest = {
+        "version": combined.hexdigest()[:16],
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "pipeline_version": pipeline_version,
+        "data_versions": data_versions,
+        "tables": entries,
+        "kpis": kpi_entry,
+    }
+    _atomic_write(root / MANIFEST, lambda p: p.write_text(json.dumps(manifest, indent=1)))
+
+    # Keep this snapshot's files and the previous one's, for readers still holding the old manifest
+    keep = {MANIFEST}
+    for m in (manifest, previous):
+        if m:
+            keep.update(entry["file"] for entry in m["tables"].values())
+            keep.add(m["kpis"]["file"])
+    for path in root.iterdir():
+        if path.name not in keep and path.suffix in (".parquet", ".json"):
+            path.unlink(missing_ok=True)
+    return manifest
+
+
+def read_manifest(root=SNAPSHOT_DIR):
+    return _read_manifest(Path(root) / MANIFEST)
+
+
+def read_table(name, manifest, root=SNAPSHOT_DIR):
+    """Table `name` of `manifest`, hash-checked on first read and then kept in memory; None if absent.
+
+    Tables that aren't part of `manifest` are dropped from memory, so a long-running server only
+    ever holds one snapshot's worth.
+    """
+    entry = manifest["tables"].get(name) if manifest else None
+    if entry is None:
+        return None
+    with _tables_lock:
+        current = {e["sha256"] for e in manifest["tables"].values()}
+        for digest in [d for d in _tables if d not in current]:
+            del _tables[digest]
+        if entry["sha256"] not in _tables:
+            data = (Path(root) / entry["file"]).read_bytes()
+            if _content_hash(data) != entry["sha256"]:
+                raise ValueError(f"snapshot table {entry['file']} does not match its hash")
+            _tables[entry["sha256"]] = pd.read_parquet(io.BytesIO(data))
+        return _tables[entry["sha256"]]
+
+
+def latest_snapshot(tables=(), root=SNAPSHOT_DIR):
+    """Manifest of the latest snapshot if snapshot mode is on and it has all of `tables`, else None.
+
+    Read it once per rerun and pass it to read_table, so every table comes from the same snapshot.
+    """
+    if not ENABLED:
+        return None
+    manifest = read_manifest(root)
+    if manifest is None or any(name not in manifest["tables"] for name in tables):
+        return None
+    return manifest
+
+
+def application_kpis(cube):
+    from utils.cube import cube_counts, cube_total
+
+    job_counts = cube_counts(cube, "job_type")
+    top_job = sorted(job_counts[job_counts == job_counts.max()].index)[0] if len(job_counts) else None
+    cities = cube_counts(cube, "City").head(3)
+    return {
+        "total_applications": cube_total(cube),
+        "female_applicants": cube_total(cube, {"gender": ["Female"]}),
+        "male_applicants": cube_total(cube, {"gender": ["Male"]}),
+        "available_within_a_week": cube_total(cube, {"availability_bucket": ["<= 7 days"]}),
+        "popular_job_title": top_job,
+        "applications_by_job_type": {k: int(v) for k, v in job_counts.items()},
+        "top_cities": [{"city": city, "count": int(n)} for city, n in cities.items()],
+    }
+
+
+def mailing_list_kpis(rollups):
+    sources = rollups.totals("How did you hear about us?")
+    devices = rollups.totals("Device Type")
+    total = int(devices["count"].sum())
+    return {
+        "total_signups": total,
+        "signups_by_source": dict(zip(sources["How did you hear about us?"].astype(str), sources["count"].astype(int))),
+        "device_share": {
+            str(kind): round(int(n) / total, 4) for kind, n in zip(devices["Device Type"], devices["count"])
+        } if total else {},
+    }
+
+
+def snapshot_tables(dataset, mailing_list):
+    """({name: table}, kpis) for APPLICATION_TABLES and MAILING_LIST_TABLES.
+
+    `mailing_list` has to be geolocated already (page_data.geolocate), for the country counts.
+    """
+    from utils import page_data
+    from utils.data_processor import signup_hour_rollups, signup_rollups
+
+    rollups = signup_rollups(mailing_list)
+    tables = {
+        "applications_cube": dataset.cube,
+        "availability_box": dataset.availability_box,
+        "location_counts": dataset.location_counts,
+        "hourly_counts": page_data.job_hour_counts(dataset),
+        "mailing_list_daily": rollups.daily,
+        "mailing_list_hourly": signup_hour_rollups(mailing_list).daily,
+        "signups_by_country": page_data.signups_by_country(mailing_list),
+    }
+    kpis = {"applications": application_kpis(dataset.cube), "mailing_list": mailing_list_kpis(rollups)}
+    return tables, kpis
+
+
+def build(root=SNAPSHOT_DIR):
+    """Run the ingest pipeline and both pages' aggregations, and write them as a snapshot."""
+    from utils import page_data
+    from utils.data_processor import (
+        PIPELINE_VERSION, get_dataset, get_ip_dimension, get_ip_resolver, get_mailing_list,
+    )
+
+    dataset = get_dataset()
+    mailing_list, mailing_list_version = get_mailing_list()
+    ip_dimension = get_ip_dimension()
+    ip_dimension.resolve(get_ip_resolver(), mailing_list["Submitter IP"])
+    tables, kpis = snapshot_tables(dataset, page_data.geolocate(mailing_list, ip_dimension))
+    data_versions = {"applications": dataset.data_version, "mailing_list": mailing_list_version}
+    return write_snapshot(tables, kpis, data_versions, PIPELINE_VERSION, root)
+
+
+class SnapshotHandler(BaseHTTPRequestHandler):
+    """Read-only view of the latest snapshot.
+
+    /manifest.json, /kpis.json, /tables/<name>.parquet and /tables/<name>.json. Every response
+    carries the content hash as its ETag, so a client sending If-None-Match gets a 304 until the
+    data actually changes.
+    """
+
+    root = SNAPSHOT_DIR
+
+    def do_GET(self):
+        self._respond(include_body=True)
+
+    def do_HEAD(self):
+        self._respond(include_body=False)
+
+    def _resolve(self):
+        # (etag, content type, callable producing the body) for the request path, or None
+        manifest = read_manifest(self.root)
+        if manifest is None:
+            return None
+        path = self.path.split("?", 1)[0]
+        if path in ("/", "/manifest.json"):
+            return manifest["version"], "application/json", lambda: json.dumps(manifest, indent=1).encode()
+        if path == "/kpis.json":
+            entry = manifest["kpis"]
+            return entry["sha256"][:32], "application/json", lambda: (Path(self.root) / entry["file"]).read_bytes()
+        if path.startswith("/tables/"):
+            name, _, kind = path[len("/tables/"):].rpartition(".")
+            entry = manifest["tables"].get(name)
+            if entry is None:
+                return None
+            if kind == "parquet":
+                return (entry["sha256"][:32], "application/vnd.apache.parquet",
+                        lambda: (Path(self.root) / entry["file"]).read_bytes())
+            if kind == "json":
+                return (entry["sha256"][:32] + "-json", "application/json",
+                        lambda: read_table(name, manifest, self.root).to_json(orient="records", date_format="iso").encode())
+        return None
+
+    def _respond(self, include_body):
+        found = self._resolve()
+        if found is None:
+            self.send_error(404)
+            return
+        etag, content_type, body = found
+        etag = f'"{etag}"'
+        wanted = [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]
+        if etag in wanted or "*" in wanted:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        data = body()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        # Clients may keep a copy but must revalidate; a 304 costs one manifest read
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if include_body:
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(root=SNAPSHOT_DIR, host="127.0.0.1", port=8765):
+    handler = type("Handler", (SnapshotHandler,), {"root": Path(root)})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"serving {root} on http://{host}:{server.server_port}")
+    server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=str(SNAPSHOT_DIR), help="snapshot directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="ingest new exports and write a fresh snapshot")
+    serve_parser = commands.add_parser("serve", help="serve the latest snapshot over HTTP")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        manifest = build(args.dir)
+        print(f"snapshot {manifest['version']} written to {args.dir} in {time.perf_counter() - start:.1f}s")
+        for name, entry in manifest["tables"].items():
+            print(f"  {name:<22} {entry['rows']:>9,} rows  {entry['file']}")
+    else:
+        serve(args.dir, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
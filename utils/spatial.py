@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+# Map grouping choices: None keeps one point per resolved location, otherwise grid cell size in degrees
+GRID_LEVELS = {"City": None, "Region (1°)": 1.0, "Country (5°)": 5.0}
+DEFAULT_GRID_LEVEL = "City"
+
+# Bubble radius in metres for the busiest point; area is proportional to count, with a floor so singles show
+MAX_RADIUS = 300_000
+MIN_RADIUS = 20_000
+
+
+def coordinate_table(lat_lon):
+    """{location: (lat, lon)} as a frame indexed by location, with unresolved locations dropped."""
+    table = pd.DataFrame.from_dict(lat_lon, orient="index", columns=["latitude", "longitude"])
+    return table.apply(pd.to_numeric, errors="coerce").dropna()
+
+
+def location_counts(locations, by=None):
+    """Rows per distinct location (and per value of each `by` column), as a flat count table."""
+    frame = pd.DataFrame({"location": locations})
+    keys = ["location"]
+    if by is not None:
+        for name, column in by.items():
+            frame[name] = column
+            keys.append(name)
+    return frame.groupby(keys, observed=True).size().reset_index(name="count")
+
+
+def aggregate_points(counts, coordinates, cell_degrees=None):
+    """Weighted map points: one per location with coordinates, or per grid cell when `cell_degrees` is set.
+
+    `counts` has a location and a count column. Coordinates are joined once per distinct location,
+    so the work and the output scale with the number of places rather than the number of applicants.
+    """
+    totals = counts.groupby("location", observed=True)["count"].sum()
+    points = coordinates.join(totals, how="inner")
+    points = points[points["count"] > 0]
+    if cell_degrees:
+        cell = np.floor(points[["latitude", "longitude"]].to_numpy() / cell_degrees).astype(np.int64)
+        weighted = points[["latitude", "longitude"]].mul(points["count"], axis=0)
+        weighted["count"] = points["count"]
+        weighted["cell_lat"], weighted["cell_lon"] = cell[:, 0], cell[:, 1]
+        summed = weighted.groupby(["cell_lat", "cell_lon"])[["latitude", "longitude", "count"]].sum()
+        # Count-weighted centroid, so a cell's bubble sits where its applicants actually are
+        points = summed[["latitude", "longitude"]].div(summed["count"], axis=0)
+        points["count"] = summed["count"]
+    points = points.reset_index(drop=True)
+    if len(points):
+        points["size"] = np.maximum(MAX_RADIUS * np.sqrt(points["count"] / points["count"].max()), MIN_RADIUS)
+    else:
+        points["size"] = pd.Series(dtype=float)
+    return points
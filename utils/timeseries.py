@@ -0,0 +1,154 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.cube import slice_cube
+
+# Finest first; pick_frequency walks down the list until the date range fits the bucket budget
+FREQUENCIES = ["D", "W", "M", "Q"]
+FREQUENCY_LABELS = {"D": "Daily", "W": "Weekly", "M": "Monthly", "Q": "Quarterly"}
+PERIOD_NAMES = {"D": "Day", "W": "Week", "M": "Month", "Q": "Quarter"}
+
+# Buckets per series before stepping up to a coarser frequency
+MAX_BUCKETS = 120
+# Hard cap on points per series sent to the browser, enforced with LTTB
+MAX_POINTS = 400
+
+
+def pick_frequency(start, end, max_buckets=MAX_BUCKETS, frequencies=FREQUENCIES):
+    """Finest frequency in `frequencies` that covers start..end in at most `max_buckets` buckets."""
+    if pd.isna(start) or pd.isna(end):
+        return frequencies[0]
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    for freq in frequencies:
+        if (end.to_period(freq) - start.to_period(freq)).n + 1 <= max_buckets:
+            return freq
+    return frequencies[-1]
+
+
+def bucket_start(dates, freq):
+    return dates.dt.to_period(freq).dt.start_time
+
+
+def rebucket(counts, freq, by=(), date="date", value="count"):
+    # Sum pre-aggregated counts into `freq` buckets, keyed on the first day of each bucket
+    keys = counts[[*by]].copy()
+    keys[date] = bucket_start(counts[date], freq)
+    keys[value] = counts[value].to_numpy()
+    return keys.groupby([date, *by], observed=True, dropna=False)[value].sum().reset_index()
+
+
+class Rollups:
+    """Daily counts per combination of `dimensions`, with W/M/Q rollups built once on first use.
+
+    Counting rows happens once per data version; every chart request after that works on the
+    rollups, whose size depends on days x distinct dimension values, not on the number of rows.
+    """
+
+    def __init__(self, dates, dimensions):
+        keys = dimensions.copy()
+        keys["date"] = dates.dt.normalize()
+        daily = keys.groupby(["date", *dimensions.columns], observed=True, dropna=False).size().reset_index(name="count")
+        self._set_daily(daily)
+
+    @classmethod
+    def from_daily(cls, daily):
+        """Rollups over an already-counted (date, dimensions..., count) table, e.g. one read from a snapshot."""
+        rollups = cls.__new__(cls)
+        rollups._set_daily(daily)
+        return rollups
+
+    def _set_daily(self, daily):
+        self.dimensions = [c for c in daily.columns if c not in ("date", "count")]
+        self.daily = daily
+        self.start = self.daily["date"].min()
+        self.end = self.daily["date"].max()
+        self._levels = {"D": self.daily}
+        self._lock = threading.Lock()
+
+    def at(self, freq):
+        with self._lock:
+            if freq not in self._levels:
+                self._levels[freq] = rebucket(self.daily, freq, self.dimensions)
+            return self._levels[freq]
+
+    def counts(self, freq, by, filters=None, start=None, end=None):
+        """Counts per `freq` bucket and `by` dimension(s) for days start..end (inclusive).
+
+        Buckets lying wholly inside the range come straight from the precomputed rollup; only
+        the partial buckets at either edge are re-summed from the daily table.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        start = self.start if start is None else pd.Timestamp(start).normalize()
+        end = self.end if end is None else pd.Timestamp(end).normalize()
+        if pd.isna(start) or start > end:
+            return pd.DataFrame(columns=["date", *by, "count"])
+
+        # [inner_start, inner_stop) is the run of whole buckets inside start..end
+        first, last = start.to_period(freq), end.to_period(freq)
+        inner_start = start if first.start_time == start else (first + 1).start_time
+        inner_stop = (last + 1).start_time if last.end_time.normalize() == end else last.start_time
+
+        coarse = slice_cube(self.at(freq), filters)
+        inner = coarse[(coarse["date"] >= inner_start) & (coarse["date"] < inner_stop)]
+        daily = slice_cube(self.daily, filters)
+        dates = daily["date"]
+        edges = daily[(dates >= start) & (dates <= end) & ((dates < inner_start) | (dates >= inner_stop))]
+
+        parts = [rebucket(inner, freq, by)]
+        if not edges.empty:
+            parts.append(rebucket(edges, freq, by))
+        merged = pd.concat(parts, ignore_index=True)
+        return merged.groupby(["date", *by], observed=True)["count"].sum().reset_index()
+
+    def totals(self, by, filters=None, start=None, end=None):
+        """Counts per `by` dimension(s) summed over days start..end (inclusive), largest first."""
+        daily = slice_cube(self.daily, filters)
+        if start is not None:
+            daily = daily[daily["date"] >= pd.Timestamp(start).normalize()]
+        if end is not None:
+            daily = daily[daily["date"] <= pd.Timestamp(end).normalize()]
+        counts = daily.groupby(by, observed=True)["count"].sum()
+        return counts.sort_values(ascending=False, kind="stable").reset_index()
+
+
+def lttb(x, y, threshold):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps to draw x, y with `threshold` points."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # First and last points are always kept; the rest are split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final one) is the third vertex
+        nxt_lo, nxt_hi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        areas = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(areas))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(df, x, y, series=None, max_points=MAX_POINTS):
+    """Rows of `df` to plot, at most `max_points` per `series` (one series if None), chosen with LTTB."""
+    if series is None:
+        groups = [df]
+    else:
+        groups = [group for _, group in df.groupby(series, observed=True, sort=False)]
+    kept = []
+    for group in groups:
+        group = group.sort_values(x)
+        xs = group[x]
+        if pd.api.types.is_datetime64_any_dtype(xs):
+            xs = xs.astype("int64")
+        kept.append(group.iloc[lttb(xs.to_numpy(), group[y].to_numpy(), max_points)])
+    if not kept:
+        return df
+    return pd.concat(kept, ignore_index=True)
@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from functools import wraps
+from pathlib import Path
+
+import numpy as np
+
+# Off unless CADWARE_TIMING=1; when off, span() hands back a shared no-op and count() returns at once
+ENABLED = os.environ.get("CADWARE_TIMING", "0") == "1"
+LOG_PATH = Path(os.environ.get("CADWARE_TIMING_LOG", ".cache/timings.jsonl"))
+# Samples kept per span for the percentiles
+WINDOW = 1000
+
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=WINDOW))
+_counters = defaultdict(int)
+_local = threading.local()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = on
+
+
+def span(name):
+    """Time a block: `with span("geocode.store"): ...`. Costs one global lookup when timing is off."""
+    return _Span(name) if ENABLED else _NOOP
+
+
+def timed(name):
+    # Decorator form of span()
+    def wrap(fn):
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def count(name, n=1):
+    """Bump a counter, e.g. count("geocode.store_hit", len(found))."""
+    if not ENABLED or not n:
+        return
+    with _lock:
+        _counters[name] += n
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        rerun["counters"][name] = rerun["counters"].get(name, 0) + n
+
+
+def record(name, seconds):
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        # Summed per rerun; the histogram gets one sample per span per rerun when the rerun ends
+        rerun["spans"][name] = rerun["spans"].get(name, 0.0) + seconds
+    else:
+        with _lock:
+            _samples[name].append(seconds)
+
+
+def start_rerun(page):
+    """Begin collecting spans for one script run of `page` on this thread (the session's script thread)."""
+    if not ENABLED:
+        _local.rerun = None
+        return
+    _local.rerun = {"page": page, "start": time.perf_counter(), "spans": {}, "counters": {},
+                    "section": None, "section_start": None}
+
+
+def section(name):
+    # Sequential timer for page scripts: closes the previous section and opens `name`, no re-indenting needed
+    rerun = getattr(_local, "rerun", None)
+    if rerun is None:
+        return
+    now = time.perf_counter()
+    if rerun["section"] is not None:
+        record(rerun["section"], now - rerun["section_start"])
+    rerun["section"], rerun["section_start"] = name, now
+
+
+def end_rerun():
+    """Close the rerun, fold its spans into the histograms and append it to the JSON-lines log."""
+    rerun = getattr(_local, "rerun", None)
+    if rerun is None:
+        return None
+    section(None)
+    _local.rerun = None
+    total = time.perf_counter() - rerun["start"]
+    rerun["spans"][f"{rerun['page']}.total"] = total
+    with _lock:
+        for name, seconds in rerun["spans"].items():
+            _samples[name].append(seconds)
+    entry = {
+        "ts": round(time.time(), 3),
+        "page": rerun["page"],
+        "spans_ms": {name: round(seconds * 1000, 3) for name, seconds in rerun["spans"].items()},
+        "counters": rerun["counters"],
+    }
+    try:
+        LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with _lock, open(LOG_PATH, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError:
+        pass
+    return entry
+
+
+def percentiles():
+    """{span: {"n", "p50_ms", "p95_ms", "p99_ms"}} over the last WINDOW samples of each span."""
+    with _lock:
+        snapshot = {name: np.fromiter(values, dtype=float) for name, values in _samples.items() if values}
+    table = {}
+    for name, values in sorted(snapshot.items()):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+        table[name] = {"n": len(values), "p50_ms": round(p50, 2), "p95_ms": round(p95, 2), "p99_ms": round(p99, 2)}
+    return table
+
+
+def counters():
+    with _lock:
+        return dict(sorted(_counters.items()))
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _counters.clear()
+
+
+def render_debug_panel(last_rerun):
+    """Sidebar expander with this rerun's spans, process-wide percentiles, cache counters and result-cache stats."""
+    if not ENABLED or last_rerun is None:
+        return
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander("⏱ Timings", expanded=False):
+        st.caption(f"This run: {last_rerun['spans_ms'].get(last_rerun['page'] + '.total', 0):,.0f} ms")
+        this_run = pd.Series(last_rerun["spans_ms"], name="ms").sort_values(ascending=False)
+        st.dataframe(this_run, use_container_width=True)
+        st.caption("Across reruns (ms)")
+        st.dataframe(pd.DataFrame.from_dict(percentiles(), orient="index"), use_container_width=True)
+        st.caption("Cache counters")
+        st.dataframe(pd.Series(counters(), name="count", dtype="int64"), use_container_width=True)
+        from utils.result_cache import stats
+        st.caption("Filter result cache")
+        st.dataframe(pd.Series(stats(), name="value", dtype=object).astype(str), use_container_width=True)
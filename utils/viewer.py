@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def search_mask(frame, positions, columns, text):
+    """Which of `positions` have `text` (case-insensitive) in any of `columns`."""
+    text = text.casefold()
+    found = np.zeros(len(positions), dtype=bool)
+    for column in columns:
+        values = frame[column].iloc[positions]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Match each label once, then look rows up by code
+            if not len(values.cat.categories):
+                # Nothing but missing values (e.g. Country before any IP resolved): nothing to match
+                continue
+            labels = values.cat.categories.astype(str).str.casefold().str.contains(text, regex=False)
+            codes = values.cat.codes.to_numpy()
+            found |= (codes >= 0) & np.asarray(labels)[np.maximum(codes, 0)]
+        elif isinstance(values.dtype, (pd.ArrowDtype, pd.StringDtype)):
+            # Missing values stay missing rather than becoming the text "<NA>"
+            found |= values.str.casefold().str.contains(text, regex=False).to_numpy(dtype=bool, na_value=False)
+        else:
+            found |= values.astype(str).str.casefold().str.contains(text, regex=False).to_numpy()
+    return found
+
+
+def matching_positions(frame, columns, rows=None, search=None):
+    """Positions of the rows in `rows` (a boolean mask, all if None) that match `search` in `columns`."""
+    positions = np.arange(len(frame)) if rows is None else np.flatnonzero(np.asarray(rows))
+    if search:
+        positions = positions[search_mask(frame, positions, columns, search)]
+    return positions
+
+
+def page_slice(frame, positions, columns, sort_by=None, ascending=True, page=0, page_size=50):
+    """Page `page` of `frame` at `positions`, sorted on `sort_by` and projected onto `columns`.
+
+    Only the sort column is read across all matching rows; just the returned page is materialised.
+    """
+    if sort_by is not None and len(positions):
+        keys = frame[sort_by].iloc[positions]
+        order = np.argsort(keys.rank(method="first", ascending=ascending, na_option="bottom").to_numpy(), kind="stable")
+        positions = positions[order]
+    start = page * page_size
+    return frame.iloc[positions[start:start + page_size], frame.columns.get_indexer(list(columns))]
+
+
+def raw_data_viewer(frame, key, rows=None, default_columns=None, columns=None):
+    """Raw-data table that only ever sends one page of rows to the browser.
+
+    `columns` limits which of the frame's columns can be shown (default all of them).
+    """
+    all_columns = list(columns or frame.columns)
+    columns = st.multiselect("Columns", all_columns, default=default_columns or all_columns, key=f"{key}_columns")
+    columns = columns or all_columns
+    search_col, sort_col, order_col, size_col = st.columns([3, 2, 1, 1])
+    search = search_col.text_input("Search", key=f"{key}_search")
+    sort_by = sort_col.selectbox("Sort by", [None] + all_columns, key=f"{key}_sort")
+    ascending = order_col.radio("Order", ["Asc", "Desc"], key=f"{key}_order") == "Asc"
+    page_size = size_col.selectbox("Rows", PAGE_SIZES, index=1, key=f"{key}_page_size")
+
+    positions = matching_positions(frame, columns, rows, search)
+    total = len(positions)
+    pages = max(1, -(-total // page_size))
+    page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, key=f"{key}_page") - 1
+
+    shown = page_slice(frame, positions, columns, sort_by, ascending, page, page_size)
+    st.dataframe(shown, use_container_width=True, hide_index=True)
+    first = page * page_size + 1 if total else 0
+    st.caption(f"Rows {first:,}-{page * page_size + len(shown):,} of {total:,}")